@@ -1,7 +1,6 @@
 import os
 import sys
 import streamlit as st
-from typing import Dict, List
 from llama_index.core.base.llms.types import MessageRole, ChatMessage
 
 # Ensure the correct module path is added to sys.path for imports
@@ -9,25 +8,7 @@ module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
 if module_path not in sys.path:
     sys.path.append(module_path)
 
-from rag import RAG
-
-def map_message(message_dict: Dict[str, str]) -> ChatMessage:
-    """
-    Maps a message dictionary to a ChatMessage object, converting the role
-    to the appropriate MessageRole enum.
-
-    Args:
-        message_dict (Dict[str, str]): Dictionary containing message 'role' and 'content'.
-
-    Returns:
-        ChatMessage: A ChatMessage object with the role and content mapped.
-    """
-    role_mapping = {
-        'assistant': MessageRole.ASSISTANT,
-        'user': MessageRole.USER,
-        'system': MessageRole.SYSTEM
-    }
-    return ChatMessage(content=message_dict['content'], role=role_mapping[message_dict['role']])
+from rag import RAG, chat_index_pointer
 
 def display_chat_history() -> None:
     """
@@ -51,23 +32,54 @@ def handle_user_input() -> None:
             st.markdown(prompt)
 
         response_text = ""
-        chat_history = [map_message(message) for message in st.session_state['messages']]
-        
+        # The summary and latest turns within the token budget, the prompt itself is passed separately
+        memory = st.session_state['memory']
+        chat_history = memory.get()
+
         # Display assistant response progressively in a single chat box
         with st.chat_message('assistant'):
             assistant_placeholder = st.empty()
-            for chunk in rag.generate_response(prompt, chat_history):
+            for chunk in rag.generate_response(prompt, chat_history, agent=st.session_state['agent']):
                 response_text += chunk
                 assistant_placeholder.markdown(response_text)
 
         st.session_state['messages'].append({'role': 'assistant', 'content': response_text})
 
-# Initialize RAG agent
-rag = RAG()
-rag.load_agent()
+        memory.put(ChatMessage(role=MessageRole.USER, content=prompt))
+        memory.put(ChatMessage(role=MessageRole.ASSISTANT, content=response_text))
+        # Fold turns over the token budget into the summary now, rather than before the next answer
+        memory.get()
+
+@st.cache_resource(max_entries=1)
+def load_rag(collection_name: str) -> RAG:
+    """
+    Creates the RAG system with its Chroma client, index, embedding model, query engine and
+    language model client once per process. Streamlit reruns this script on every interaction,
+    and all sessions share the cached instance. When a rebuild activates a new version of the
+    collection, the RAG system is created again for it.
+
+    Args:
+        collection_name (str): The active version of the chat collection.
+
+    Returns:
+        RAG: The shared RAG system.
+    """
+    rag = RAG(collection_name)
+    rag.load_tools()
+    return rag
+
+rag = load_rag(chat_index_pointer().active())
 
 # Main execution
 st.title("Restaurant Chat")
 st.session_state.setdefault('messages', [])
+if 'agent' not in st.session_state:
+    # Each session only gets a lightweight agent holding its conversation
+    st.session_state['agent'] = rag.create_agent()
+    st.session_state['memory'] = rag.create_memory()
+elif st.session_state.get('collection') != rag.collection_name:
+    # A new version of the collection was activated, the conversation memory is kept
+    st.session_state['agent'] = rag.create_agent()
+st.session_state['collection'] = rag.collection_name
 display_chat_history()
 handle_user_input()
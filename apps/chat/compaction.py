@@ -0,0 +1,179 @@
+import re
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle, TextNode
+from llama_index.core.utils import get_tokenizer
+from pydantic import Field
+
+# Chunks split at a sentence boundary are separated by whitespace, so a small gap still counts as adjacent
+ADJACENT_GAP = 2
+
+# Passages that do not fit in the remaining budget are shortened, unless less than this many tokens are left
+MIN_TRUNCATED_TOKENS = 50
+
+
+class ContextCompactor(BaseNodePostprocessor):
+    """
+    Compacts the retrieved chunks before they are put in the prompt.
+
+    Overlapping and adjacent chunks of the same article are merged, near-duplicate chunks are
+    dropped, the most relevant chunks are kept within a token budget and the result is grouped
+    by restaurant.
+
+    Attributes:
+        token_limit (int): Maximum number of tokens of the compacted context.
+        duplicate_threshold (float): Share of the words of a chunk found in a more relevant chunk above which it is dropped.
+    """
+
+    token_limit: int = Field(default=1500, description="Maximum number of tokens of the compacted context.")
+    duplicate_threshold: float = Field(default=0.8, description="Share of words in a more relevant chunk above which a chunk is dropped.")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ContextCompactor"
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        """
+        Merges, deduplicates, trims and groups the retrieved nodes.
+
+        Args:
+            nodes (List[NodeWithScore]): The retrieved nodes, most relevant first.
+            query_bundle (Optional[QueryBundle]): The query (unused).
+
+        Returns:
+            List[NodeWithScore]: The compacted nodes, grouped by restaurant.
+        """
+        nodes = self._drop_duplicates(self._merge_adjacent(nodes))
+        nodes = self._trim(sorted(nodes, key=lambda node: node.score or 0.0, reverse=True), get_tokenizer())
+        return self._group_by_restaurant(nodes)
+
+    @staticmethod
+    def _merge_adjacent(nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        """
+        Merges overlapping and adjacent chunks of the same article into one node.
+
+        Args:
+            nodes (List[NodeWithScore]): The retrieved nodes.
+
+        Returns:
+            List[NodeWithScore]: The nodes with adjacent chunks merged, scored by their best chunk.
+        """
+        articles: Dict[str, List[NodeWithScore]] = {}
+        merged: List[NodeWithScore] = []
+        for node in nodes:
+            key = node.node.ref_doc_id or node.node.metadata.get('source')
+            if key is None or node.node.start_char_idx is None or node.node.end_char_idx is None:
+                merged.append(node)
+            else:
+                articles.setdefault(key, []).append(node)
+
+        for chunks in articles.values():
+            chunks.sort(key=lambda chunk: chunk.node.start_char_idx)
+            current = chunks[0]
+            text = current.node.get_content()
+            start, end = current.node.start_char_idx, current.node.end_char_idx
+            score = current.score or 0.0
+
+            for chunk in chunks[1:] + [None]:
+                if chunk is not None and chunk.node.start_char_idx <= end + ADJACENT_GAP:
+                    chunk_text = chunk.node.get_content()
+                    if chunk.node.start_char_idx >= end:
+                        # A gap is the whitespace the chunks were split at, contiguous chunks continue the text as is
+                        gap = chunk.node.start_char_idx > end and not (text[-1:].isspace() or chunk_text[:1].isspace())
+                        text += (" " if gap else "") + chunk_text
+                    else:
+                        # Only append the part of the chunk past the end of the merged text
+                        text += chunk_text[len(chunk_text) - max(0, chunk.node.end_char_idx - end):]
+                    end = max(end, chunk.node.end_char_idx)
+                    score = max(score, chunk.score or 0.0)
+                    continue
+
+                node = TextNode(
+                    text=text,
+                    metadata=dict(current.node.metadata),
+                    excluded_llm_metadata_keys=current.node.excluded_llm_metadata_keys,
+                    excluded_embed_metadata_keys=current.node.excluded_embed_metadata_keys,
+                    start_char_idx=start,
+                    end_char_idx=end
+                )
+                merged.append(NodeWithScore(node=node, score=score))
+                if chunk is not None:
+                    current, text = chunk, chunk.node.get_content()
+                    start, end, score = chunk.node.start_char_idx, chunk.node.end_char_idx, chunk.score or 0.0
+
+        return merged
+
+    def _drop_duplicates(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        """
+        Drops nodes whose words are mostly contained in a more relevant node, such as a chunk
+        of a syndicated copy of an article that was already merged into a longer passage.
+
+        Args:
+            nodes (List[NodeWithScore]): The nodes to deduplicate.
+
+        Returns:
+            List[NodeWithScore]: The nodes without near-duplicates.
+        """
+        kept: List[Tuple[NodeWithScore, Set[str]]] = []
+        for node in sorted(nodes, key=lambda node: node.score or 0.0, reverse=True):
+            words = set(re.findall(r"\w+", node.node.get_content().lower()))
+            if any(
+                len(words & other) / max(1, len(words)) >= self.duplicate_threshold
+                for _, other in kept
+            ):
+                continue
+            kept.append((node, words))
+        return [node for node, _ in kept]
+
+    def _trim(self, nodes: List[NodeWithScore], tokenizer: Callable[[str], List]) -> List[NodeWithScore]:
+        """
+        Keeps the most relevant nodes that fit in the token budget. Each passage gets at most an
+        equal share of the budget per retrieved restaurant and is shortened if it is longer, so a
+        long merged passage does not crowd out the other restaurants.
+
+        Args:
+            nodes (List[NodeWithScore]): The nodes, most relevant first.
+            tokenizer (Callable[[str], List]): Function splitting a text into tokens.
+
+        Returns:
+            List[NodeWithScore]: The nodes within the budget, most relevant first.
+        """
+        restaurants = len({node.node.metadata.get('name') for node in nodes})
+        share = self.token_limit // max(1, restaurants)
+
+        kept: List[NodeWithScore] = []
+        tokens = 0
+        for node in nodes:
+            count = len(tokenizer(node.node.get_content(metadata_mode=MetadataMode.LLM)))
+            remaining = min(share, self.token_limit - tokens)
+            if count > remaining:
+                if remaining < MIN_TRUNCATED_TOKENS:
+                    continue
+                # Cut the text at a word boundary, in proportion to the tokens that fit
+                words = node.node.get_content().split()
+                text = " ".join(words[:len(words) * remaining // count])
+                node = NodeWithScore(node=node.node.model_copy(update={"text": text}), score=node.score)
+                count = len(tokenizer(node.node.get_content(metadata_mode=MetadataMode.LLM)))
+            kept.append(node)
+            tokens += count
+        return kept
+
+    @staticmethod
+    def _group_by_restaurant(nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        """
+        Orders the nodes by restaurant, with the restaurant of the most relevant node first.
+
+        Args:
+            nodes (List[NodeWithScore]): The nodes, most relevant first.
+
+        Returns:
+            List[NodeWithScore]: The nodes grouped by restaurant.
+        """
+        groups: Dict[Optional[str], List[NodeWithScore]] = {}
+        for node in nodes:
+            groups.setdefault(node.node.metadata.get('name'), []).append(node)
+        return [node for group in groups.values() for node in group]
@@ -1,6 +1,8 @@
+import hashlib
 import os
 import chromadb
-from typing import Optional, List, Generator, Dict, Union, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, List, Generator, Union, Any
 from llama_index.core import Document, VectorStoreIndex, StorageContext
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.tools import QueryEngineTool, ToolMetadata
@@ -8,12 +10,166 @@ from llama_index.agent.openai import OpenAIAgent
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.llms.openai import OpenAI
-from llama_index.core.base.llms.types import ChatMessage
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.memory import ChatSummaryMemoryBuffer
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore, QueryBundle
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from apps.chat.compaction import ContextCompactor
+from apps.common.cache import LRUCache, normalize_question
+from data.embeddings import EmbeddingStore, get_embedding_store
+from data.index_versions import IndexPointer, build_version
+from pydantic import PrivateAttr
 from data.scheme import Session, RestaurantContent
 from config import settings
 
 os.environ['OPENAI_API_KEY'] = settings.OPENAI_API_KEY
 
+def document_id(name: str, source: str) -> str:
+    """
+    Builds a stable document id for an article, so every ingestion run uses the same id.
+
+    Args:
+        name (str): Name of the restaurant.
+        source (str): Source of the article.
+
+    Returns:
+        str: The document id.
+    """
+    return hashlib.sha1(f"{name}\0{source}".encode('utf-8')).hexdigest()
+
+def node_id(index: int, document: Document) -> str:
+    """
+    Builds a stable id for the i-th chunk of a document.
+
+    Args:
+        index (int): Position of the chunk in the document.
+        document (Document): The document the chunk belongs to.
+
+    Returns:
+        str: The node id.
+    """
+    return f"{document.doc_id}-{index}"
+
+def make_document(name: str, source: str, text: str) -> Document:
+    """
+    Creates the document of an article with a stable id.
+
+    Args:
+        name (str): Name of the restaurant.
+        source (str): Source of the article.
+        text (str): The article text.
+
+    Returns:
+        Document: The document.
+    """
+    return Document(text=text, doc_id=document_id(name, source), metadata={'name': name, 'source': source})
+
+class StoreEmbedding(BaseEmbedding):
+    """
+    LlamaIndex embeddings that read texts from and write them to the shared embedding store.
+    Queries are embedded directly, so they never grow the store; CachedRetriever keeps recent
+    query embeddings in memory.
+    """
+
+    _store: EmbeddingStore = PrivateAttr()
+    _model: BaseEmbedding = PrivateAttr()
+
+    def __init__(self, store: EmbeddingStore, model: BaseEmbedding, **kwargs: Any) -> None:
+        """
+        Initializes the embeddings.
+
+        Args:
+            store (EmbeddingStore): The shared embedding store.
+            model (BaseEmbedding): The embedding model used for queries and for texts that are not stored yet.
+        """
+        super().__init__(model_name=store.model, embed_batch_size=settings.embeddings.BATCH_SIZE, **kwargs)
+        self._store = store
+        self._model = model
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "StoreEmbedding"
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._store.embed(texts, self._model.get_text_embedding_batch)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._model.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await self._model.aget_query_embedding(query)
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    A retriever with a two-level cache: query text to embedding, and normalized query plus top-k
+    to retrieved nodes. Repeated questions skip both the embedding API and the vector search,
+    and rephrasings that only differ in case or spacing reuse the retrieved nodes.
+
+    Attributes:
+        retriever (BaseRetriever): The vector index retriever.
+        embed_model (BaseEmbedding): Model used to embed the queries.
+        k (int): Number of nodes the retriever returns.
+        embeddings (LRUCache[List[float]]): Query embeddings by query text.
+        results (LRUCache[List[NodeWithScore]]): Retrieved nodes by normalized query and k.
+    """
+
+    def __init__(self, retriever: BaseRetriever, embed_model: BaseEmbedding, k: int) -> None:
+        """
+        Initializes the retriever with empty caches sized by settings.chat.
+
+        Args:
+            retriever (BaseRetriever): The vector index retriever to wrap.
+            embed_model (BaseEmbedding): Model used to embed the queries.
+            k (int): Number of nodes the retriever returns.
+        """
+        super().__init__()
+        self.retriever = retriever
+        self.embed_model = embed_model
+        self.k = k
+        self.embeddings: LRUCache[List[float]] = LRUCache(maxsize=settings.chat.EMBEDDING_CACHE_SIZE)
+        self.results: LRUCache[List[NodeWithScore]] = LRUCache(
+            maxsize=settings.chat.RETRIEVAL_CACHE_SIZE,
+            ttl=settings.chat.RETRIEVAL_CACHE_TTL
+        )
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        """
+        Retrieves the nodes for a query from the cache, or embeds and searches it and caches the result.
+
+        Args:
+            query_bundle (QueryBundle): The query.
+
+        Returns:
+            List[NodeWithScore]: The retrieved nodes, most similar first.
+        """
+        key = (normalize_question(query_bundle.query_str), self.k)
+        nodes = self.results.get(key)
+        if nodes is not None:
+            return list(nodes)
+
+        embedding = query_bundle.embedding or self.embeddings.get(query_bundle.query_str)
+        if embedding is None:
+            embedding = self.embed_model.get_query_embedding(query_bundle.query_str)
+            self.embeddings.set(query_bundle.query_str, embedding)
+
+        nodes = self.retriever.retrieve(QueryBundle(query_str=query_bundle.query_str, embedding=embedding))
+        self.results.set(key, nodes)
+        return list(nodes)
+
+    def clear(self) -> None:
+        """
+        Removes the cached retrieval results, after the vector store has changed. Embeddings only
+        depend on the query text and stay cached.
+        """
+        self.results.clear()
+
+
 class RAG:
     """
     A Retrieval-Augmented Generation (RAG) system for answering restaurant-related
@@ -21,29 +177,50 @@ class RAG:
 
     Attributes:
         db_path (str): Path to the Chroma database.
-        collection_name (str): Name of the collection within the Chroma database.
-        embed_model (OpenAIEmbedding): Model used to generate embeddings for documents.
+        collection_name (str): Name of the version of the collection within the Chroma database.
+        embed_model (BaseEmbedding): Model used to generate embeddings for documents, backed by the shared embedding store.
         splitter (SentenceSplitter): Tool for splitting text into nodes.
         vector_store (Optional[ChromaVectorStore]): Vector store for storing document embeddings.
         index (Optional[VectorStoreIndex]): Index for document retrieval.
         query_engine (Optional[QueryEngineTool]): Engine for querying the vector store.
+        retriever (Optional[CachedRetriever]): Cached retriever used by the query engine and the direct response mode.
+        compactor (ContextCompactor): Merges, deduplicates and trims the retrieved chunks.
+        query_engine_tool (Optional[QueryEngineTool]): Tool exposing the query engine to agents.
+        llm (Optional[OpenAI]): Language model client shared by all agents.
         agent (Optional[OpenAIAgent]): Language model agent used for generating responses.
+
+    The vector store, index, query engine and language model client are stateless and can be
+    shared by all conversations, while each conversation gets its own agent from create_agent().
     """
     
-    def __init__(self) -> None:
+    def __init__(self, collection_name: Optional[str] = None) -> None:
         """
         Initializes the RAG class with configurations from settings.chat.
+
+        Args:
+            collection_name (Optional[str]): The collection to use, by default the active version.
         """
-        self.db_path: str = settings.CHAT.CHROMA_DB_PATH
-        self.collection_name: str = settings.CHAT.CHROMA_COLLECTION_NAME
-        self.embed_model: OpenAIEmbedding = OpenAIEmbedding(model=settings.CHAT.EMBED_MODEL)
+        self.db_path: str = settings.chat.CHROMA_DB_PATH
+        self.collection_name: str = collection_name or chat_index_pointer().active()
+        self.embed_model: BaseEmbedding = StoreEmbedding(
+            get_embedding_store(),
+            OpenAIEmbedding(model=settings.embeddings.MODEL)
+        )
         self.splitter: SentenceSplitter = SentenceSplitter(
-            chunk_size=settings.CHAT.CHUNK_SIZE, 
-            chunk_overlap=settings.CHAT.CHUNK_OVERLAP
+            chunk_size=settings.chat.CHUNK_SIZE, 
+            chunk_overlap=settings.chat.CHUNK_OVERLAP,
+            id_func=node_id
         )
         self.vector_store: Optional[ChromaVectorStore] = None
         self.index: Optional[VectorStoreIndex] = None
         self.query_engine: Optional[QueryEngineTool] = None
+        self.retriever: Optional[CachedRetriever] = None
+        self.compactor: ContextCompactor = ContextCompactor(
+            token_limit=settings.chat.CONTEXT_TOKEN_LIMIT,
+            duplicate_threshold=settings.chat.DUPLICATE_THRESHOLD
+        )
+        self.query_engine_tool: Optional[QueryEngineTool] = None
+        self.llm: Optional[OpenAI] = None
         self.agent: Optional[OpenAIAgent] = None
 
     def _setup_vector_store(self) -> ChromaVectorStore:
@@ -62,21 +239,90 @@ class RAG:
     
     def save_documents(self, documents: List[Document]) -> None:
         """
-        Saves documents to the vector store by creating an index and storing
-        document nodes with embeddings.
+        Adds documents to the vector store. Every build writes a new collection version, and
+        chunks whose text is in the shared embedding store are not embedded again.
 
         Args:
-            documents (List[Document]): A list of Document objects to be indexed.
+            documents (List[Document]): A list of Document objects created with make_document.
         """
         self.vector_store = self._setup_vector_store()
-        storage_context = StorageContext.from_defaults(vector_store=self.vector_store)
-        
         nodes = self.splitter.get_nodes_from_documents(documents)
-        self.index = VectorStoreIndex(
-            nodes,
-            storage_context=storage_context, 
-            embed_model=self.embed_model
-        )
+        print(f"Adding {len(nodes)} chunks of {len(documents)} documents.")
+
+        self._embed_and_add(nodes)
+        if nodes:
+            # Recorded so loading the collection can check the model without an embedding request
+            collection = self.vector_store.client
+            collection.modify(metadata={
+                **(collection.metadata or {}),
+                'embedding_model': settings.embeddings.MODEL,
+                'embedding_dimension': len(nodes[0].embedding),
+            })
+        self.index = None
+        if self.retriever is not None and nodes:
+            self.retriever.clear()
+
+    def _embed_and_add(self, nodes: List[BaseNode]) -> None:
+        """
+        Embeds nodes in batches of settings.chat.EMBED_BATCH_SIZE, with at most
+        settings.chat.EMBED_CONCURRENCY requests at a time, and adds each batch to the vector store.
+
+        Args:
+            nodes (List[BaseNode]): The nodes to embed and add.
+        """
+        batch_size = settings.chat.EMBED_BATCH_SIZE
+        batches = [nodes[i:i + batch_size] for i in range(0, len(nodes), batch_size)]
+
+        def embed(batch: List[BaseNode]) -> List[BaseNode]:
+            texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in batch]
+            for node, embedding in zip(batch, self.embed_model.get_text_embedding_batch(texts)):
+                node.embedding = embedding
+            return batch
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=settings.chat.EMBED_CONCURRENCY) as executor:
+            futures = [executor.submit(embed, batch) for batch in batches]
+            for future in as_completed(futures):
+                # Batches are added as they finish, so an interrupted run keeps its progress
+                batch = future.result()
+                self.vector_store.add(batch)
+                done += len(batch)
+                print(f"Embedded {done}/{len(nodes)} chunks.")
+
+    def check_embedding_dimension(self) -> None:
+        """
+        Checks that the stored chunks were embedded with the dimension of settings.embeddings.MODEL.
+        Collections built with an earlier model, e.g. text-embedding-ada-002, cannot be queried
+        with embeddings of the current model and have to be rebuilt.
+
+        Builds record their model and dimension in the collection metadata. Only collections
+        without it are checked against the dimension of an embedding request.
+
+        Raises:
+            ValueError: If the stored embeddings were built with another model or have a different dimension than the model.
+        """
+        collection = self._setup_vector_store().client
+        stored = collection.get(limit=1, include=['embeddings'])['embeddings']
+        if stored is None or len(stored) == 0:
+            return
+
+        metadata = collection.metadata or {}
+        if 'embedding_model' in metadata:
+            if metadata['embedding_model'] == settings.embeddings.MODEL and metadata.get('embedding_dimension') == len(stored[0]):
+                return
+            raise ValueError(
+                f"{self.collection_name} was embedded with {metadata['embedding_model']}, but "
+                f"{settings.embeddings.MODEL} is configured. "
+                "Rebuild the chat vector store with `python -m apps.chat.rag`."
+            )
+
+        expected = len(self.embed_model.get_query_embedding("restaurant"))
+        if len(stored[0]) != expected:
+            raise ValueError(
+                f"{self.collection_name} holds embeddings of dimension {len(stored[0])}, but "
+                f"{settings.embeddings.MODEL} embeds in {expected} dimensions. "
+                "Rebuild the chat vector store with `python -m apps.chat.rag`."
+            )
 
     def load_index(self) -> None:
         """
@@ -85,7 +331,8 @@ class RAG:
         """
         if self.index is None:
             self.vector_store = self._setup_vector_store()
-            
+            self.check_embedding_dimension()
+
             self.index = VectorStoreIndex.from_vector_store(
                 vector_store=self.vector_store,
                 embed_model=self.embed_model
@@ -100,19 +347,22 @@ class RAG:
             k (int): Number of top similar documents to retrieve.
         """
         self.load_index()
+        if self.retriever is None:
+            self.retriever = CachedRetriever(self.index.as_retriever(similarity_top_k=k), self.embed_model, k)
         if self.query_engine is None:
-            self.query_engine = self.index.as_query_engine(
-                similarity_top_k=k, response_mode='context_only', verbose=True
+            self.query_engine = RetrieverQueryEngine.from_args(
+                self.retriever, response_mode='context_only', verbose=True,
+                node_postprocessors=[self.compactor]
             )
 
-    def load_agent(self) -> None:
+    def load_tools(self) -> None:
         """
-        Loads or creates an OpenAIAgent for handling queries. Initializes
-        the query engine if not already initialized.
+        Loads the query engine tool and the language model client used by the agents.
+        Initializes the query engine if not already initialized.
         """
         self.load_query_engine()
-        if self.agent is None:
-            query_engine_tool = QueryEngineTool(
+        if self.query_engine_tool is None:
+            self.query_engine_tool = QueryEngineTool(
                 query_engine=self.query_engine,
                 metadata=ToolMetadata(
                     name='docs',
@@ -122,49 +372,169 @@ class RAG:
                     )
                 )
             )
-            self.agent = OpenAIAgent.from_tools(
-                [query_engine_tool],
-                llm=OpenAI(settings.CHAT.OPENAI_MODEL, temperature=settings.CHAT.OPENAI_TEMPERATURE),
-                system_prompt=settings.CHAT.SYSTEM_PROMPT,
-                verbose=True
-            )
+        if self.llm is None:
+            self.llm = OpenAI(settings.chat.OPENAI_MODEL, temperature=settings.chat.OPENAI_TEMPERATURE)
+
+    def create_agent(self) -> OpenAIAgent:
+        """
+        Creates a new OpenAIAgent for one conversation. The agent only holds the conversation
+        memory and shares the query engine and language model client with all other agents.
+
+        Returns:
+            OpenAIAgent: The agent for the conversation.
+        """
+        self.load_tools()
+        return OpenAIAgent.from_tools(
+            [self.query_engine_tool],
+            llm=self.llm,
+            system_prompt=settings.chat.SYSTEM_PROMPT,
+            verbose=True
+        )
+
+    def create_memory(self) -> ChatSummaryMemoryBuffer:
+        """
+        Creates the memory of one conversation. It keeps the latest messages verbatim within
+        settings.chat.MEMORY_TOKEN_LIMIT tokens and folds older messages into a rolling summary,
+        so the prompt size stays constant however long the conversation gets.
+
+        Returns:
+            ChatSummaryMemoryBuffer: The memory for the conversation.
+        """
+        self.load_tools()
+        return ChatSummaryMemoryBuffer.from_defaults(
+            llm=self.llm,
+            token_limit=settings.chat.MEMORY_TOKEN_LIMIT,
+            summarize_prompt=settings.chat.SUMMARY_PROMPT
+        )
+
+    def load_agent(self) -> None:
+        """
+        Loads or creates the default OpenAIAgent for handling queries.
+        """
+        if self.agent is None:
+            self.agent = self.create_agent()
         
-    def generate_response(self, message: str, chat_history: List[ChatMessage]) -> Generator[str, None, None]:
+    def generate_response(
+        self,
+        message: str,
+        chat_history: List[ChatMessage],
+        agent: Optional[OpenAIAgent] = None,
+        mode: Optional[str] = None
+    ) -> Generator[str, None, None]:
         """
-        Generates a response using the language model agent based on the provided
-        message and chat history.
+        Generates a response based on the provided message and chat history, with the response
+        mode set in settings.chat.RESPONSE_MODE.
+
+        In the 'agent' mode the agent first writes a query for the docs tool and then answers,
+        which takes two language model calls. In the 'direct' mode the documents are retrieved
+        for the message itself and the answer is streamed from a single call.
 
         Args:
             message (str): The user's message to respond to.
-            chat_history (List[Dict[str, Union[str, Any]]]): A list of previous chat messages.
+            chat_history (List[ChatMessage]): The previous chat messages, without the message itself.
+            agent (Optional[OpenAIAgent]): The agent of the conversation, defaults to the shared agent.
+            mode (Optional[str]): 'agent' or 'direct', defaults to settings.chat.RESPONSE_MODE.
 
         Returns:
-            Generator[str, None, None]: A streaming response generator from the agent.
+            Generator[str, None, None]: A streaming response generator.
         """
-        self.load_agent()
-        return self.agent.stream_chat(
+        mode = mode or settings.chat.RESPONSE_MODE
+        if mode == 'direct':
+            return self.stream_direct(message, chat_history)
+
+        if agent is None:
+            self.load_agent()
+            agent = self.agent
+        return agent.stream_chat(
             message=message, 
             chat_history=chat_history, 
             tool_choice='docs'
         ).response_gen
 
+    def stream_direct(self, message: str, chat_history: List[ChatMessage]) -> Generator[str, None, None]:
+        """
+        Retrieves the documents for a message and streams the answer over them in one language model call.
+
+        Follow-up questions often leave out the subject, so the previous user message is added
+        to the retrieval query instead of rewriting it with a language model.
+
+        Args:
+            message (str): The user's message to respond to.
+            chat_history (List[ChatMessage]): The previous chat messages, without the message itself.
+
+        Yields:
+            str: The chunks of the answer.
+        """
+        self.load_tools()
+        previous = [m.content for m in chat_history if m.role == MessageRole.USER and m.content]
+        query = f"{previous[-1]}\n{message}" if previous else message
+
+        nodes = self.compactor.postprocess_nodes(self.retriever.retrieve(query), query_str=query)
+        context = "\n\n".join(node.node.get_content(metadata_mode=MetadataMode.LLM) for node in nodes)
+        messages = [
+            ChatMessage(
+                role=MessageRole.SYSTEM,
+                content=settings.chat.SYSTEM_PROMPT + settings.chat.CONTEXT_PROMPT.format(context=context)
+            ),
+            *chat_history,
+            ChatMessage(role=MessageRole.USER, content=message)
+        ]
+
+        for chunk in self.llm.stream_chat(messages):
+            yield chunk.delta or ''
+
     
+def chat_index_pointer() -> IndexPointer:
+    """
+    Returns the pointer to the active version of the chat collection.
+
+    Returns:
+        IndexPointer: The pointer of settings.chat.CHROMA_COLLECTION_NAME.
+    """
+    return IndexPointer(settings.chat.CHROMA_DB_PATH, settings.chat.CHROMA_COLLECTION_NAME)
+
 def main() -> None:
     """
-    Main function to initialize the RAG system, retrieve restaurant data
-    from the database, and save it into the vector store.
+    Main function to build a new version of the vector store from the restaurant articles in the
+    database, validate it and activate it. The chat app keeps using the previous version until then.
     """
     session = Session()
     articles = session.query(RestaurantContent).all()
 
-    documents = [
-        Document(text=article.content, metadata={'name': article.name, 'source': article.source})
-        for article in articles if article.content
-    ]
+    # A chain listed in several cities has the same articles in each of them
+    documents = list({
+        document.doc_id: document
+        for document in (make_document(article.name, article.source, article.content) for article in articles if article.content)
+    }.values())
+    session.close()
+
+    def build(collection_name: str) -> None:
+        # Unchanged chunks are read from the embedding store, so a full rebuild only embeds new text
+        RAG(collection_name).save_documents(documents)
+
+    def validate(collection_name: str) -> None:
+        rag = RAG(collection_name)
+        collection = rag._setup_vector_store().client
+        rag.check_embedding_dimension()
+        stored = {metadata.get('document_id') for metadata in collection.get(include=['metadatas'])['metadatas']}
+        if stored != {document.doc_id for document in documents}:
+            raise ValueError(f"{collection_name} holds {len(stored)} documents instead of {len(documents)}.")
+        # A stored chunk must find itself through the vector index
+        if documents:
+            probe = collection.get(limit=1, include=['embeddings'])
+            result = collection.query(query_embeddings=probe['embeddings'], n_results=1)
+            if result['ids'][0] != probe['ids']:
+                raise ValueError(f"The probe query on {collection_name} did not return its chunk.")
+
+    def drop(collection_name: str) -> None:
+        try:
+            chromadb.PersistentClient(path=settings.chat.CHROMA_DB_PATH).delete_collection(collection_name)
+        except ValueError:
+            # The collection was never created
+            pass
 
-    rag = RAG()
-    rag.save_documents(documents)
-    print("Documents have been added to the vector store.")
+    collection_name = build_version(chat_index_pointer(), build, validate, drop, settings.chat.INDEX_RETENTION_HOURS * 3600)
+    print(f"Documents have been added to the vector store {collection_name}.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,126 @@
+from typing import List, Optional
+from llama_index.core.schema import NodeWithScore, TextNode
+from apps.chat.compaction import ContextCompactor
+
+
+def chunk(text: str, start: Optional[int], score: float, source: str = "article-1", name: str = "Rozey") -> NodeWithScore:
+    """
+    Builds a retrieved chunk of an article.
+
+    Args:
+        text (str): Text of the chunk.
+        start (Optional[int]): Offset of the chunk in the article, None for a node without offsets.
+        score (float): Retrieval score.
+        source (str): Article the chunk belongs to.
+        name (str): Restaurant the article is about.
+
+    Returns:
+        NodeWithScore: The chunk.
+    """
+    node = TextNode(
+        text=text,
+        metadata={"name": name, "source": source},
+        start_char_idx=start,
+        end_char_idx=start + len(text) if start is not None else None,
+        excluded_llm_metadata_keys=["name", "source"],
+    )
+    return NodeWithScore(node=node, score=score)
+
+
+def texts(nodes: List[NodeWithScore]) -> List[str]:
+    """
+    Returns the text of each node.
+
+    Args:
+        nodes (List[NodeWithScore]): The nodes.
+
+    Returns:
+        List[str]: The texts.
+    """
+    return [node.node.get_content() for node in nodes]
+
+
+def test_merge_contiguous_chunks_without_extra_space() -> None:
+    """
+    Tests that chunks that continue each other are joined as is, and chunks split at whitespace
+    are joined with a single space.
+    """
+    merged = ContextCompactor._merge_adjacent([chunk("Een gezellige bis", 0, 0.5), chunk("tro aan de Maas.", 17, 0.7)])
+    assert texts(merged) == ["Een gezellige bistro aan de Maas."]
+    assert merged[0].score == 0.7
+
+    merged = ContextCompactor._merge_adjacent([chunk("Een gezellige bistro.", 0, 0.5), chunk("Aan de Maas.", 22, 0.4)])
+    assert texts(merged) == ["Een gezellige bistro. Aan de Maas."]
+
+    merged = ContextCompactor._merge_adjacent([chunk("Een gezellige bistro. ", 0, 0.5), chunk("Aan de Maas.", 22, 0.4)])
+    assert texts(merged) == ["Een gezellige bistro. Aan de Maas."]
+
+
+def test_merge_overlapping_chunks() -> None:
+    """
+    Tests that the overlap of two chunks appears once in the merged text, and that a chunk
+    contained in another adds nothing.
+    """
+    merged = ContextCompactor._merge_adjacent([chunk("brown fox jumps", 10, 0.2), chunk("The quick brown fox", 0, 0.9)])
+    assert texts(merged) == ["The quick brown fox jumps"]
+    assert (merged[0].node.start_char_idx, merged[0].node.end_char_idx) == (0, 25)
+
+    merged = ContextCompactor._merge_adjacent([chunk("The quick brown fox", 0, 0.9), chunk("quick", 4, 0.2)])
+    assert texts(merged) == ["The quick brown fox"]
+
+
+def test_merge_keeps_separate_passages() -> None:
+    """
+    Tests that distant chunks, chunks of different articles and nodes without offsets are not merged.
+    """
+    nodes = [
+        chunk("Eerste alinea.", 0, 0.9),
+        chunk("Laatste alinea.", 500, 0.8),
+        chunk("Ander artikel.", 14, 0.7, source="article-2"),
+        chunk("Beschrijving.", None, 0.6),
+    ]
+    assert sorted(texts(ContextCompactor._merge_adjacent(nodes))) == sorted(texts(nodes))
+
+
+def test_drop_duplicates() -> None:
+    """
+    Tests that a less relevant chunk whose words are mostly in a more relevant chunk is dropped.
+    """
+    compactor = ContextCompactor(duplicate_threshold=0.8)
+    nodes = [
+        chunk("Rozey serveert verse pasta en pizza", 0, 0.9),
+        chunk("Rozey serveert verse pasta", 100, 0.5, source="copy"),
+        chunk("Het terras kijkt uit over de haven", 200, 0.4),
+    ]
+    assert texts(compactor._drop_duplicates(nodes)) == [
+        "Rozey serveert verse pasta en pizza", "Het terras kijkt uit over de haven"
+    ]
+
+
+def test_trim_shares_the_budget_per_restaurant() -> None:
+    """
+    Tests that a long passage is shortened to its restaurant's share of the token budget, so the
+    next restaurant still fits, and that passages are dropped once the budget is used up.
+    """
+    compactor = ContextCompactor(token_limit=120)
+    nodes = [
+        chunk(" ".join(["lang"] * 200), 0, 0.9, name="Rozey"),
+        chunk(" ".join(["kort"] * 30), 0, 0.8, source="article-2", name="Shiki"),
+        chunk(" ".join(["extra"] * 40), 0, 0.7, source="article-3", name="Shiki"),
+    ]
+    trimmed = compactor._trim(nodes, str.split)
+
+    assert [len(text.split()) for text in texts(trimmed)] == [60, 30]
+    assert sum(len(text.split()) for text in texts(trimmed)) <= compactor.token_limit
+
+
+def test_group_by_restaurant() -> None:
+    """
+    Tests that nodes are grouped by restaurant, with the restaurant of the most relevant node first.
+    """
+    nodes = [
+        chunk("a", 0, 0.9, name="Rozey"),
+        chunk("b", 0, 0.8, source="article-2", name="Shiki"),
+        chunk("c", 0, 0.7, source="article-3", name="Rozey"),
+    ]
+    assert texts(ContextCompactor._group_by_restaurant(nodes)) == ["a", "c", "b"]
@@ -0,0 +1,66 @@
+from pathlib import Path
+from typing import List
+import pytest
+from apps.chat import rag
+from apps.chat.rag import RAG, StoreEmbedding, make_document
+from config import settings
+from data.embeddings import EmbeddingStore
+
+
+@pytest.fixture
+def chat_store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    """
+    Puts the chat collections and the embedding store in a temporary directory and replaces the
+    embedding model, recording the queries it is asked to embed.
+
+    Args:
+        tmp_path (Path): Temporary directory for the collections.
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the settings and the embedding model.
+
+    Returns:
+        List[str]: The queries embedded with the model.
+    """
+    queries: List[str] = []
+    monkeypatch.setattr(settings.chat, "CHROMA_DB_PATH", str(tmp_path / "chroma"))
+    monkeypatch.setattr(rag, "get_embedding_store", lambda: EmbeddingStore(str(tmp_path / "embeddings.db"), settings.embeddings.MODEL))
+    monkeypatch.setattr(StoreEmbedding, "_get_text_embeddings", lambda self, texts: [[float(len(text)), 1.0, 0.0] for text in texts])
+    monkeypatch.setattr(StoreEmbedding, "_get_query_embedding", lambda self, query: queries.append(query) or [1.0, 0.0, 0.0])
+    return queries
+
+
+def build(collection_name: str) -> None:
+    """
+    Builds a chat collection with one article.
+
+    Args:
+        collection_name (str): The collection to build.
+    """
+    RAG(collection_name).save_documents([make_document("Rozey", "https://example.com/rozey", "Verse pasta aan de Maas.")])
+
+
+def test_dimension_check_uses_build_metadata(chat_store: List[str]) -> None:
+    """
+    Tests that a collection records its embedding model and dimension at build time, so loading
+    it checks the dimension without an embedding request.
+
+    Args:
+        chat_store (List[str]): The queries embedded with the model.
+    """
+    build("chat_v1")
+    RAG("chat_v1").check_embedding_dimension()
+    assert chat_store == []
+
+
+def test_collection_of_another_model_must_be_rebuilt(chat_store: List[str], monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that a collection built with another embedding model is rejected from its metadata.
+
+    Args:
+        chat_store (List[str]): The queries embedded with the model.
+        monkeypatch (pytest.MonkeyPatch): Fixture to change the configured model.
+    """
+    build("chat_v1")
+    monkeypatch.setattr(settings.embeddings, "MODEL", "text-embedding-3-small")
+    with pytest.raises(ValueError, match="Rebuild the chat vector store"):
+        RAG("chat_v1").check_embedding_dimension()
+    assert chat_store == []
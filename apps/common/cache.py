@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalizes a question for use in cache keys by lowercasing it and collapsing whitespace.
+
+    Args:
+        question (str): The user question.
+
+    Returns:
+        str: The normalized question.
+    """
+    return " ".join(question.lower().split())
+
+
+class LRUCache(Generic[T]):
+    """
+    A thread-safe least-recently-used cache with an optional time-to-live per entry.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None) -> None:
+        """
+        Initializes the cache.
+
+        Args:
+            maxsize (int): Maximum number of entries before the least recently used one is evicted.
+            ttl (Optional[float]): Number of seconds after which an entry expires (optional).
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, T]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[T]:
+        """
+        Returns the cached value for a key, or None if it is missing or expired.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            Optional[T]: The cached value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: T) -> None:
+        """
+        Stores a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key (Hashable): The cache key.
+            value (T): The value to store.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the number of entries, hits and misses of the cache.
+
+        Returns:
+            Dict[str, int]: Cache statistics.
+        """
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -1,15 +1,195 @@
-from flask import Flask, render_template, request, jsonify
-from apps.search.vectorstore import VectorStore
+from flask import Flask, Response, abort, g, render_template, request, jsonify, send_from_directory
+from apps.common.cache import normalize_question
+from apps.search.pipeline import SearchPipeline, InvalidCursorError
+from apps.search.cache import DataVersionWatcher, VersionedCache, get_persistent_cache, make_digest
+from apps.search.catalog import load_catalog
+from apps.search.metrics import current_timings, log_request, metrics
+from apps.search.query_log import QueryLog, query_log_entry
+from config import settings
 from data.scheme import Session, RestaurantData
-from data.crud import get_complete_restaurant_data, get_unique_filter_values
+from data.crud import get_filter_value_counts
+from data.thumbnails import thumbnail_path
 from sqlalchemy.orm import Query
 from sqlalchemy import or_
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Initialize the vector store
-vector_store = VectorStore()
+FILTER_FEATURES = ['meal_type', 'district', 'restaurant_type', 'price_level', 'city']
+
+# Thumbnails are named by their content hash, see data/thumbnails.py
+THUMBNAIL_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z]+$")
+
+# Track the data version so cached data is rebuilt after ingestion
+data_version_watcher = DataVersionWatcher(settings.search.DATA_VERSION_CHECK_INTERVAL)
+
+# The restaurant catalog is kept in memory and in sync with the data version
+catalog = VersionedCache(load_catalog, data_version_watcher)
+metrics.register_cache('catalog', catalog.stats)
+
+# Log every search asynchronously, to warm the caches with the popular queries offline
+query_log = QueryLog(settings.search.QUERY_LOG_PATH, settings.search.QUERY_LOG_QUEUE_SIZE) if settings.search.QUERY_LOG_PATH else None
+
+# The vector stores, LLM client and catalog are loaded once by warm_up(), not at import time.
+# Every city has its own pipeline, searching only the vector partition of that city.
+search_pipelines: Dict[str, SearchPipeline] = {}
+# Guards the per-city locks and the warm-up thread; each city is set up under its own lock
+warm_up_lock = threading.Lock()
+city_locks: Dict[str, threading.Lock] = {}
+warm_up_done = threading.Event()
+warm_up_thread: Optional[threading.Thread] = None
+warm_up_error: Optional[str] = None
+
+def warm_up(city: Optional[str] = None) -> SearchPipeline:
+    """
+    Load the catalog and initialize the vector store, LLM client and query pipeline of a city, once per process.
+
+    LangChain, Chroma and the OpenAI clients are imported here rather than at module import,
+    so a worker starts serving health checks and cached routes immediately. The default city is
+    warmed up by start_warm_up(), other cities on their first search. A city that is set up
+    already is returned without locking, and setting up one city does not block the others.
+
+    Args:
+        city (Optional[str]): Key of the city, by default settings.DEFAULT_CITY.
+
+    Returns:
+        SearchPipeline: The initialized query pipeline of the city.
+    """
+    global warm_up_error
+    city = city or settings.DEFAULT_CITY
+    pipeline = search_pipelines.get(city)
+    if pipeline is not None:
+        return pipeline
+
+    with warm_up_lock:
+        city_lock = city_locks.setdefault(city, threading.Lock())
+    with city_lock:
+        if city in search_pipelines:
+            return search_pipelines[city]
+
+        start = time.perf_counter()
+        try:
+            from apps.search.vectorstore import VectorStore
+
+            catalog.get()
+            pipeline = SearchPipeline(VectorStore(city=city), catalog)
+        except Exception as e:
+            if city == settings.DEFAULT_CITY:
+                warm_up_error = str(e)
+            logger.error(f"Warm-up of {city} failed: {e}")
+            raise
+
+        metrics.register_cache('rankings' if city == settings.DEFAULT_CITY else f'rankings_{city}', pipeline.rankings.stats)
+        persistent_cache = get_persistent_cache()
+        if persistent_cache is not None:
+            metrics.register_cache('persistent', persistent_cache.stats)
+        search_pipelines[city] = pipeline
+        if city == settings.DEFAULT_CITY:
+            warm_up_error = None
+            warm_up_done.set()
+        logger.info(f"Warm-up of {city} completed in {time.perf_counter() - start:.2f}s.")
+        return pipeline
+
+def start_warm_up() -> None:
+    """
+    Start warming up in a background thread, unless warm-up is done or already running.
+
+    Call this from the WSGI server's worker start hook to load the resources before the first request.
+    """
+    global warm_up_thread
+    with warm_up_lock:
+        if warm_up_done.is_set() or (warm_up_thread is not None and warm_up_thread.is_alive()):
+            return
+
+        def run() -> None:
+            try:
+                warm_up()
+            except Exception:
+                pass  # Logged by warm_up, reported by /ready and retried on the next call
+
+        warm_up_thread = threading.Thread(target=run, name="search-warm-up", daemon=True)
+        warm_up_thread.start()
+
+@app.before_request
+def start_request_timer() -> None:
+    """
+    Assign a request id and start timing the request and its stages.
+    """
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.request_start = time.perf_counter()
+    g.timings = {}
+    g.timings_token = current_timings.set(g.timings)
+    g.request_recorded = False
+    metrics.request_started()
+
+@app.after_request
+def record_request(response: Response) -> Response:
+    """
+    Record the latency of the request in the metrics and log its stage timings.
+
+    Args:
+        response (Response): The response being sent.
+
+    Returns:
+        Response: The response with the request id header.
+    """
+    finish_request(response.status_code)
+    response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.teardown_request
+def teardown_request_timer(exception: Optional[BaseException]) -> None:
+    """
+    Record requests that failed before a response was made and reset the stage timings.
+
+    Args:
+        exception (Optional[BaseException]): The unhandled exception, if any.
+    """
+    if 'request_start' not in g:
+        return
+    finish_request(500)
+    current_timings.reset(g.timings_token)
+
+def finish_request(status: int) -> None:
+    """
+    Record a request once in the metrics and the structured log.
+
+    Args:
+        status (int): HTTP status code of the response.
+    """
+    if g.request_recorded:
+        return
+    g.request_recorded = True
+    seconds = time.perf_counter() - g.request_start
+    endpoint = request.endpoint or 'unknown'
+    metrics.request_finished(endpoint, status, seconds)
+    log_request(g.request_id, endpoint, status, seconds, g.timings)
+
+def parse_city(payload: Dict[str, Any]) -> str:
+    """
+    Parse the optional `city` of a request payload.
+
+    Args:
+        payload (Dict[str, Any]): The JSON payload of the request.
+
+    Returns:
+        str: The city key, settings.DEFAULT_CITY if not given.
+
+    Raises:
+        ValueError: If the city is not configured.
+    """
+    city = payload.get('city') or settings.DEFAULT_CITY
+    if city not in settings.cities:
+        raise ValueError(f"Unknown city '{city}'.")
+    return city
 
 def apply_filters(query: Query, filters: List[str], field: str) -> Query:
     """
@@ -27,6 +207,29 @@ def apply_filters(query: Query, filters: List[str], field: str) -> Query:
         query = query.filter(or_(*[getattr(RestaurantData, field).contains(f) for f in filters]))
     return query
 
+@app.route(f"{settings.thumbnails.URL_PREFIX}/<name>")
+def thumbnail(name: str) -> Response:
+    """
+    Serve a restaurant thumbnail from the local store.
+
+    Thumbnails are content-addressed, so a file never changes and is cached by clients for
+    settings.thumbnails.MAX_AGE seconds without revalidation.
+
+    Args:
+        name (str): File name of the thumbnail.
+
+    Returns:
+        Response: The thumbnail, or 404 if it does not exist.
+    """
+    if not THUMBNAIL_NAME.match(name):
+        abort(404)
+
+    directory = os.path.abspath(os.path.dirname(thumbnail_path(name)))
+    response = send_from_directory(directory, name, max_age=settings.thumbnails.MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 @app.route("/")
 def index() -> str:
     """
@@ -35,12 +238,13 @@ def index() -> str:
     Returns:
         str: The rendered HTML template for the index page.
     """
-    return render_template("index.html")
+    return render_template("index.html", default_city=settings.DEFAULT_CITY)
 
 @app.route('/get_filtered_names', methods=['POST'])
 def get_filtered_names() -> Dict[str, Any]:
     """
     Retrieve names of restaurants matching filter criteria with substring matching.
+    Cities are matched exactly.
 
     Returns:
         Dict[str, Any]: JSON response containing a list of matching restaurant names.
@@ -53,9 +257,12 @@ def get_filtered_names() -> Dict[str, Any]:
         districts = payload.get('district', [])
         restaurant_types = payload.get('restaurant_type', [])
         price_levels = payload.get('price_level', [])
+        cities = payload.get('city', [])
 
         # Build query with reusable helper
         query = session.query(RestaurantData.name)
+        if cities:
+            query = query.filter(RestaurantData.city.in_(cities))
         query = apply_filters(query, meal_types, 'meal_type')
         query = apply_filters(query, districts, 'district')
         query = apply_filters(query, restaurant_types, 'restaurant_type')
@@ -68,47 +275,178 @@ def get_filtered_names() -> Dict[str, Any]:
 
     return jsonify(names=names)
 
-@app.route('/get_filter_options', methods=['GET'])
-def get_filter_options() -> Dict[str, Any]:
+def load_filter_options(version: int) -> Tuple[bytes, str]:
     """
-    Retrieve unique filter options for restaurant attributes.
+    Compute the filter options and their counts, serialized as a JSON response body.
+
+    Args:
+        version (int): The data version the options are computed for.
 
     Returns:
-        Dict[str, Any]: JSON response containing filter options for each feature.
+        Tuple[bytes, str]: The JSON body and its ETag.
     """
     session = Session()
     try:
-        features = ['meal_type', 'district', 'restaurant_type', 'price_level']
-        filter_options = get_unique_filter_values(session, features)
+        counts = get_filter_value_counts(session, FILTER_FEATURES)
     finally:
         # Close the session after the query is done
         session.close()
 
-    return jsonify(filter_options)
+    filter_options: Dict[str, Any] = {feature: list(values) for feature, values in counts.items()}
+    filter_options['counts'] = counts
+
+    body = app.json.dumps(filter_options).encode('utf-8')
+    return body, make_digest(version, body)
+
+filter_options_cache = VersionedCache(load_filter_options, data_version_watcher)
+metrics.register_cache('filter_options', filter_options_cache.stats)
+
+@app.route('/get_filter_options', methods=['GET'])
+def get_filter_options() -> Response:
+    """
+    Retrieve unique filter options and their restaurant counts for restaurant attributes.
+
+    The options are computed once per data version and served from memory. The response
+    carries an ETag and Cache-Control header, so clients can revalidate with a 304 response.
+
+    Returns:
+        Response: JSON response containing filter options for each feature.
+    """
+    _, (body, etag) = filter_options_cache.get()
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = settings.search.FILTER_OPTIONS_MAX_AGE
+    response.cache_control.must_revalidate = True
+    return response.make_conditional(request)
+
+def parse_page_params(payload: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse the optional page size `k` and candidate pool size `candidates` from a request payload.
+
+    Args:
+        payload (Dict[str, Any]): The JSON payload of the request.
+
+    Returns:
+        Tuple[Optional[int], Optional[int]]: The page size and candidate pool size, None if not given.
+
+    Raises:
+        ValueError: If a value is not a positive integer.
+    """
+    values = []
+    for key in ('k', 'candidates'):
+        value = payload.get(key)
+        if value is not None:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"'{key}' must be an integer.")
+            if value < 1:
+                raise ValueError(f"'{key}' must be positive.")
+        values.append(value)
+    return values[0], values[1]
 
 @app.route("/query", methods=["POST"])
 def query() -> Dict[str, Any]:
     """
-    Retrieve detailed restaurant data based on user query and filters.
+    Retrieve one page of detailed restaurant data based on user query and filters.
+
+    The JSON payload may contain a `city`, a page size `k`, a candidate pool size `candidates`
+    and the `cursor` returned with the previous page. Only the vector partition of the city is searched.
 
     Returns:
-        Dict[str, Any]: JSON response containing detailed restaurant data.
+        Dict[str, Any]: JSON response containing detailed restaurant data and the cursor of the next page.
     """
-    filters = request.json.get('names', [])
-    question = request.json.get('question', '')
+    payload = request.json or {}
+    filters = payload.get('names', [])
+    question = payload.get('question', '')
 
-    # Get recommended restaurant names
-    names = vector_store.get_recommendations(question, filters)
+    try:
+        page_size, pool_size = parse_page_params(payload)
+        city = parse_city(payload)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
 
-    session = Session()
     try:
-        # Fetch complete restaurant data
-        data = get_complete_restaurant_data(session, names)
-    finally:
-        session.close()
+        # Search, rerank and fetch the recommended restaurants
+        results, next_cursor = warm_up(city).run(
+            question, filters, page_size=page_size, pool_size=pool_size, cursor=payload.get('cursor')
+        )
+    except InvalidCursorError as e:
+        return jsonify(error=str(e)), 400
+
+    if query_log is not None:
+        query_log.append(query_log_entry(
+            normalize_question(question), filters, page_size, pool_size,
+            first_page=not payload.get('cursor'),
+            seconds=time.perf_counter() - g.request_start,
+            names=[result['name'] for result in results],
+            city=city
+        ))
+
+    return jsonify(results=results, next_cursor=next_cursor)
+
+@app.route("/query/batch", methods=["POST"])
+def query_batch() -> Dict[str, Any]:
+    """
+    Retrieve the recommended restaurants for several questions at once, for offline jobs.
+
+    The JSON payload contains `queries`, a list of objects with a `question` and optional
+    `names` filter, and optionally a `city`, a page size `k` and candidate pool size `candidates`.
+
+    Returns:
+        Dict[str, Any]: JSON response containing one list of restaurant data per query.
+    """
+    payload = request.json or {}
+    queries = payload.get('queries', [])
+    if not isinstance(queries, list) or not all(isinstance(item, dict) for item in queries):
+        return jsonify(error="'queries' must be a list of objects."), 400
+
+    if len(queries) > settings.search.BATCH_MAX_QUERIES:
+        return jsonify(error=f"At most {settings.search.BATCH_MAX_QUERIES} queries per batch."), 400
+
+    try:
+        page_size, pool_size = parse_page_params(payload)
+        city = parse_city(payload)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
 
-    return jsonify(data)
+    questions = [item.get('question', '') for item in queries]
+    filters = [item.get('names') or None for item in queries]
+    results = warm_up(city).run_batch(questions, filters, page_size=page_size, pool_size=pool_size)
+
+    return jsonify(results=results)
+
+@app.route("/ready", methods=["GET"])
+def ready() -> Tuple[Response, int]:
+    """
+    Report whether warm-up is complete, starting it in the background if it has not started yet.
+
+    Returns:
+        Tuple[Response, int]: JSON status with 200 when ready to take traffic, 503 otherwise.
+    """
+    if warm_up_done.is_set():
+        return jsonify(status='ready'), 200
+
+    start_warm_up()
+    if warm_up_error is not None:
+        return jsonify(status='failed', error=warm_up_error), 503
+    return jsonify(status='warming_up'), 503
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics() -> Response:
+    """
+    Expose request and stage latency histograms, request counts, in-flight requests
+    and cache hit rates in the Prometheus text format.
+
+    Returns:
+        Response: The metrics page.
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == "__main__":
+    start_warm_up()
+
     # Run the Flask application in debug mode for development purposes
     app.run(debug=True)
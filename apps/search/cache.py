@@ -0,0 +1,326 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+from data.scheme import Session
+from data.crud import get_data_version
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DataVersionWatcher:
+    """
+    Tracks the data version of the restaurant database, querying it at most once per interval.
+    """
+
+    def __init__(self, interval: float) -> None:
+        """
+        Initializes the watcher.
+
+        Args:
+            interval (float): Minimum number of seconds between two data version queries.
+        """
+        self.interval = interval
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        """
+        Returns the current data version, refreshing it from the database if the interval has passed.
+
+        Returns:
+            int: The current data version.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._version is None or now - self._checked_at >= self.interval:
+                session = Session()
+                try:
+                    self._version = get_data_version(session)
+                finally:
+                    session.close()
+                self._checked_at = now
+            return self._version
+
+
+class VersionedCache(Generic[T]):
+    """
+    Holds a single value that is computed once per data version and served from memory.
+
+    The first value is loaded synchronously. When the data version changes afterwards, the new
+    value is loaded in a background thread while readers keep getting the previous one, and the
+    entry is swapped atomically once loading has finished. After a failed reload, readers keep
+    the previous value and the reload is retried no sooner than retry_interval seconds later.
+    """
+
+    def __init__(self, loader: Callable[[int], T], watcher: DataVersionWatcher, retry_interval: Optional[float] = None) -> None:
+        """
+        Initializes the cache.
+
+        Args:
+            loader (Callable[[int], T]): Function that computes the value for a data version from the database.
+            watcher (DataVersionWatcher): Watcher providing the current data version.
+            retry_interval (Optional[float]): Seconds to wait after a failed reload before retrying,
+                defaults to settings.search.RELOAD_RETRY_INTERVAL.
+        """
+        self.loader = loader
+        self.watcher = watcher
+        self.retry_interval = retry_interval if retry_interval is not None else settings.search.RELOAD_RETRY_INTERVAL
+        self._entry: Optional[Tuple[int, T]] = None
+        self._refreshing: Optional[int] = None
+        self._failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self) -> Tuple[int, T]:
+        """
+        Returns the cached value, scheduling a reload if the data version has changed.
+
+        Returns:
+            Tuple[int, T]: The data version and the value computed for it.
+        """
+        version = self.watcher.current()
+        entry = self._entry
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry
+
+        with self._lock:
+            self.misses += 1
+            if self._entry is None:
+                self._entry = (version, self.loader(version))
+            elif self._entry[0] != version and self._refreshing != version and not self._backing_off():
+                self._refreshing = version
+                threading.Thread(target=self._refresh, args=(version,), daemon=True).start()
+            return self._entry
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the number of reads served from the current version and of reads after a version change.
+
+        Returns:
+            Dict[str, int]: Cache statistics.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _backing_off(self) -> bool:
+        """
+        Returns whether the last reload failed less than retry_interval seconds ago. Called with the lock held.
+
+        Returns:
+            bool: Whether a new reload must wait.
+        """
+        return self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_interval
+
+    def _refresh(self, version: int) -> None:
+        """
+        Loads the value for a new data version and swaps it in.
+
+        Args:
+            version (int): The data version to load.
+        """
+        try:
+            value = self.loader(version)
+            with self._lock:
+                self._entry = (version, value)
+                self._failed_at = None
+        except Exception as e:
+            logger.error(f"Failed to reload data version {version}, retrying in {self.retry_interval}s: {e}")
+            with self._lock:
+                self._failed_at = time.monotonic()
+        finally:
+            with self._lock:
+                if self._refreshing == version:
+                    self._refreshing = None
+
+
+class PersistentCache:
+    """
+    A key-value cache of JSON values in a SQLite file, shared by the app workers and the cache warming CLI.
+
+    Values are grouped in namespaces (e.g. translations, rankings) and survive restarts. Entries
+    older than max_age are deleted, and beyond max_entries the oldest entries are deleted, at most
+    once per prune_interval, so rankings of earlier data versions do not pile up.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_age: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        prune_interval: float = 3600
+    ) -> None:
+        """
+        Opens or creates the cache file.
+
+        Args:
+            path (str): Path of the SQLite file.
+            max_age (Optional[float]): Number of seconds an entry is kept after it was written, None to keep entries.
+            max_entries (Optional[int]): Maximum number of entries, None for no limit.
+            prune_interval (float): Minimum number of seconds between two prunes.
+        """
+        self.path = path
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pruned_at: Optional[float] = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # WAL lets the app keep reading while the warming CLI writes
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ix_entries_updated_at ON entries (updated_at)")
+        self._connection.commit()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Returns the cached value for a key, or None if it is missing.
+
+        Args:
+            namespace (str): The namespace of the key.
+            key (str): The cache key.
+
+        Returns:
+            Optional[Any]: The cached value.
+        """
+        return self.get_many(namespace, [key]).get(key)
+
+    def get_many(self, namespace: str, keys: List[str]) -> Dict[str, Any]:
+        """
+        Returns the cached values of several keys, skipping missing keys.
+
+        Args:
+            namespace (str): The namespace of the keys.
+            keys (List[str]): The cache keys.
+
+        Returns:
+            Dict[str, Any]: The cached values by key.
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        if not unique_keys:
+            return {}
+
+        placeholders = ", ".join("?" for _ in unique_keys)
+        with self._lock:
+            try:
+                rows = self._connection.execute(
+                    f"SELECT key, value FROM entries WHERE namespace = ? AND key IN ({placeholders})",
+                    [namespace, *unique_keys]
+                ).fetchall()
+            except sqlite3.Error as e:
+                # A locked or corrupt cache file counts as a miss instead of failing the request
+                logger.warning(f"Failed to read from the persistent cache: {e}")
+                rows = []
+            self.hits += len(rows)
+            self.misses += len(unique_keys) - len(rows)
+        return {key: json.loads(value) for key, value in rows}
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        """
+        Stores a value, replacing any previous value of the key.
+
+        Args:
+            namespace (str): The namespace of the key.
+            key (str): The cache key.
+            value (Any): A JSON-serializable value.
+        """
+        self.set_many(namespace, {key: value})
+
+    def set_many(self, namespace: str, values: Dict[str, Any]) -> None:
+        """
+        Stores several values in one transaction.
+
+        Args:
+            namespace (str): The namespace of the keys.
+            values (Dict[str, Any]): JSON-serializable values by key.
+        """
+        now = time.time()
+        rows = [(namespace, key, json.dumps(value, ensure_ascii=False), now) for key, value in values.items()]
+        try:
+            with self._lock, self._connection:
+                self._connection.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", rows)
+                if self._pruned_at is None or now - self._pruned_at >= self.prune_interval:
+                    self._prune(now)
+        except sqlite3.Error as e:
+            # The cache is an optimization, a failed write must not fail the request
+            logger.warning(f"Failed to write to the persistent cache: {e}")
+
+    def _prune(self, now: float) -> None:
+        """
+        Deletes the entries older than max_age and the oldest entries beyond max_entries. Called
+        with the lock held, in the transaction of a write.
+
+        Args:
+            now (float): The current time.
+        """
+        self._pruned_at = now
+        deleted = 0
+        if self.max_age is not None:
+            deleted += self._connection.execute("DELETE FROM entries WHERE updated_at < ?", (now - self.max_age,)).rowcount
+        if self.max_entries is not None:
+            deleted += self._connection.execute(
+                "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        if deleted:
+            logger.info(f"Pruned {deleted} entries from the persistent cache.")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the number of hits and misses of the cache.
+
+        Returns:
+            Dict[str, int]: Cache statistics.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=None)
+def get_persistent_cache() -> Optional[PersistentCache]:
+    """
+    Opens the persistent cache configured in settings.search.PERSISTENT_CACHE_PATH once per process.
+
+    Returns:
+        Optional[PersistentCache]: The persistent cache, or None if it is disabled by an empty path.
+    """
+    path = settings.search.PERSISTENT_CACHE_PATH
+    if not path:
+        return None
+    return PersistentCache(
+        path,
+        max_age=settings.search.PERSISTENT_CACHE_MAX_AGE_HOURS * 3600,
+        max_entries=settings.search.PERSISTENT_CACHE_MAX_ENTRIES,
+        prune_interval=settings.search.PERSISTENT_CACHE_PRUNE_INTERVAL
+    )
+
+
+def make_digest(*parts: object) -> str:
+    """
+    Builds a stable digest of the given parts, used for ETags and cache keys.
+
+    Returns:
+        str: A hex digest identifying the parts.
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
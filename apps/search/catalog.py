@@ -0,0 +1,103 @@
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from sqlalchemy.orm import joinedload
+from data.scheme import Session, RestaurantData
+from data.crud import restaurant_to_dict
+from config import settings
+
+
+class RestaurantRecord:
+    """
+    A compact, read-only record with the restaurant data served by the search app.
+    """
+
+    __slots__ = (
+        "name", "website_url", "instagram_url", "address", "meal_type", "district",
+        "restaurant_type", "price_level", "city", "summary", "image_url", "content_url"
+    )
+
+    def __init__(self, **fields: Optional[str]) -> None:
+        """
+        Initializes the record from the fields returned by restaurant_to_dict.
+        """
+        for field in self.__slots__:
+            object.__setattr__(self, field, fields.get(field))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Records are immutable once loaded."""
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        """
+        Converts the record into a dictionary format for serialization.
+
+        Returns:
+            Dict[str, Optional[str]]: A dictionary containing restaurant attributes.
+        """
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class Catalog:
+    """
+    An immutable snapshot of all restaurants for one data version, keyed by city and name.
+    """
+
+    def __init__(self, version: int, records: Iterable[RestaurantRecord]) -> None:
+        """
+        Initializes the catalog.
+
+        Args:
+            version (int): The data version the records were loaded from.
+            records (Iterable[RestaurantRecord]): The restaurant records.
+        """
+        self.version = version
+        self.records: Mapping[Tuple[str, str], RestaurantRecord] = MappingProxyType(
+            {(record.city, record.name): record for record in records}
+        )
+
+    def __len__(self) -> int:
+        """Returns the number of restaurants in the catalog."""
+        return len(self.records)
+
+    def __contains__(self, key: object) -> bool:
+        """Returns whether a restaurant with the given (city, name) key is in the catalog."""
+        return key in self.records
+
+    def get_many(self, names: List[str], city: Optional[str] = None) -> List[Dict[str, Optional[str]]]:
+        """
+        Retrieves the data of the given restaurants of a city, skipping unknown names.
+
+        Args:
+            names (List[str]): Restaurant names to retrieve.
+            city (Optional[str]): Key of the city, by default settings.DEFAULT_CITY.
+
+        Returns:
+            List[Dict[str, Optional[str]]]: Restaurant data in the order of the given names.
+        """
+        city = city or settings.DEFAULT_CITY
+        return [self.records[city, name].to_dict() for name in names if (city, name) in self.records]
+
+
+def load_catalog(version: int) -> Catalog:
+    """
+    Loads all restaurants with their summary and URLs from the database into a catalog.
+
+    Args:
+        version (int): The data version being loaded.
+
+    Returns:
+        Catalog: The loaded catalog.
+    """
+    session = Session()
+    try:
+        restaurants = (
+            session.query(RestaurantData)
+            .options(
+                joinedload(RestaurantData.summary),
+                joinedload(RestaurantData.restaurant_url)
+            )
+            .all()
+        )
+        return Catalog(version, [RestaurantRecord(**restaurant_to_dict(restaurant)) for restaurant in restaurants])
+    finally:
+        session.close()
@@ -0,0 +1,226 @@
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a cached page to a slow LLM call
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage timings of the request being handled, shared with the pipeline's worker threads
+current_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("current_timings", default=None)
+
+
+class Histogram:
+    """
+    A thread-safe cumulative histogram in the Prometheus format.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS) -> None:
+        """
+        Initializes the histogram.
+
+        Args:
+            buckets (Tuple[float, ...]): Upper bounds of the buckets, in increasing order.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Records a value.
+
+        Args:
+            value (float): The observed value.
+        """
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+    def render(self, name: str, labels: str) -> List[str]:
+        """
+        Renders the histogram as Prometheus exposition lines.
+
+        Args:
+            name (str): Metric name.
+            labels (str): Label pairs without braces, e.g. 'stage="rerank"'.
+
+        Returns:
+            List[str]: The bucket, sum and count lines.
+        """
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+
+        lines = []
+        cumulative = 0
+        separator = "," if labels else ""
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {total}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """
+    Collects request and stage latencies, request counts, in-flight requests and cache statistics.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty registry.
+        """
+        self.stages: Dict[str, Histogram] = {}
+        self.requests: Dict[str, Histogram] = {}
+        self.responses: Dict[Tuple[str, int], int] = {}
+        self.in_flight = 0
+        self.caches: Dict[str, Callable[[], Dict[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, histograms: Dict[str, Histogram], key: str) -> Histogram:
+        """
+        Returns the histogram for a key, creating it on first use.
+
+        Args:
+            histograms (Dict[str, Histogram]): The histograms of one metric.
+            key (str): The label value.
+
+        Returns:
+            Histogram: The histogram for the key.
+        """
+        with self._lock:
+            if key not in histograms:
+                histograms[key] = Histogram()
+            return histograms[key]
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        """
+        Records the duration of a pipeline stage.
+
+        Args:
+            stage (str): Name of the stage.
+            seconds (float): Duration in seconds.
+        """
+        self._histogram(self.stages, stage).observe(seconds)
+
+    def request_started(self) -> None:
+        """
+        Marks the start of a request.
+        """
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, endpoint: str, status: int, seconds: float) -> None:
+        """
+        Records a finished request.
+
+        Args:
+            endpoint (str): Name of the Flask endpoint.
+            status (int): HTTP status code of the response.
+            seconds (float): Duration of the request in seconds.
+        """
+        self._histogram(self.requests, endpoint).observe(seconds)
+        with self._lock:
+            self.in_flight -= 1
+            self.responses[(endpoint, status)] = self.responses.get((endpoint, status), 0) + 1
+
+    def register_cache(self, name: str, stats: Callable[[], Dict[str, int]]) -> None:
+        """
+        Exposes the hit and miss counts of a cache.
+
+        Args:
+            name (str): Name of the cache.
+            stats (Callable[[], Dict[str, int]]): Function returning a dictionary with 'hits', 'misses' and optionally 'size'.
+        """
+        self.caches[name] = stats
+
+    def render(self) -> str:
+        """
+        Renders all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics page.
+        """
+        lines = [
+            "# HELP search_request_duration_seconds Latency of HTTP requests.",
+            "# TYPE search_request_duration_seconds histogram",
+        ]
+        for endpoint, histogram in sorted(self.requests.items()):
+            lines.extend(histogram.render("search_request_duration_seconds", f'endpoint="{endpoint}"'))
+
+        lines += [
+            "# HELP search_stage_duration_seconds Latency of the stages of a search request.",
+            "# TYPE search_stage_duration_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.stages.items()):
+            lines.extend(histogram.render("search_stage_duration_seconds", f'stage="{stage}"'))
+
+        with self._lock:
+            responses = sorted(self.responses.items())
+            in_flight = self.in_flight
+        lines += ["# HELP search_requests_total Number of HTTP responses.", "# TYPE search_requests_total counter"]
+        lines += [f'search_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}' for (endpoint, status), count in responses]
+        lines += ["# HELP search_requests_in_flight Number of requests being handled.", "# TYPE search_requests_in_flight gauge"]
+        lines.append(f"search_requests_in_flight {in_flight}")
+
+        cache_stats = {name: stats() for name, stats in sorted(self.caches.items())}
+        for key, metric, kind, description in [
+            ("hits", "search_cache_hits_total", "counter", "Number of cache hits."),
+            ("misses", "search_cache_misses_total", "counter", "Number of cache misses."),
+            ("size", "search_cache_size", "gauge", "Number of cached entries."),
+        ]:
+            lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+            lines += [f'{metric}{{cache="{name}"}} {values[key]}' for name, values in cache_stats.items() if key in values]
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """
+    Times a stage of the current request, recording it in the latency histograms and the request's timings.
+
+    Args:
+        stage (str): Name of the stage.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.observe_stage(stage, seconds)
+        timings = current_timings.get()
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + seconds, 4)
+
+
+def log_request(request_id: str, endpoint: str, status: int, seconds: float, timings: Dict[str, float]) -> None:
+    """
+    Logs a structured record with the latency of a request and its stages.
+
+    Args:
+        request_id (str): Identifier of the request.
+        endpoint (str): Name of the Flask endpoint.
+        status (int): HTTP status code of the response.
+        seconds (float): Duration of the request in seconds.
+        timings (Dict[str, float]): Duration of each stage in seconds.
+    """
+    logger.info(json.dumps({
+        "request_id": request_id,
+        "endpoint": endpoint,
+        "status": status,
+        "duration": round(seconds, 4),
+        "stages": timings,
+    }))
@@ -0,0 +1,229 @@
+import json
+import os
+import shutil
+import time
+import chromadb
+from chromadb.errors import InvalidCollectionException
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from config import settings
+from data.index_versions import IndexPointer, partition_name
+
+EMBEDDINGS_FILE = "embeddings.npy"
+IDS_FILE = "ids.json"
+# Each export is written to its own directory, and this file names the current one
+CURRENT_FILE = "current"
+EXPORT_PREFIX = "export-"
+
+
+def export_directory(path: str) -> str:
+    """
+    Returns the directory holding the current export of an index. Exports written before
+    versioning hold their files in the index directory itself.
+
+    Args:
+        path (str): Directory of the index.
+
+    Returns:
+        str: Directory containing the embeddings and id table.
+    """
+    try:
+        with open(os.path.join(path, CURRENT_FILE), encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    except FileNotFoundError:
+        return path
+
+
+class NumpyIndex:
+    """
+    An exact cosine-similarity index over a memory-mapped float32 matrix of normalized embeddings.
+
+    The matrix is opened read-only with mmap, so every worker process shares the same pages
+    from the OS page cache instead of holding its own copy.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Opens the current export of an index.
+
+        Args:
+            path (str): Directory the index was exported to.
+        """
+        self.path = path
+        directory = export_directory(path)
+        self.matrix: np.ndarray = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r")
+        with open(os.path.join(directory, IDS_FILE), encoding="utf-8") as f:
+            table = json.load(f)
+        self.names: List[str] = table["names"]
+        self.documents: List[str] = table["documents"]
+        self.rows: Dict[str, int] = {name: row for row, name in enumerate(self.names)}
+
+    @staticmethod
+    def export(path: str, names: List[str], documents: List[str], embeddings: Any) -> None:
+        """
+        Writes normalized embeddings and the id table to a new export directory and switches the
+        index to it by replacing the current file, so a reader opens either the old pair of files
+        or the new pair, never a mix. Older exports are removed, except the previous one, which
+        a reader may be opening.
+
+        Args:
+            path (str): Directory to write the index to.
+            names (List[str]): Restaurant name of each row.
+            documents (List[str]): Document text of each row.
+            embeddings (Any): Embedding matrix with one row per name.
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = np.ascontiguousarray(matrix / np.where(norms == 0, 1, norms))
+
+        os.makedirs(path, exist_ok=True)
+        previous = export_directory(path)
+        version = f"{EXPORT_PREFIX}{time.time_ns()}"
+        directory = os.path.join(path, version)
+        os.makedirs(directory)
+        with open(os.path.join(directory, EMBEDDINGS_FILE), "wb") as f:
+            np.save(f, matrix)
+        with open(os.path.join(directory, IDS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"names": names, "documents": documents}, f, ensure_ascii=False)
+
+        current_tmp = os.path.join(path, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(current_tmp, os.path.join(path, CURRENT_FILE))
+
+        for entry in os.listdir(path):
+            if entry.startswith(EXPORT_PREFIX) and os.path.join(path, entry) not in (directory, previous):
+                shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+        # Files of an export written before versioning, once it is no longer the previous export
+        if previous != path:
+            for name in (EMBEDDINGS_FILE, IDS_FILE):
+                if os.path.exists(os.path.join(path, name)):
+                    os.remove(os.path.join(path, name))
+
+    def __len__(self) -> int:
+        """Returns the number of embeddings in the index."""
+        return len(self.names)
+
+    def mask(self, names: Optional[List[str]]) -> Optional[np.ndarray]:
+        """
+        Builds a boolean mask selecting the rows of the given restaurants.
+
+        Args:
+            names (Optional[List[str]]): Restaurant names to select, or None to select all rows.
+
+        Returns:
+            Optional[np.ndarray]: The mask, or None if all rows are selected.
+        """
+        if not names:
+            return None
+        mask = np.zeros(len(self.names), dtype=bool)
+        mask[[self.rows[name] for name in names if name in self.rows]] = True
+        return mask
+
+    def search(self, vector: List[float], k: int, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Finds the rows most similar to a query vector.
+
+        Args:
+            vector (List[float]): The query embedding.
+            k (int): Number of rows to return.
+            mask (Optional[np.ndarray]): Boolean mask restricting the rows that can be returned (optional).
+
+        Returns:
+            List[Tuple[int, float]]: Row numbers and cosine similarities, most similar first.
+        """
+        return self.search_batch([vector], k, [mask])[0]
+
+    def search_batch(
+        self,
+        vectors: Sequence[List[float]],
+        k: int,
+        masks: Optional[Sequence[Optional[np.ndarray]]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Finds the rows most similar to several query vectors with one matrix product.
+
+        Args:
+            vectors (Sequence[List[float]]): The query embeddings.
+            k (int): Number of rows to return per query.
+            masks (Optional[Sequence[Optional[np.ndarray]]]): Boolean mask restricting the rows of each query (optional).
+
+        Returns:
+            List[List[Tuple[int, float]]]: Row numbers and cosine similarities for each query, most similar first.
+        """
+        queries = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+
+        scores = queries @ self.matrix.T
+        results = []
+        for i, mask in enumerate(masks if masks is not None else [None] * len(queries)):
+            row_scores = scores[i]
+            limit = min(k, len(row_scores))
+            if mask is not None:
+                row_scores = np.where(mask, row_scores, -np.inf)
+                limit = min(limit, int(mask.sum()))
+            if limit <= 0:
+                results.append([])
+                continue
+
+            top = np.argpartition(-row_scores, limit - 1)[:limit]
+            top = top[np.argsort(-row_scores[top])]
+            results.append([(int(row), float(row_scores[row])) for row in top])
+        return results
+
+
+def export_from_chroma(collection: Any, path: str) -> int:
+    """
+    Exports all embeddings of a Chroma collection to a NumPy index.
+
+    Args:
+        collection (Any): The Chroma collection holding the restaurant summaries.
+        path (str): Directory to write the index to.
+
+    Returns:
+        int: Number of exported embeddings.
+    """
+    result = collection.get(include=["embeddings", "documents", "metadatas"])
+    names = [metadata["name"] for metadata in result["metadatas"]]
+    NumpyIndex.export(path, names, result["documents"], result["embeddings"])
+    return len(names)
+
+
+def numpy_index_path(collection_name: str) -> str:
+    """
+    Returns the directory of the NumPy export of a version of the search collection. The
+    unversioned collection is exported to settings.search.NUMPY_INDEX_PATH itself.
+
+    Args:
+        collection_name (str): Name of the Chroma collection.
+
+    Returns:
+        str: Directory of the export.
+    """
+    if collection_name == settings.search.CHROMA_COLLECTION_NAME:
+        return settings.search.NUMPY_INDEX_PATH
+    return os.path.join(settings.search.NUMPY_INDEX_PATH, collection_name)
+
+
+def main() -> None:
+    """
+    Main function to export the restaurant summary embeddings of the active Chroma collection of
+    every city to the NumPy index.
+    """
+    client = chromadb.PersistentClient(path=settings.search.CHROMA_DB_PATH)
+    for city in settings.cities:
+        pointer = IndexPointer(settings.search.CHROMA_DB_PATH, partition_name(settings.search.CHROMA_COLLECTION_NAME, city))
+        collection_name = pointer.active()
+        try:
+            collection = client.get_collection(collection_name)
+        except InvalidCollectionException:
+            print(f"No collection {collection_name} for {city}, skipping.")
+            continue
+        path = numpy_index_path(collection_name)
+        count = export_from_chroma(collection, path)
+        print(f"Exported {count} embeddings of {city} to {path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+import base64
+import binascii
+import contextvars
+import json
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, TypeVar
+from apps.common.cache import LRUCache, normalize_question
+from apps.search.cache import VersionedCache, get_persistent_cache, make_digest
+from apps.search.catalog import Catalog
+from apps.search.metrics import stage_timer
+from config import settings
+
+if TYPE_CHECKING:
+    # LangChain and Chroma are only imported once the app warms up
+    from apps.search.vectorstore import VectorStore
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(ValueError):
+    """
+    Raised when a pagination cursor is malformed or belongs to a different search.
+    """
+
+
+def encode_cursor(key: str, offset: int) -> str:
+    """
+    Encodes a pagination cursor pointing at an offset in a cached ranking.
+
+    Args:
+        key (str): Cache key of the ranking.
+        offset (int): Index of the first result on the next page.
+
+    Returns:
+        str: An opaque, URL-safe cursor.
+    """
+    payload = json.dumps({"key": key, "offset": offset}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_cursor(cursor: str, key: str) -> int:
+    """
+    Decodes a pagination cursor and checks that it belongs to the given ranking.
+
+    Args:
+        cursor (str): The opaque cursor returned with a previous page.
+        key (str): Cache key of the ranking of the current request.
+
+    Returns:
+        int: Index of the first result on the requested page.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or belongs to a different search.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        offset = int(payload["offset"])
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"Malformed cursor: {e}") from e
+
+    if payload.get("key") != key or offset < 0:
+        raise InvalidCursorError("Cursor does not belong to this search.")
+    return offset
+
+
+def cap_pool_size(pool_size: Optional[int], filters: Optional[List[str]]) -> int:
+    """
+    Returns the number of candidates to rerank at a time, capped by settings.search.MAX_CANDIDATE_POOL_SIZE
+    and by the number of filtered names.
+
+    Args:
+        pool_size (Optional[int]): The requested pool size, defaults to settings.search.CANDIDATE_POOL_SIZE.
+        filters (Optional[List[str]]): A list of restaurant names the search is restricted to (optional).
+
+    Returns:
+        int: The pool size.
+    """
+    pool_size = min(pool_size or settings.search.CANDIDATE_POOL_SIZE, settings.search.MAX_CANDIDATE_POOL_SIZE)
+    if filters:
+        # Narrow filters never yield more candidates than names
+        pool_size = min(pool_size, len(filters))
+    return pool_size
+
+
+def keep_candidates(names: List[str], candidates: List[str]) -> List[str]:
+    """
+    Drops the names the reranker returned that are not candidates, and duplicates.
+
+    Args:
+        names (List[str]): The names returned by the reranker, most relevant first.
+        candidates (List[str]): The candidates passed to the reranker.
+
+    Returns:
+        List[str]: The reranked candidates, most relevant first.
+    """
+    candidate_set = set(candidates)
+    return list(dict.fromkeys(name for name in names if name in candidate_set))
+
+
+class SearchPipeline:
+    """
+    Runs the /query stages on a thread pool, enforcing per-stage timeouts.
+
+    The stages are translation, vector search and LLM reranking. Each stage needs the result of the
+    previous one, so they run one after another; the pool only lets the request stop waiting for a
+    stage after its timeout. A running stage cannot be cancelled, so the OpenAI clients time out
+    their requests after the same number of seconds and an abandoned stage soon frees its worker.
+
+    Restaurant data is read from the in-memory catalog, so serving never touches the database. A
+    slow or failing stage degrades gracefully: an untranslated query is searched as is, and
+    candidates stay in vector order if the reranker does not answer in time.
+
+    Rankings are cached per question, filters, candidate pool size and data version, so pages within
+    the reranked candidates are served without translating, embedding or reranking again.
+    """
+
+    def __init__(self, vector_store: "VectorStore", catalog: VersionedCache[Catalog], max_workers: Optional[int] = None) -> None:
+        """
+        Initializes the pipeline.
+
+        Args:
+            vector_store (VectorStore): The vector store used for searching and reranking.
+            catalog (VersionedCache[Catalog]): The in-memory restaurant catalog of the current data version.
+            max_workers (Optional[int]): Size of the thread pool, defaults to settings.search.PIPELINE_WORKERS.
+        """
+        self.vector_store = vector_store
+        self.catalog = catalog
+        self.rankings: LRUCache[Dict[str, Any]] = LRUCache(
+            maxsize=settings.search.RANKING_CACHE_SIZE,
+            ttl=settings.search.RANKING_CACHE_TTL
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.search.PIPELINE_WORKERS,
+            thread_name_prefix="search-pipeline"
+        )
+
+    def _result(self, stage: str, future: Future, timeout: float, fallback: T) -> Tuple[T, bool]:
+        """
+        Waits for a stage to finish, returning the fallback if it times out or fails. A stage that
+        has not started yet is cancelled, a running stage ends with its request timeout.
+
+        Args:
+            stage (str): Name of the stage, used for logging.
+            future (Future): The running stage.
+            timeout (float): Maximum number of seconds to wait.
+            fallback (T): Value to return if the stage does not succeed in time.
+
+        Returns:
+            Tuple[T, bool]: The stage result or the fallback, and whether the stage succeeded.
+        """
+        try:
+            return future.result(timeout=timeout), True
+        except TimeoutError:
+            logger.warning(f"Stage '{stage}' timed out after {timeout}s, degrading gracefully.")
+        except Exception as e:
+            logger.error(f"Stage '{stage}' failed, degrading gracefully: {e}")
+        future.cancel()
+        return fallback, False
+
+    def _submit(self, function: Callable[..., T], *args: Any) -> "Future[T]":
+        """
+        Runs a stage on the thread pool in a copy of the current context, so stage timings
+        are recorded for the request that started it.
+
+        Args:
+            function (Callable[..., T]): The stage to run.
+            *args (Any): Arguments of the stage.
+
+        Returns:
+            Future[T]: The running stage.
+        """
+        return self.executor.submit(contextvars.copy_context().run, function, *args)
+
+    def rank(
+        self,
+        question: str,
+        filters: Optional[List[str]],
+        pool_size: int,
+        considered: Optional[List[str]] = None
+    ) -> Tuple[List[str], List[str], bool, bool]:
+        """
+        Searches the next window of candidates for a question and reranks it.
+
+        Args:
+            question (str): The user question in Dutch.
+            filters (Optional[List[str]]): A list of restaurant names to restrict the search to (optional).
+            pool_size (int): Number of new candidates passed to the reranker.
+            considered (Optional[List[str]]): Candidates reranked for earlier pages, left out of this window (optional).
+
+        Returns:
+            Tuple[List[str], List[str], bool, bool]: The ranked restaurant names, the candidates of the window,
+            whether there are candidates after the window and whether every stage succeeded.
+        """
+        from apps.search.vectorstore import translate_text
+
+        considered = considered or []
+        translated, translated_ok = self._result(
+            "translate", self._submit(translate_text, question),
+            settings.search.TRANSLATE_TIMEOUT, fallback=question
+        )
+
+        # One extra candidate tells whether there is another window
+        k = len(considered) + pool_size + 1
+        documents, search_ok = self._result(
+            "search", self._submit(self.vector_store.search_candidates, translated, filters, k, question),
+            settings.search.SEARCH_TIMEOUT, fallback=[]
+        )
+        seen = set(considered)
+        new = [document for document in documents if document.metadata['name'] not in seen]
+        window, more = new[:pool_size], len(new) > pool_size
+        candidates = [document.metadata['name'] for document in window]
+        if not candidates:
+            return [], candidates, more, translated_ok and search_ok
+
+        names, rerank_ok = self._result(
+            "rerank", self._submit(self.vector_store.rerank, question, window),
+            settings.search.RERANK_TIMEOUT, fallback=candidates
+        )
+        return keep_candidates(names, candidates), candidates, more, translated_ok and search_ok and rerank_ok
+
+    def ranking(
+        self,
+        key: str,
+        question: str,
+        filters: Optional[List[str]],
+        pool_size: int,
+        offset: int,
+        page_size: int
+    ) -> Dict[str, Any]:
+        """
+        Returns the ranking of a search covering a page, unless the search is exhausted before it.
+        Rankings are read from the in-memory and persistent caches and extended by reranking the
+        next window of pool_size candidates, so every page is reranked. A page that already has
+        results is extended by at most one window, to bound the latency of a request. Complete
+        rankings are stored for the other workers and restarts.
+
+        Args:
+            key (str): The cache key of the question, filters, pool size, data version and vector collection.
+            question (str): The user question in Dutch.
+            filters (Optional[List[str]]): A list of restaurant names to restrict the search to (optional).
+            pool_size (int): Number of candidates reranked per window.
+            offset (int): Index of the first result of the page.
+            page_size (int): Number of results per page.
+
+        Returns:
+            Dict[str, Any]: The ranked restaurant names ('names'), the reranked candidates ('considered')
+            and whether there are no more candidates ('exhausted').
+        """
+        needed = offset + page_size
+        ranking = self.rankings.get(key)
+        if ranking is None or (len(ranking["names"]) < needed and not ranking["exhausted"]):
+            cache = get_persistent_cache()
+            stored = cache.get("ranking", key) if cache else None
+            # Another worker may have ranked more pages of the search
+            if stored is not None and (ranking is None or len(stored["considered"]) > len(ranking["considered"])):
+                ranking = stored
+                self.rankings.set(key, ranking)
+        if ranking is None:
+            ranking = {"names": [], "considered": [], "exhausted": False}
+
+        limit = min(settings.search.MAX_RANKED_CANDIDATES, len(filters)) if filters else settings.search.MAX_RANKED_CANDIDATES
+        windows = 0
+        while not ranking["exhausted"] and (
+            len(ranking["names"]) <= offset or (len(ranking["names"]) < needed and windows == 0)
+        ):
+            windows += 1
+            names, candidates, more, complete = self.rank(question, filters, pool_size, ranking["considered"])
+            considered = ranking["considered"] + candidates
+            ranking = {
+                "names": ranking["names"] + names,
+                "considered": considered,
+                "exhausted": not more or len(considered) >= limit,
+            }
+            # Degraded windows are not cached, so the next request gets another chance
+            if not complete:
+                break
+            self.rankings.set(key, ranking)
+            cache = get_persistent_cache()
+            if cache:
+                cache.set("ranking", key, ranking)
+        return ranking
+
+    def run(
+        self,
+        question: str,
+        filters: Optional[List[str]] = None,
+        page_size: Optional[int] = None,
+        pool_size: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Retrieves one page of detailed data of the recommended restaurants for a question.
+
+        The first page reranks the best pool_size candidates. When a page reaches the end of the
+        reranked candidates, the next pool_size candidates are reranked, up to
+        settings.search.MAX_RANKED_CANDIDATES per search. A page can hold fewer than page_size
+        results when the reranker drops candidates, with a cursor as long as there are more.
+
+        Args:
+            question (str): The user question in Dutch.
+            filters (Optional[List[str]]): A list of restaurant names to restrict the search to (optional).
+            page_size (Optional[int]): Number of results per page, defaults to settings.search.PAGE_SIZE.
+            pool_size (Optional[int]): Number of candidates to rerank at a time, defaults to settings.search.CANDIDATE_POOL_SIZE.
+            cursor (Optional[str]): Cursor returned with the previous page (optional).
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: Restaurant data for the page, most relevant first,
+            and the cursor of the next page if there are more results.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed or belongs to a different search.
+        """
+        page_size = min(page_size or settings.search.PAGE_SIZE, settings.search.MAX_PAGE_SIZE)
+        pool_size = cap_pool_size(pool_size, filters)
+
+        # Rankings depend on the indexed data, so they are keyed by its version and the vector collection,
+        # and cursors of an earlier version are rejected
+        version, _ = self.catalog.get()
+        key = make_digest(
+            normalize_question(question), sorted(filters or []), pool_size, version, self.vector_store.collection_name
+        )
+        offset = decode_cursor(cursor, key) if cursor else 0
+
+        ranking = self.ranking(key, question, filters, pool_size, offset, page_size)
+        names = ranking["names"][offset:offset + page_size]
+
+        with stage_timer("catalog"):
+            _, catalog = self.catalog.get()
+            results = catalog.get_many(names, self.vector_store.city)
+
+        next_offset = offset + len(names)
+        more = next_offset < len(ranking["names"]) or not ranking["exhausted"]
+        next_cursor = encode_cursor(key, next_offset) if names and more else None
+        return results, next_cursor
+
+    def run_batch(
+        self,
+        questions: List[str],
+        filters: List[Optional[List[str]]],
+        page_size: Optional[int] = None,
+        pool_size: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieves the first page of recommended restaurants for several questions at once.
+
+        The questions are translated and embedded in one batched call each, searched together
+        and reranked concurrently with bounded parallelism.
+
+        Args:
+            questions (List[str]): The user questions in Dutch.
+            filters (List[Optional[List[str]]]): Restaurant names to restrict each search to (optional).
+            page_size (Optional[int]): Number of results per question, defaults to settings.search.PAGE_SIZE.
+            pool_size (Optional[int]): Number of candidates to rerank, defaults to settings.search.CANDIDATE_POOL_SIZE
+                and capped like in run().
+
+        Returns:
+            List[List[Dict[str, Any]]]: Restaurant data for each question, most relevant first.
+        """
+        page_size = min(page_size or settings.search.PAGE_SIZE, settings.search.MAX_PAGE_SIZE)
+        if not questions:
+            return []
+        pool_sizes = [cap_pool_size(pool_size, names) for names in filters]
+
+        # The questions are searched together for the largest pool, and each keeps its own pool
+        documents = self.vector_store.search_candidates_batch(questions, filters, max(pool_sizes))
+        documents = [candidates[:size] for candidates, size in zip(documents, pool_sizes)]
+        rankings = self.vector_store.rerank_batch(questions, documents)
+
+        # The reranker may only return candidates, so unknown names and duplicates are dropped
+        rankings = [
+            keep_candidates(names, [document.metadata['name'] for document in candidates])
+            for names, candidates in zip(rankings, documents)
+        ]
+
+        with stage_timer("catalog"):
+            _, catalog = self.catalog.get()
+            return [catalog.get_many(names[:page_size], self.vector_store.city) for names in rankings]
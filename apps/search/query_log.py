@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLog:
+    """
+    Appends one JSON line per search request to a log file from a background thread.
+
+    Requests only put the entry on a bounded queue, so writing the log never blocks them.
+    When the queue is full the entry is dropped and counted instead.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10000) -> None:
+        """
+        Initializes the log. The writer thread starts with the first entry.
+
+        Args:
+            path (str): Path of the JSON lines file to append to.
+            max_queue (int): Maximum number of entries waiting to be written.
+        """
+        self.path = path
+        self.dropped = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """
+        Queues an entry to be written.
+
+        Args:
+            entry (Dict[str, Any]): A JSON-serializable log entry.
+        """
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._write, name="query-log", daemon=True)
+                    self._thread.start()
+
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """
+        Waits until all queued entries are written.
+        """
+        self._queue.join()
+
+    def _write(self) -> None:
+        """
+        Writes queued entries to the file, batching entries that arrive together.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                entries = [self._queue.get()]
+                while True:
+                    try:
+                        entries.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                try:
+                    f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+                    f.flush()
+                except (OSError, TypeError, ValueError) as e:
+                    logger.error(f"Failed to write {len(entries)} query log entries: {e}")
+                finally:
+                    for _ in entries:
+                        self._queue.task_done()
+
+
+def query_log_entry(
+    question: str,
+    filters: Optional[List[str]],
+    page_size: Optional[int],
+    pool_size: Optional[int],
+    first_page: bool,
+    seconds: float,
+    names: List[str],
+    city: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Builds a compact query log entry.
+
+    Args:
+        question (str): The normalized question.
+        filters (Optional[List[str]]): The restaurant names the search was restricted to.
+        page_size (Optional[int]): The requested page size, None for the default.
+        pool_size (Optional[int]): The requested candidate pool size, None for the default.
+        first_page (bool): Whether the request was for the first page of results.
+        seconds (float): Latency of the request in seconds.
+        names (List[str]): Names of the returned restaurants.
+        city (Optional[str]): The city that was searched, None for the default city.
+
+    Returns:
+        Dict[str, Any]: The log entry.
+    """
+    return {
+        "ts": round(time.time(), 3),
+        "question": question,
+        "filters": sorted(filters or []),
+        "k": page_size,
+        "candidates": pool_size,
+        "first_page": first_page,
+        "latency": round(seconds, 4),
+        "results": names,
+        "city": city or settings.DEFAULT_CITY,
+    }
+
+
+def read_query_log(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Reads the entries of a query log, skipping lines that cannot be parsed.
+
+    Args:
+        path (str): Path of the JSON lines file.
+
+    Yields:
+        Dict[str, Any]: The log entries in the order they were written.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def popular_queries(path: str, top_n: int) -> List[Tuple[str, List[str], Optional[int], str, int]]:
+    """
+    Finds the most frequent searches in a query log. Requests for later pages are not counted,
+    since they are served from the ranking of the first page.
+
+    Args:
+        path (str): Path of the JSON lines file.
+        top_n (int): Number of searches to return.
+
+    Returns:
+        List[Tuple[str, List[str], Optional[int], str, int]]: The question, filters, candidate pool size,
+        city and number of requests of each search, most frequent first.
+    """
+    counts: Counter = Counter()
+    for entry in read_query_log(path):
+        if entry.get("first_page", True) and entry.get("question"):
+            key = (entry["question"], tuple(entry.get("filters") or []), entry.get("candidates"), entry.get("city") or settings.DEFAULT_CITY)
+            counts[key] += 1
+
+    return [
+        (question, list(filters), pool_size, city, count)
+        for (question, filters, pool_size, city), count in counts.most_common(top_n)
+    ]
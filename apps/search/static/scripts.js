@@ -1,28 +1,44 @@
 $(document).ready(function () {
     // Fetch filter data when the page loads
     $.getJSON("/get_filter_options", function (data) {
-        const { meal_type, district, restaurant_type, price_level } = data;
+        const { meal_type, district, restaurant_type, price_level, city = [], counts = {} } = data;
+
+        // Populate the city selector, every search is limited to one city
+        populateCityOptions(city, counts.city);
 
         // Populate filter checkboxes and hide extras
-        populateFilterOptions("#meal_type_options", meal_type, "meal_type");
-        populateFilterOptions("#district_options", district, "district");
-        populateFilterOptions("#restaurant_type_options", restaurant_type, "restaurant_type");
-        populateFilterOptions("#price_level_options", price_level, "price_level");
+        populateFilterOptions("#meal_type_options", meal_type, "meal_type", counts.meal_type);
+        populateFilterOptions("#district_options", district, "district", counts.district);
+        populateFilterOptions("#restaurant_type_options", restaurant_type, "restaurant_type", counts.restaurant_type);
+        populateFilterOptions("#price_level_options", price_level, "price_level", counts.price_level);
     }).fail(function () {
         alert("Failed to load filter options. Please try again.");
     });
 
+    // Function to populate the city selector with the default city selected
+    function populateCityOptions(cities, counts = {}) {
+        const $select = $("#city");
+        const defaultCity = $select.data("default");
+
+        cities.forEach(city => {
+            const count = counts[city] !== undefined ? ` (${counts[city]})` : "";
+            const label = city.charAt(0).toUpperCase() + city.slice(1);
+            $select.append(`<option value="${city}" ${city === defaultCity ? "selected" : ""}>${label}${count}</option>`);
+        });
+    }
+
     // Function to populate filter options and initially hide extra options beyond 5
-    function populateFilterOptions(containerId, options, filterName) {
+    function populateFilterOptions(containerId, options, filterName, counts = {}) {
         const $container = $(containerId);
         const $toggleButton = $container.next(".toggle-options");
 
         options.forEach((option, index) => {
             const displayClass = index >= 5 ? "extra-option d-none" : "";
+            const count = counts[option] !== undefined ? ` <span class="text-muted">(${counts[option]})</span>` : "";
             $container.append(`
                 <div class="form-check ${displayClass}">
                     <input type="checkbox" class="form-check-input" id="${containerId.slice(1)}_${option}" value="${option}" name="${filterName}">
-                    <label class="form-check-label" for="${containerId.slice(1)}_${option}">${option}</label>
+                    <label class="form-check-label" for="${containerId.slice(1)}_${option}">${option}${count}</label>
                 </div>
             `);
         });
@@ -51,10 +67,102 @@ $(document).ready(function () {
         $(this).find("i").toggleClass("fa-angle-double-right fa-angle-double-down");
     });
 
+    // State of the current search, used to load more results while scrolling
+    let currentSearch = null;
+    let isLoading = false;
+
+    // Render a single restaurant card
+    function renderRestaurant(restaurant) {
+        const {
+            name,
+            summary,
+            image_url,
+            website_url = '',
+            instagram_url = '',
+            restaurant_type = '',
+            district = '',
+            meal_type = '',
+            price_level = ''
+        } = restaurant;
+
+        return `
+            <div class="card my-3 card-custom">
+                <div class="row no-gutters h-100">
+                    <div class="col-md-8">
+                        <div class="card-body d-flex flex-column">
+                            <h5 class="card-title">${name}</h5>
+                            <p class="card-text">${summary}</p>
+                        </div>
+                    </div>
+                    <div class="col-md-4 position-relative h-100">
+                        <img src="${image_url}" class="card-img" alt="${name} image" loading="lazy">
+                        <div class="info-overlay">
+                            <p><strong>Type:</strong> ${restaurant_type || "Niet beschikbaar"}</p>
+                            <p><strong>District:</strong> ${district || "Niet beschikbaar"}</p>
+                            <p><strong>Maaltijdtype:</strong> ${meal_type || "Niet beschikbaar"}</p>
+                            <p><strong>Prijsniveau:</strong> ${price_level || "Niet beschikbaar"}</p>
+                            <div class="mt-3">
+                                ${website_url ? `<a href="${website_url}" target="_blank" class="icon-custom mr-3"><i class="fas fa-globe fa-lg"></i></a>` : ""}
+                                ${instagram_url ? `<a href="${instagram_url}" target="_blank" class="icon-custom"><i class="fab fa-instagram fa-lg"></i></a>` : ""}
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            </div>`;
+    }
+
+    // Fetch the next page of recommendations for the current search and append the cards
+    function loadRecommendations() {
+        const search = currentSearch;
+        isLoading = true;
+        $("#loading-spinner").show();
+
+        $.post({
+            url: "/query",
+            contentType: "application/json",
+            data: JSON.stringify(search),
+            success: function (data) {
+                // Ignore pages of a search that has been replaced in the meantime
+                if (search !== currentSearch) {
+                    return;
+                }
+                $("#loading-spinner").hide();
+                data.results.forEach(restaurant => {
+                    $("#recommendations").append(renderRestaurant(restaurant));
+                });
+                currentSearch.cursor = data.next_cursor;
+                isLoading = false;
+                // Keep loading while the results do not fill the page, as there is nothing to scroll yet
+                loadMoreIfNearBottom();
+            },
+            error: function () {
+                if (search !== currentSearch) {
+                    return;
+                }
+                $("#loading-spinner").hide();
+                currentSearch.cursor = null;
+                isLoading = false;
+                alert("Failed to fetch recommendations. Please try again.");
+            }
+        });
+    }
+
+    // Load the next page if the bottom of the results is in or near the viewport
+    function loadMoreIfNearBottom() {
+        const nearBottom = $(window).scrollTop() + $(window).height() >= $(document).height() - 300;
+        if (nearBottom && !isLoading && currentSearch && currentSearch.cursor) {
+            loadRecommendations();
+        }
+    }
+
+    // Load more recommendations when the user scrolls near the bottom of the page
+    $(window).on("scroll", loadMoreIfNearBottom);
+
     // Submit form and gather filter data
     $("#question-form").on("submit", function (event) {
         event.preventDefault();
         const question = $("#question").val();
+        const city = $("#city").val() || $("#city").data("default");
 
         // Gather selected filter values for each category
         const mealTypes = $("input[name='meal_type']:checked").map(function () {
@@ -71,6 +179,7 @@ $(document).ready(function () {
         }).get();
 
         // Show loading spinner and clear previous results
+        currentSearch = null;
         $("#loading-spinner").show();
         $("#recommendations").empty();
 
@@ -81,66 +190,15 @@ $(document).ready(function () {
                 meal_type: mealTypes,
                 district: districts,
                 restaurant_type: restaurantTypes,
-                price_level: priceLevels
+                price_level: priceLevels,
+                city: [city]
             }),
             success: function (nameData) {
                 const names = nameData.names;
 
-                // Step 2: POST request to `/query` with names and question to get detailed recommendations
-                $.post({
-                    url: "/query",
-                    contentType: "application/json",
-                    data: JSON.stringify({
-                        question: question,
-                        names: names
-                    }),
-                    success: function (data) {
-                        $("#loading-spinner").hide();
-                        data.forEach(restaurant => {
-                            const {
-                                name,
-                                summary,
-                                image_url,
-                                website_url = '',
-                                instagram_url = '',
-                                restaurant_type = '',
-                                district = '',
-                                meal_type = '',
-                                price_level = ''
-                            } = restaurant;
-
-                            const card = `
-                                <div class="card my-3 card-custom">
-                                    <div class="row no-gutters h-100">
-                                        <div class="col-md-8">
-                                            <div class="card-body d-flex flex-column">
-                                                <h5 class="card-title">${name}</h5>
-                                                <p class="card-text">${summary}</p>
-                                            </div>
-                                        </div>
-                                        <div class="col-md-4 position-relative h-100">
-                                            <img src="${image_url}" class="card-img" alt="${name} image">
-                                            <div class="info-overlay">
-                                                <p><strong>Type:</strong> ${restaurant_type || "Niet beschikbaar"}</p>
-                                                <p><strong>District:</strong> ${district || "Niet beschikbaar"}</p>
-                                                <p><strong>Maaltijdtype:</strong> ${meal_type || "Niet beschikbaar"}</p>
-                                                <p><strong>Prijsniveau:</strong> ${price_level || "Niet beschikbaar"}</p>
-                                                <div class="mt-3">
-                                                    ${website_url ? `<a href="${website_url}" target="_blank" class="icon-custom mr-3"><i class="fas fa-globe fa-lg"></i></a>` : ""}
-                                                    ${instagram_url ? `<a href="${instagram_url}" target="_blank" class="icon-custom"><i class="fab fa-instagram fa-lg"></i></a>` : ""}
-                                                </div>
-                                            </div>
-                                        </div>
-                                    </div>
-                                </div>`;
-                            $("#recommendations").append(card);
-                        });
-                    },
-                    error: function () {
-                        $("#loading-spinner").hide();
-                        alert("Failed to fetch recommendations. Please try again.");
-                    }
-                });
+                // Step 2: POST request to `/query` with names and question to get the first page of recommendations
+                currentSearch = { question: question, names: names, city: city, cursor: null };
+                loadRecommendations();
             },
             error: function () {
                 $("#loading-spinner").hide();
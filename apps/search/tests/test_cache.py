@@ -0,0 +1,49 @@
+from pathlib import Path
+import pytest
+from apps.search import cache as cache_module
+from apps.search.cache import PersistentCache
+
+
+def test_unreadable_cache_is_a_miss(tmp_path: Path) -> None:
+    """
+    Tests that a cache file that cannot be read returns nothing and counts misses instead of failing.
+
+    Args:
+        tmp_path (Path): Temporary directory for the cache file.
+    """
+    cache = PersistentCache(str(tmp_path / "cache.db"))
+    cache.set("ranking", "a", {"names": ["Rozey"]})
+    assert cache.get("ranking", "a") == {"names": ["Rozey"]}
+
+    cache._connection.execute("DROP TABLE entries")
+    assert cache.get_many("ranking", ["a", "b"]) == {}
+    assert cache.stats() == {"hits": 1, "misses": 2}
+
+
+def test_prune_by_age_and_entries(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that writes delete entries older than max_age and the oldest entries beyond max_entries,
+    at most once per prune interval.
+
+    Args:
+        tmp_path (Path): Temporary directory for the cache file.
+        monkeypatch (pytest.MonkeyPatch): Fixture to control the clock of the cache.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = PersistentCache(str(tmp_path / "cache.db"), max_age=100, max_entries=3, prune_interval=10)
+
+    cache.set_many("translation", {"a": "A", "b": "B"})
+    now[0] += 5
+    cache.set_many("ranking", {"c": [], "d": []})
+    # Pruned on the first write only, so four entries are kept until the interval has passed
+    assert len(cache.get_many("translation", ["a", "b"])) == 2
+
+    now[0] += 10
+    cache.set("ranking", "e", [])
+    assert cache.get_many("translation", ["a", "b"]) == {}
+    assert set(cache.get_many("ranking", ["c", "d", "e"])) == {"c", "d", "e"}
+
+    now[0] += 200
+    cache.set("ranking", "f", [])
+    assert cache.get_many("ranking", ["c", "d", "e", "f"]) == {"f": []}
@@ -0,0 +1,83 @@
+import threading
+import time
+from typing import List, Optional
+import pytest
+from langchain_core.documents import Document
+from apps.search import pipeline, vectorstore
+from apps.search.cache import VersionedCache
+from apps.search.catalog import Catalog, RestaurantRecord
+from apps.search.pipeline import SearchPipeline
+
+
+class FakeWatcher:
+    """
+    A data version watcher whose version is set by the test.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes the watcher at data version 1.
+        """
+        self.version = 1
+
+    def current(self) -> int:
+        """Returns the data version."""
+        return self.version
+
+
+class FakeVectorStore:
+    """
+    A vector store that always finds Rozey and keeps the vector order.
+    """
+
+    collection_name = "restaurant_summaries_v1"
+    city = "rotterdam"
+
+    def search_candidates(self, query: str, filters: Optional[List[str]], k: int, lexical_query: Optional[str]) -> List[Document]:
+        """Returns Rozey."""
+        return [Document(page_content="Pasta", metadata={"name": "Rozey"})]
+
+    def rerank(self, query: str, documents: List[Document]) -> List[str]:
+        """Keeps the candidates in vector order."""
+        return [document.metadata["name"] for document in documents]
+
+
+def test_new_data_version_swaps_the_catalog(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that a data version bump loads the new catalog in the background, that requests are
+    served from the old catalog until it is loaded, that the new catalog is then swapped in, and
+    that a catalog taken by an in-flight request does not change.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the translation and the persistent cache.
+    """
+    monkeypatch.setattr(vectorstore, "translate_text", lambda text: text)
+    monkeypatch.setattr(pipeline, "get_persistent_cache", lambda: None)
+    release = threading.Event()
+
+    def load_catalog(version: int) -> Catalog:
+        if version > 1:
+            release.wait(5)
+        return Catalog(version, [RestaurantRecord(name="Rozey", city="rotterdam", address=f"Adres {version}")])
+
+    watcher = FakeWatcher()
+    catalog = VersionedCache(load_catalog, watcher)
+    search_pipeline = SearchPipeline(FakeVectorStore(), catalog, max_workers=2)
+
+    results, _ = search_pipeline.run("pasta")
+    assert [result["address"] for result in results] == ["Adres 1"]
+    _, in_flight = catalog.get()
+
+    watcher.version = 2
+    start = time.perf_counter()
+    results, _ = search_pipeline.run("pasta")
+    assert time.perf_counter() - start < 1
+    assert [result["address"] for result in results] == ["Adres 1"]
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while catalog.get()[0] != 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    results, _ = search_pipeline.run("pasta")
+    assert [result["address"] for result in results] == ["Adres 2"]
+    assert in_flight.version == 1 and in_flight.get_many(["Rozey"], "rotterdam")[0]["address"] == "Adres 1"
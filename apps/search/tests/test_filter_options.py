@@ -0,0 +1,64 @@
+from typing import Any, Dict, List
+import pytest
+from apps.search.cache import VersionedCache
+from config import settings
+
+
+class FakeWatcher:
+    """
+    A data version watcher whose version is set by the test.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes the watcher at data version 1.
+        """
+        self.version = 1
+
+    def current(self) -> int:
+        """Returns the data version."""
+        return self.version
+
+
+def test_filter_options_revalidate(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that the filter options carry an ETag and a public, revalidated Cache-Control header,
+    that a matching If-None-Match gets a 304 without a body, and that a new data version changes the ETag.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the filter counts and the data version.
+    """
+    from apps.search import app as app_module
+
+    counts: Dict[str, Any] = {"district": {"Centrum": 2}}
+    loads: List[int] = []
+
+    def fake_counts(session: Any, features: List[str]) -> Dict[str, Any]:
+        loads.append(len(loads))
+        return counts
+
+    watcher = FakeWatcher()
+    monkeypatch.setattr(app_module, "get_filter_value_counts", fake_counts)
+    monkeypatch.setattr(app_module, "filter_options_cache", VersionedCache(app_module.load_filter_options, watcher))
+    client = app_module.app.test_client()
+
+    response = client.get("/get_filter_options")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+    assert response.json == {"district": ["Centrum"], "counts": counts}
+    assert response.cache_control.public and response.cache_control.must_revalidate
+    assert response.cache_control.max_age == settings.search.FILTER_OPTIONS_MAX_AGE
+
+    response = client.get("/get_filter_options", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+    assert client.get("/get_filter_options", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert len(loads) == 1
+
+    # The ETag changes with the data version, even if the options are unchanged
+    watcher.version = 2
+    monkeypatch.setattr(app_module, "filter_options_cache", VersionedCache(app_module.load_filter_options, watcher))
+    response = client.get("/get_filter_options", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
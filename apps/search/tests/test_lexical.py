@@ -0,0 +1,131 @@
+from pathlib import Path
+from typing import Dict, Iterator, List
+import pytest
+from langchain_core.documents import Document
+from sqlalchemy.orm import Session
+from apps.search import vectorstore
+from apps.search.vectorstore import VectorStore, reciprocal_rank_fusion
+from config import settings
+from data.crud import index_documents, search_fts
+from data.scheme import RestaurantData, create_database_engine
+
+
+def document(name: str) -> Document:
+    """
+    Builds the stored document of a restaurant.
+
+    Args:
+        name (str): Name of the restaurant.
+
+    Returns:
+        Document: The document.
+    """
+    return Document(page_content=f"Over {name}", metadata={"name": name})
+
+
+@pytest.fixture
+def session(tmp_path: Path) -> Iterator[Session]:
+    """
+    Provides a session on a database with restaurants in two cities and their full-text index.
+
+    Args:
+        tmp_path (Path): Temporary directory for the database.
+
+    Yields:
+        Session: The session.
+    """
+    engine = create_database_engine(str(tmp_path / "restaurants.db"))
+    with Session(bind=engine) as session:
+        session.add_all([
+            RestaurantData(name="Rozey", city="rotterdam"),
+            RestaurantData(name="Shiki", city="rotterdam"),
+            RestaurantData(name="Pasta Pasta", city="amsterdam"),
+        ])
+        index_documents(session, [
+            {"name": "Rozey", "city": "rotterdam", "source": None, "kind": "summary", "text": "Verse pasta en pizza aan de Maas"},
+            {"name": "Shiki", "city": "rotterdam", "source": None, "kind": "summary", "text": "Japanse ramen en sushi"},
+            {"name": "Pasta Pasta", "city": "amsterdam", "source": None, "kind": "summary", "text": "Pasta pasta pasta, elke dag verse pasta"},
+        ])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def test_reciprocal_rank_fusion() -> None:
+    """
+    Tests that items ranked high in several rankings come first, that an item in one ranking
+    only is kept, and that ties keep the order in which the items were first seen.
+    """
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["b", "a", "d"]], k=60) == ["a", "b", "c", "d"]
+    # c ranks first in one ranking and last in the other, which beats second place in both
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["c", "b"]], k=60) == ["c", "b", "a"]
+    # A small k lets a single top rank outweigh agreement between the rankings
+    assert reciprocal_rank_fusion([["a", "b", "c", "d", "e"], ["e", "c"]], k=60)[0] == "c"
+    assert reciprocal_rank_fusion([["a", "b", "c", "d", "e"], ["e", "c"]], k=1)[0] == "e"
+    assert reciprocal_rank_fusion([["a"], []], k=1) == ["a"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_fuse_lexical_order(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that hybrid mode fuses the vector and full-text rankings, fetches the documents of
+    lexical matches the vector search missed, and drops names without a stored document.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the full-text search and the database session.
+    """
+    searches: List[Dict] = []
+
+    def fake_search_fts(session, query, names=None, limit=20, city=None) -> List[str]:
+        searches.append({"query": query, "names": names, "limit": limit, "city": city})
+        return ["Shiki", "Verdwenen", "Rozey"]
+
+    monkeypatch.setattr(vectorstore, "search_fts", fake_search_fts)
+    monkeypatch.setattr(vectorstore, "Session", lambda: type("Closable", (), {"close": lambda self: None})())
+    monkeypatch.setattr(settings.search, "SEARCH_MODE", "hybrid")
+
+    store = VectorStore.__new__(VectorStore)
+    store.city = "rotterdam"
+    store._get_documents = lambda names: {name: document(name) for name in names if name != "Verdwenen"}
+
+    fused = store._fuse_lexical([document("Rozey"), document("Bistro")], None, 4, "pasta")
+    assert [doc.metadata["name"] for doc in fused] == ["Rozey", "Shiki", "Bistro"]
+    fused = store._fuse_lexical([document("Rozey"), document("Bistro")], ["Rozey", "Shiki"], 2, "pasta")
+    assert [doc.metadata["name"] for doc in fused] == ["Rozey", "Shiki"]
+    assert searches[-1] == {"query": "pasta", "names": ["Rozey", "Shiki"], "limit": 2, "city": "rotterdam"}
+
+    # Without a query, or outside hybrid mode, the vector results are returned as is
+    assert [doc.metadata["name"] for doc in store._fuse_lexical([document("Bistro")], None, 3, None)] == ["Bistro"]
+    monkeypatch.setattr(settings.search, "SEARCH_MODE", "vector")
+    assert [doc.metadata["name"] for doc in store._fuse_lexical([document("Bistro")], None, 3, "pasta")] == ["Bistro"]
+    assert len(searches) == 2
+
+
+def test_search_fts_quotes_operators(session: Session) -> None:
+    """
+    Tests that FTS5 syntax in a user query is matched literally instead of failing or changing
+    the query, and that a query without searchable terms returns nothing.
+
+    Args:
+        session (Session): Session on the test database.
+    """
+    assert search_fts(session, "pasta") == ["Pasta Pasta", "Rozey"]
+    assert set(search_fts(session, 'pasta" OR NOT "ramen')) == {"Pasta Pasta", "Shiki", "Rozey"}
+    assert set(search_fts(session, "sushi* NEAR(pizza) -ramen")) == {"Rozey", "Shiki"}
+    assert search_fts(session, "text:sushi") == ["Shiki"]
+    assert search_fts(session, '"" * ( ) a') == []
+
+
+def test_search_fts_city_and_names(session: Session) -> None:
+    """
+    Tests that the city subquery restricts the matches to the restaurants of the city, also
+    combined with a names filter.
+
+    Args:
+        session (Session): Session on the test database.
+    """
+    assert search_fts(session, "pasta", city="rotterdam") == ["Rozey"]
+    assert search_fts(session, "pasta", city="amsterdam") == ["Pasta Pasta"]
+    assert search_fts(session, "pasta", city="utrecht") == []
+    assert search_fts(session, "pasta sushi", names=["Shiki", "Pasta Pasta"], city="rotterdam") == ["Shiki"]
+    assert search_fts(session, "pasta", limit=1) == ["Pasta Pasta"]
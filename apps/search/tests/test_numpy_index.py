@@ -0,0 +1,98 @@
+import json
+import os
+from pathlib import Path
+import numpy as np
+from apps.search.numpy_index import CURRENT_FILE, EMBEDDINGS_FILE, IDS_FILE, NumpyIndex
+
+NAMES = ["Rozey", "Shiki", "Bistro Ruimzicht", "De Ballentent"]
+EMBEDDINGS = [[1, 0, 0], [0, 2, 0], [0.9, 0.1, 0], [0, 0, 3]]
+
+
+def build(path: Path, names: list = NAMES, embeddings: list = EMBEDDINGS) -> NumpyIndex:
+    """
+    Exports an index and opens it.
+
+    Args:
+        path (Path): Directory to write the index to.
+        names (list): Restaurant name of each row.
+        embeddings (list): Embedding of each row.
+
+    Returns:
+        NumpyIndex: The opened index.
+    """
+    NumpyIndex.export(str(path), names, [f"Over {name}" for name in names], embeddings)
+    return NumpyIndex(str(path))
+
+
+def test_search_returns_top_k_most_similar_first(tmp_path: Path) -> None:
+    """
+    Tests that the top-k rows are selected and sorted by cosine similarity, independent of the
+    embedding and query norms, and that k is capped by the number of rows.
+
+    Args:
+        tmp_path (Path): Temporary directory for the index.
+    """
+    index = build(tmp_path)
+
+    results = index.search([10, 0, 0], k=2)
+    assert [NAMES[row] for row, _ in results] == ["Rozey", "Bistro Ruimzicht"]
+    assert results[0][1] == np.float32(1.0)
+
+    results = index.search([0, 1, 0.5], k=10)
+    assert [NAMES[row] for row, _ in results] == ["Shiki", "De Ballentent", "Bistro Ruimzicht", "Rozey"]
+
+
+def test_search_batch_with_masks(tmp_path: Path) -> None:
+    """
+    Tests that each query of a batch only returns the rows of its own mask, that unknown names
+    are ignored, and that a mask with fewer rows than k returns only those rows.
+
+    Args:
+        tmp_path (Path): Temporary directory for the index.
+    """
+    index = build(tmp_path)
+
+    assert index.mask(None) is None
+    assert index.mask([]) is None
+    mask = index.mask(["Shiki", "De Ballentent", "Unknown"])
+    assert mask.tolist() == [False, True, False, True]
+
+    results = index.search_batch([[1, 0, 0], [1, 0, 0], [1, 0, 0]], k=2, masks=[None, mask, index.mask(["Unknown"])])
+    assert [NAMES[row] for row, _ in results[0]] == ["Rozey", "Bistro Ruimzicht"]
+    assert sorted(NAMES[row] for row, _ in results[1]) == ["De Ballentent", "Shiki"]
+    assert results[2] == []
+
+    results = index.search_batch([[0, 0, 1]], k=3, masks=[index.mask(["De Ballentent"])])
+    assert [NAMES[row] for row, _ in results[0]] == ["De Ballentent"]
+
+
+def test_export_swaps_both_files_at_once(tmp_path: Path) -> None:
+    """
+    Tests that a new export is written to its own directory and activated by the current file,
+    that an open index keeps reading its own export, that only the previous export is kept, and
+    that an export written before versioning is still opened and later removed.
+
+    Args:
+        tmp_path (Path): Temporary directory for the index.
+    """
+    # An export written before versioning holds its files in the index directory itself
+    np.save(tmp_path / EMBEDDINGS_FILE, np.asarray(EMBEDDINGS, dtype=np.float32))
+    with open(tmp_path / IDS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"names": NAMES, "documents": NAMES}, f)
+    assert NumpyIndex(str(tmp_path)).names == NAMES
+
+    first = build(tmp_path, ["Rozey"], [[1, 0, 0]])
+    assert first.names == ["Rozey"]
+    # The previous export is kept for readers that are opening it
+    assert (tmp_path / EMBEDDINGS_FILE).exists()
+
+    second = build(tmp_path, ["Shiki", "Rozey"], [[0, 1, 0], [1, 0, 0]])
+    third = build(tmp_path, ["Shiki"], [[0, 1, 0]])
+    assert first.names == ["Rozey"] and first.matrix.shape == (1, 3)
+    assert second.names == ["Shiki", "Rozey"] and second.matrix.shape == (2, 3)
+    assert third.names == ["Shiki"]
+
+    exports = sorted(entry for entry in os.listdir(tmp_path) if entry != CURRENT_FILE)
+    assert len(exports) == 2
+    assert (tmp_path / CURRENT_FILE).read_text(encoding="utf-8") == exports[-1]
+    assert not (tmp_path / EMBEDDINGS_FILE).exists() and not (tmp_path / IDS_FILE).exists()
@@ -0,0 +1,234 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import pytest
+from langchain_core.documents import Document
+from apps.search import pipeline, vectorstore
+from apps.search.pipeline import InvalidCursorError, SearchPipeline
+from config import settings
+
+NAMES = [f"Restaurant {i:02d}" for i in range(30)]
+
+
+class FakeVectorStore:
+    """
+    A vector store ranking the restaurants in a fixed order, whose reranker drops every third candidate.
+    """
+
+    collection_name = "restaurant_summaries_v1"
+    city = "rotterdam"
+
+    def __init__(self) -> None:
+        """
+        Initializes the store without calls.
+        """
+        self.reranked: List[List[str]] = []
+        self.batch_k: Optional[int] = None
+        self.queries: List[str] = []
+
+    def search_candidates(self, query: str, filters: Optional[List[str]], k: int, lexical_query: Optional[str]) -> List[Document]:
+        """Returns the first k restaurants that pass the filters."""
+        self.queries.append(query)
+        names = [name for name in NAMES if not filters or name in filters][:k]
+        return [Document(page_content=name, metadata={"name": name}) for name in names]
+
+    def rerank(self, query: str, documents: List[Document]) -> List[str]:
+        """Records the candidates and ranks them."""
+        names = [document.metadata["name"] for document in documents]
+        self.reranked.append(names)
+        # Reversed, without every third candidate, with an unknown name and a duplicate
+        return [name for i, name in enumerate(names) if i % 3 != 2][::-1] + ["Onbekend", names[0]]
+
+    def search_candidates_batch(self, queries: List[str], filters: List[Optional[List[str]]], k: int) -> List[List[Document]]:
+        """Returns the first k restaurants that pass the filters of each query."""
+        self.batch_k = k
+        return [self.search_candidates(query, names, k, query) for query, names in zip(queries, filters)]
+
+    def rerank_batch(self, queries: List[str], documents: List[List[Document]]) -> List[List[str]]:
+        """Ranks the candidates of each query."""
+        return [self.rerank(query, candidates) for query, candidates in zip(queries, documents)]
+
+
+class FakeCatalog:
+    """
+    A catalog of the current data version returning only the name of each restaurant.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes the catalog at data version 1.
+        """
+        self.version = 1
+
+    def get(self) -> Tuple[int, "FakeCatalog"]:
+        """Returns the data version and the catalog."""
+        return self.version, self
+
+    def get_many(self, names: List[str], city: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Returns the data of the given restaurants."""
+        return [{"name": name} for name in names]
+
+
+@pytest.fixture
+def search(monkeypatch: pytest.MonkeyPatch) -> Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]:
+    """
+    Provides a pipeline on the fake vector store and catalog, without the persistent cache.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the translation and the persistent cache.
+
+    Returns:
+        Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]: The pipeline, its vector store and catalog.
+    """
+    monkeypatch.setattr(vectorstore, "translate_text", lambda text: text)
+    monkeypatch.setattr(pipeline, "get_persistent_cache", lambda: None)
+    store, catalog = FakeVectorStore(), FakeCatalog()
+    return SearchPipeline(store, catalog, max_workers=2), store, catalog
+
+
+def names(results: List[Dict[str, Any]]) -> List[str]:
+    """
+    Returns the name of each result.
+
+    Args:
+        results (List[Dict[str, Any]]): Restaurant data.
+
+    Returns:
+        List[str]: The names.
+    """
+    return [result["name"] for result in results]
+
+
+def test_pages_rerank_the_next_window(search: Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]) -> None:
+    """
+    Tests that pagination continues past the first reranked pool by reranking the next window of
+    candidates, that every candidate is reranked once, and that pages within the ranking are
+    served from the cache.
+
+    Args:
+        search (Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]): The pipeline, its vector store and catalog.
+    """
+    search_pipeline, store, _ = search
+
+    pages, cursor = [], None
+    while True:
+        results, cursor = search_pipeline.run("pasta", page_size=5, pool_size=6, cursor=cursor)
+        pages.append(names(results))
+        if cursor is None:
+            break
+
+    served = [name for page in pages for name in page]
+    # Two of every three candidates are kept, in the reranked order of their window
+    assert len(served) == 20 and len(set(served)) == 20
+    assert served[:4] == ["Restaurant 04", "Restaurant 03", "Restaurant 01", "Restaurant 00"]
+    assert [name for window in store.reranked for name in window] == NAMES
+    assert all(0 < len(page) <= 5 for page in pages)
+
+    # The first page is cached
+    search_pipeline.run("Pasta ", page_size=5, pool_size=6)
+    assert len(store.reranked) == 5
+
+
+def test_filters_cap_the_ranking(search: Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]) -> None:
+    """
+    Tests that the pool size and the ranked candidates are capped by the filtered names.
+
+    Args:
+        search (Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]): The pipeline, its vector store and catalog.
+    """
+    search_pipeline, store, _ = search
+    filters = NAMES[:4]
+
+    results, cursor = search_pipeline.run("pasta", filters=filters, page_size=10, pool_size=12)
+    assert names(results) == ["Restaurant 03", "Restaurant 01", "Restaurant 00"]
+    assert cursor is None
+    assert store.reranked == [filters]
+
+
+def test_cursor_of_an_earlier_data_version(search: Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]) -> None:
+    """
+    Tests that a new data version invalidates the cached rankings and the cursors of its searches.
+
+    Args:
+        search (Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]): The pipeline, its vector store and catalog.
+    """
+    search_pipeline, store, catalog = search
+
+    _, cursor = search_pipeline.run("pasta", page_size=2, pool_size=6)
+    catalog.version = 2
+    with pytest.raises(InvalidCursorError):
+        search_pipeline.run("pasta", page_size=2, pool_size=6, cursor=cursor)
+
+    search_pipeline.run("pasta", page_size=2, pool_size=6)
+    assert len(store.reranked) == 2
+
+
+def test_batch_filters_and_caps_like_run(search: Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]) -> None:
+    """
+    Tests that batched searches cap the pool of each question by its filters and drop reranked
+    names that are not candidates, like single searches.
+
+    Args:
+        search (Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]): The pipeline, its vector store and catalog.
+    """
+    search_pipeline, store, _ = search
+
+    results = search_pipeline.run_batch(["pasta", "sushi"], [None, NAMES[:4]], page_size=10, pool_size=6)
+    assert store.batch_k == 6
+    assert store.reranked == [NAMES[:6], NAMES[:4]]
+    assert [names(page) for page in results] == [
+        ["Restaurant 04", "Restaurant 03", "Restaurant 01", "Restaurant 00"],
+        ["Restaurant 03", "Restaurant 01", "Restaurant 00"],
+    ]
+    assert search_pipeline.run_batch([], []) == []
+
+
+def test_slow_rerank_keeps_vector_order(search: Tuple[SearchPipeline, FakeVectorStore, FakeCatalog], monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that a reranker that does not answer within its timeout leaves the candidates in vector
+    order, that the request does not wait for it, and that the degraded ranking is not cached.
+
+    Args:
+        search (Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]): The pipeline, its vector store and catalog.
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the reranker and its timeout.
+    """
+    search_pipeline, store, _ = search
+    monkeypatch.setattr(settings.search, "RERANK_TIMEOUT", 0.1)
+    monkeypatch.setattr(store, "rerank", lambda query, documents: time.sleep(1) or ["Restaurant 05"])
+
+    start = time.perf_counter()
+    results, cursor = search_pipeline.run("pasta", page_size=4, pool_size=6)
+    assert time.perf_counter() - start < 0.8
+    assert names(results) == NAMES[:4]
+    assert cursor is not None
+
+    search_pipeline.run("pasta", page_size=4, pool_size=6)
+    assert store.queries == ["pasta", "pasta"]
+
+
+@pytest.mark.parametrize("translate", [
+    lambda text: time.sleep(1) or "translated",
+    lambda text: 1 / 0,
+])
+def test_failed_translation_searches_the_question(
+    search: Tuple[SearchPipeline, FakeVectorStore, FakeCatalog],
+    monkeypatch: pytest.MonkeyPatch,
+    translate: Any
+) -> None:
+    """
+    Tests that a translation that times out or fails is replaced by the untranslated question,
+    and that the request does not wait for a slow translation.
+
+    Args:
+        search (Tuple[SearchPipeline, FakeVectorStore, FakeCatalog]): The pipeline, its vector store and catalog.
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the translation and its timeout.
+        translate (Any): The slow or failing translation.
+    """
+    search_pipeline, store, _ = search
+    monkeypatch.setattr(settings.search, "TRANSLATE_TIMEOUT", 0.1)
+    monkeypatch.setattr(vectorstore, "translate_text", translate)
+
+    start = time.perf_counter()
+    results, _ = search_pipeline.run("verse pasta", page_size=3, pool_size=6)
+    assert time.perf_counter() - start < 0.8
+    assert store.queries == ["verse pasta"]
+    assert names(results) == ["Restaurant 04", "Restaurant 03", "Restaurant 01"]
@@ -0,0 +1,42 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Maximum seconds to import the search app in a fresh interpreter, before any warm-up
+IMPORT_TIME_BUDGET = 2.0
+
+# Dependencies that must only be imported by the warm-up hook or the ingestion tasks
+HEAVY_MODULES = ['langchain_openai', 'langchain_chroma', 'chromadb', 'openai', 'selenium', 'pandas']
+
+ROOT = Path(__file__).resolve().parents[3]
+
+def import_search_app() -> dict:
+    """
+    Imports the search app in a fresh interpreter and reports the import time and the heavy modules loaded.
+
+    Returns:
+        dict: The import time in seconds and the names of the heavy modules that were imported.
+    """
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import apps.search.app\n"
+        "seconds = time.perf_counter() - start\n"
+        f"print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_import_is_lazy() -> None:
+    """
+    Tests that importing the search app does not load LangChain, Chroma, OpenAI or the scraping dependencies.
+    """
+    assert import_search_app()['loaded'] == []
+
+def test_import_time_budget() -> None:
+    """
+    Tests that the search app imports within the cold start budget, taking the best of three runs.
+    """
+    seconds = min(import_search_app()['seconds'] for _ in range(3))
+    assert seconds < IMPORT_TIME_BUDGET, f"Importing apps.search.app took {seconds:.2f}s, budget is {IMPORT_TIME_BUDGET}s"
@@ -0,0 +1,37 @@
+from pathlib import Path
+import pytest
+from config import settings
+from data.thumbnails import store_thumbnail
+
+NAME = f"{'0' * 64}.webp"
+
+
+@pytest.mark.parametrize("name, status", [
+    ("stored", 200),
+    (NAME, 404),
+    ("..%2Fsettings.toml", 404),
+    (f"{'A' * 64}.webp", 404),
+    ("logo.webp", 404),
+])
+def test_thumbnail_names(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, name: str, status: int) -> None:
+    """
+    Tests that stored thumbnails are served with an immutable cache lifetime, and that missing
+    thumbnails and names that are not a content hash are not found.
+
+    Args:
+        tmp_path (Path): Temporary directory for the thumbnail store.
+        monkeypatch (pytest.MonkeyPatch): Fixture to point the store at the temporary directory.
+        name (str): The requested file name, "stored" for a stored thumbnail.
+        status (int): The expected status code.
+    """
+    from apps.search.app import app
+
+    monkeypatch.setattr(settings.thumbnails, "DIR", str(tmp_path))
+    if name == "stored":
+        name = store_thumbnail(b"thumbnail")
+
+    response = app.test_client().get(f"{settings.thumbnails.URL_PREFIX}/{name}")
+    assert response.status_code == status
+    if status == 200:
+        assert response.data == b"thumbnail"
+        assert response.cache_control.immutable and response.cache_control.max_age == settings.thumbnails.MAX_AGE
@@ -0,0 +1,119 @@
+import hashlib
+from pathlib import Path
+from typing import List
+import chromadb
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+from apps.search import vectorstore
+from apps.search.numpy_index import numpy_index_path
+from apps.search.vectorstore import StoreEmbeddings, VectorStore, build_city
+from config import settings
+from data.embeddings import EmbeddingStore
+from data.index_versions import IndexPointer, partition_name
+
+NAMES = ["Rozey", "Shiki", "Bistro Ruimzicht"]
+TEXTS = ["Fresh pasta by the river", "Japanese ramen and sushi", "French bistro with a view"]
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Embeddings derived from a hash of the text, so equal texts have equal embeddings.
+    """
+
+    def __init__(self, fail: bool = False) -> None:
+        """
+        Initializes the embeddings.
+
+        Args:
+            fail (bool): Whether embedding documents fails.
+        """
+        self.fail = fail
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeds texts, or fails if configured to."""
+        if self.fail:
+            raise RuntimeError("embedding service unavailable")
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embeds a text."""
+        seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).normal(size=8).tolist()
+
+
+@pytest.fixture
+def numpy_backend(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """
+    Puts the Chroma database, the NumPy exports and the embedding store in a temporary directory
+    and selects the NumPy backend.
+
+    Args:
+        tmp_path (Path): Temporary directory for the indexes.
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the settings.
+
+    Returns:
+        Path: The Chroma database directory.
+    """
+    chroma_path = tmp_path / "chroma"
+    monkeypatch.setattr(settings.search, "CHROMA_DB_PATH", str(chroma_path))
+    monkeypatch.setattr(settings.search, "NUMPY_INDEX_PATH", str(tmp_path / "numpy"))
+    monkeypatch.setattr(settings.search, "VECTOR_BACKEND", "numpy")
+    return chroma_path
+
+
+def use_embeddings(monkeypatch: pytest.MonkeyPatch, tmp_path: Path, model: Embeddings) -> None:
+    """
+    Makes the search collections embed with the given model and a temporary embedding store.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the embeddings.
+        tmp_path (Path): Temporary directory for the embedding store.
+        model (Embeddings): The embedding model.
+    """
+    store = EmbeddingStore(str(tmp_path / "embeddings.db"), "hash")
+    monkeypatch.setattr(vectorstore, "search_embeddings", lambda: StoreEmbeddings(store, model))
+
+
+def test_numpy_build_is_served(numpy_backend: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that a build with the NumPy backend exports the new version and that a vector store
+    following the pointer switches to it.
+
+    Args:
+        numpy_backend (Path): The Chroma database directory.
+        tmp_path (Path): Temporary directory for the embedding store.
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the embeddings.
+    """
+    use_embeddings(monkeypatch, tmp_path, HashEmbeddings())
+
+    first = build_city("rotterdam", NAMES, TEXTS)
+    store = VectorStore(city="rotterdam")
+    assert store.collection_name == first
+    assert [document.metadata["name"] for document in store.similarity_search(TEXTS[1], k=1)] == ["Shiki"]
+
+    second = build_city("rotterdam", NAMES[:2], TEXTS[:2])
+    assert store.refresh().name == second
+    assert store.numpy_index.names == NAMES[:2]
+    assert store.numpy_index.path == numpy_index_path(second)
+
+
+def test_failed_numpy_build_raises_its_own_error(numpy_backend: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that a build failing before its NumPy export is written reports its own error, removes
+    the half-built collection and keeps the active version.
+
+    Args:
+        numpy_backend (Path): The Chroma database directory.
+        tmp_path (Path): Temporary directory for the embedding store.
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the embeddings.
+    """
+    use_embeddings(monkeypatch, tmp_path, HashEmbeddings(fail=True))
+
+    with pytest.raises(RuntimeError, match="embedding service unavailable"):
+        build_city("rotterdam", NAMES, TEXTS)
+
+    pointer = IndexPointer(str(numpy_backend), partition_name(settings.search.CHROMA_COLLECTION_NAME, "rotterdam"))
+    assert pointer.active() == settings.search.CHROMA_COLLECTION_NAME
+    assert chromadb.PersistentClient(path=str(numpy_backend)).list_collections() == []
+    assert not Path(settings.search.NUMPY_INDEX_PATH).exists() or not any(Path(settings.search.NUMPY_INDEX_PATH).iterdir())
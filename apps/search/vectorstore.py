@@ -1,46 +1,221 @@
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import CommaSeparatedListOutputParser, StrOutputParser
+from langchain_core.output_parsers import CommaSeparatedListOutputParser, JsonOutputParser, StrOutputParser
+from langchain_core.runnables import Runnable
+import json
+import logging
 import os
+import shutil
+import threading
+import chromadb
 from config import settings
 from langchain_chroma import Chroma
-from typing import List, Optional
+from typing import Dict, List, NamedTuple, Optional, Sequence
 from data.scheme import Session, RestaurantSummary
+from data.crud import search_fts
+from data.embeddings import EmbeddingStore, get_embedding_store
+from data.index_versions import IndexPointer, build_version, partition_name
+from apps.common.cache import LRUCache
+from apps.search.numpy_index import NumpyIndex, export_from_chroma, numpy_index_path
+from apps.search.metrics import stage_timer
+from apps.search.cache import get_persistent_cache, make_digest
 
 # Set OpenAI API key from settings
 os.environ['OPENAI_API_KEY'] = settings.OPENAI_API_KEY
 
+logger = logging.getLogger(__name__)
+
+
+class StoreEmbeddings(Embeddings):
+    """
+    LangChain embeddings that read documents from and write them to the shared embedding store.
+
+    Queries are embedded directly and only kept in a bounded in-memory cache, so user queries
+    never grow the embedding store.
+    """
+
+    def __init__(self, store: EmbeddingStore, model: Embeddings) -> None:
+        """
+        Initializes the embeddings.
+
+        Args:
+            store (EmbeddingStore): The shared embedding store.
+            model (Embeddings): The embedding model used for queries and for texts that are not stored yet.
+        """
+        self.store = store
+        self.model = model
+        self.queries: LRUCache[List[float]] = LRUCache(maxsize=settings.embeddings.QUERY_CACHE_SIZE)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds texts, reusing stored embeddings.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            List[List[float]]: The embedding of each text.
+        """
+        return self.store.embed(texts, self.model.embed_documents)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds queries, reusing recently embedded queries and embedding the rest in one call.
+
+        Args:
+            texts (List[str]): The queries to embed.
+
+        Returns:
+            List[List[float]]: The embedding of each query.
+        """
+        vectors = {text: vector for text in texts if (vector := self.queries.get(text)) is not None}
+        missing = [text for text in dict.fromkeys(texts) if text not in vectors]
+        if missing:
+            embedded = [self.model.embed_query(missing[0])] if len(missing) == 1 else self.model.embed_documents(missing)
+            for text, vector in zip(missing, embedded):
+                self.queries.set(text, vector)
+                vectors[text] = vector
+        return [vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a query, reusing its embedding if it was embedded recently.
+
+        Args:
+            text (str): The query to embed.
+
+        Returns:
+            List[float]: The embedding of the query.
+        """
+        return self.embed_queries([text])[0]
+
+
+def search_embeddings() -> StoreEmbeddings:
+    """
+    Builds the embeddings of the search collections, backed by the shared embedding store.
+
+    Returns:
+        StoreEmbeddings: The embeddings.
+    """
+    return StoreEmbeddings(
+        get_embedding_store(),
+        OpenAIEmbeddings(model=settings.embeddings.MODEL, timeout=settings.search.SEARCH_TIMEOUT)
+    )
+
+
+def open_collection(collection_name: str, embeddings: Embeddings) -> Chroma:
+    """
+    Opens a Chroma collection of restaurant summaries, creating it if it does not exist.
+
+    Args:
+        collection_name (str): Name of the collection.
+        embeddings (Embeddings): Embeddings of the stored summaries and the queries.
+
+    Returns:
+        Chroma: The Chroma vector store.
+    """
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings,
+        persist_directory=settings.search.CHROMA_DB_PATH,
+        collection_metadata={"hnsw:space": "cosine"}
+    )
+
+
+class ServedCollection(NamedTuple):
+    """
+    A version of a search collection with its NumPy export, swapped in as a whole.
+    """
+
+    name: str
+    vector_store: Chroma
+    numpy_index: Optional[NumpyIndex]
+
 
 class VectorStore:
     """
     A class to manage a vector store for storing and querying restaurant summaries.
+
+    Every city has its own collection, so a search only scans the restaurants of one city.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, collection_name: Optional[str] = None, city: Optional[str] = None) -> None:
         """
         Initializes the VectorStore by setting up the vector store and LLM based on settings.
+
+        Args:
+            collection_name (Optional[str]): The collection to use. By default the active version of the
+                city's partition is used, and the vector store switches to a new version as soon as it is activated.
+            city (Optional[str]): Key of the city, by default settings.DEFAULT_CITY.
         """
-        self.vector_store = self._initialize_vector_store()
+        self.city = city or settings.DEFAULT_CITY
+        self.embeddings: StoreEmbeddings = search_embeddings()
+        self.pointer = IndexPointer(
+            settings.search.CHROMA_DB_PATH, partition_name(settings.search.CHROMA_COLLECTION_NAME, self.city)
+        )
+        self.follow_pointer = collection_name is None
+        # Guards switching versions, searches read the served collection without locking
+        self.refresh_lock = threading.Lock()
+        self.collection = self._open(collection_name or self.pointer.active())
+        # Requests end with their pipeline stage, so an abandoned stage does not hold a pipeline worker
         self.llm = ChatOpenAI(
             model=settings.search.OPENAI_MODEL, 
-            temperature=settings.search.OPENAI_TEMPERATUE
+            temperature=settings.search.OPENAI_TEMPERATUE,
+            timeout=settings.search.RERANK_TIMEOUT,
+            max_retries=0
         )
 
-    def _initialize_vector_store(self) -> Chroma:
+    def _open(self, collection_name: str) -> ServedCollection:
         """
-        Initializes the Chroma vector store with OpenAI embeddings based on settings.
+        Opens a version of the collection and, with the NumPy backend, its export.
+
+        Args:
+            collection_name (str): Name of the collection.
 
         Returns:
-            Chroma: The initialized Chroma vector store.
+            ServedCollection: The opened collection.
         """
-        embeddings = OpenAIEmbeddings(model=settings.search.EMBED_MODEL)
-        return Chroma(
-            collection_name=settings.search.CHROMA_COLLECTION_NAME,
-            embedding_function=embeddings,
-            persist_directory=settings.search.CHROMA_DB_PATH,
-            collection_metadata={"hnsw:space": "cosine"}
-        )
+        numpy_index = NumpyIndex(numpy_index_path(collection_name)) if settings.search.VECTOR_BACKEND == "numpy" else None
+        return ServedCollection(collection_name, open_collection(collection_name, self.embeddings), numpy_index)
+
+    @property
+    def collection_name(self) -> str:
+        """The name of the served collection."""
+        return self.collection.name
+
+    @property
+    def vector_store(self) -> Chroma:
+        """The Chroma vector store of the served collection."""
+        return self.collection.vector_store
+
+    @property
+    def numpy_index(self) -> Optional[NumpyIndex]:
+        """The NumPy export of the served collection, None with the Chroma backend."""
+        return self.collection.numpy_index
+
+    def refresh(self) -> ServedCollection:
+        """
+        Switches to the active version of the collection if a rebuild activated a new one or
+        rolled back, so serving picks up new versions without a restart.
+
+        The new version is opened by one thread and swapped in with a single assignment, so a
+        search never pairs a Chroma collection with the NumPy export of another version.
+
+        Returns:
+            ServedCollection: The collection to search.
+        """
+        collection = self.collection
+        if not self.follow_pointer or self.pointer.active() == collection.name:
+            return collection
+
+        with self.refresh_lock:
+            active = self.pointer.active()
+            if active != self.collection.name:
+                self.collection = self._open(active)
+                logger.info(f"Switched to vector collection {active}.")
+            return self.collection
 
     def add_documents(self, texts: List[str], names: List[str]) -> None:
         """
@@ -56,6 +231,244 @@ class VectorStore:
         ]
         self.vector_store.add_documents(documents=documents, ids=names)
 
+    def search_candidates(
+        self,
+        query: str,
+        filters: Optional[List[str]] = None,
+        k: int = 20,
+        lexical_query: Optional[str] = None
+    ) -> List[Document]:
+        """
+        Retrieves the candidate documents most relevant to the given (translated) query.
+
+        In hybrid mode (settings.search.SEARCH_MODE = "hybrid") the vector results are fused with
+        BM25 results from the full-text index using reciprocal rank fusion, so exact restaurant
+        names, dishes and street names are found even if the embedding misses them.
+
+        Args:
+            query (str): The query in English, matching the language of the stored summaries.
+            filters (Optional[List[str]]): A list of restaurant names to filter the results (optional).
+            k (int): Number of candidates to retrieve.
+            lexical_query (Optional[str]): The original query for the full-text search (optional).
+
+        Returns:
+            List[Document]: Candidate documents ordered by relevance, with the restaurant name in the metadata.
+        """
+        return self._fuse_lexical(self.similarity_search(query, k, filters), filters, k, lexical_query)
+
+    def _fuse_lexical(
+        self,
+        documents: List[Document],
+        filters: Optional[List[str]],
+        k: int,
+        lexical_query: Optional[str]
+    ) -> List[Document]:
+        """
+        Fuses vector search results with full-text search results in hybrid mode.
+
+        Args:
+            documents (List[Document]): Vector search results, most similar first.
+            filters (Optional[List[str]]): A list of restaurant names to filter the results (optional).
+            k (int): Number of candidates to return.
+            lexical_query (Optional[str]): The original query for the full-text search (optional).
+
+        Returns:
+            List[Document]: The fused candidates, or the vector results outside hybrid mode.
+        """
+        if settings.search.SEARCH_MODE != "hybrid" or not lexical_query:
+            return documents
+
+        session = Session()
+        try:
+            with stage_timer("lexical_search"):
+                lexical_names = search_fts(session, lexical_query, names=filters, limit=k, city=self.city)
+        finally:
+            session.close()
+
+        vector_names = [document.metadata['name'] for document in documents]
+        names = reciprocal_rank_fusion([vector_names, lexical_names], k=settings.search.RRF_K)[:k]
+
+        documents_by_name = {document.metadata['name']: document for document in documents}
+        documents_by_name.update(self._get_documents([name for name in names if name not in documents_by_name]))
+        return [documents_by_name[name] for name in names if name in documents_by_name]
+
+    def similarity_search(self, query: str, k: int, filters: Optional[List[str]] = None) -> List[Document]:
+        """
+        Retrieves the documents most similar to a query from the configured vector backend.
+
+        With settings.search.VECTOR_BACKEND = "numpy" the search is an exact cosine search over the
+        memory-mapped NumPy index, restricted by a boolean mask of the filtered names. Otherwise the
+        Chroma collection is queried.
+
+        Args:
+            query (str): The query in English.
+            k (int): Number of documents to retrieve.
+            filters (Optional[List[str]]): A list of restaurant names to filter the results (optional).
+
+        Returns:
+            List[Document]: Documents ordered by similarity, with the restaurant name in the metadata.
+        """
+        vector = self.embed_queries([query])[0]
+        return self.similarity_search_by_vectors([vector], k, [filters])[0]
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embeds queries in one call. Recently embedded queries are read from memory.
+
+        Args:
+            queries (List[str]): The queries in English.
+
+        Returns:
+            List[List[float]]: The embedding of each query.
+        """
+        with stage_timer("embed" if len(queries) == 1 else "embed_batch"):
+            return self.embeddings.embed_queries(queries)
+
+    def similarity_search_by_vectors(
+        self,
+        vectors: Sequence[List[float]],
+        k: int,
+        filters: Sequence[Optional[List[str]]]
+    ) -> List[List[Document]]:
+        """
+        Retrieves the documents most similar to several query embeddings at once.
+
+        The NumPy backend scores all queries with a single matrix product.
+
+        Args:
+            vectors (Sequence[List[float]]): The query embeddings.
+            k (int): Number of documents to retrieve per query.
+            filters (Sequence[Optional[List[str]]]): Restaurant names to filter the results of each query (optional).
+
+        Returns:
+            List[List[Document]]: Documents ordered by similarity for each query.
+        """
+        collection = self.refresh()
+        with stage_timer("vector_search"):
+            if collection.numpy_index is None:
+                return [
+                    collection.vector_store.similarity_search_by_vector(
+                        vector, k=k, filter={"name": {"$in": names}} if names else None
+                    )
+                    for vector, names in zip(vectors, filters)
+                ]
+
+            index = collection.numpy_index
+            results = index.search_batch(vectors, k, [index.mask(names) for names in filters])
+        return [
+            [Document(page_content=index.documents[row], metadata={'name': index.names[row]}) for row, _ in rows]
+            for rows in results
+        ]
+
+    def _get_documents(self, names: List[str]) -> Dict[str, Document]:
+        """
+        Retrieves stored documents by restaurant name without a similarity search.
+
+        Args:
+            names (List[str]): Names of the restaurants to retrieve.
+
+        Returns:
+            Dict[str, Document]: The stored documents keyed by restaurant name.
+        """
+        if not names:
+            return {}
+
+        collection = self.refresh()
+        if collection.numpy_index is not None:
+            index = collection.numpy_index
+            return {
+                name: Document(page_content=index.documents[index.rows[name]], metadata={'name': name})
+                for name in names if name in index.rows
+            }
+
+        result = collection.vector_store.get(ids=names, include=["documents", "metadatas"])
+        return {
+            metadata['name']: Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(result['documents'], result['metadatas'])
+        }
+
+    def _rerank_chain(self) -> Runnable:
+        """
+        Builds the reranking chain using the system prompt from settings.
+
+        Returns:
+            Runnable: A chain mapping a query and formatted summaries to a list of names.
+        """
+        prompt = PromptTemplate.from_template(settings.search.SYSTEM_PROMPT)
+        return prompt | self.llm | CommaSeparatedListOutputParser()
+
+    @staticmethod
+    def _rerank_input(query: str, documents: List[Document]) -> Dict[str, str]:
+        """
+        Formats the candidate summaries for the reranking prompt.
+
+        Args:
+            query (str): The original user query.
+            documents (List[Document]): Candidate documents to rank.
+
+        Returns:
+            Dict[str, str]: The prompt variables.
+        """
+        formatted_summaries = "\n".join(
+            f"Restaurant name: '{document.metadata['name']}'\nSummary: '{document.page_content}'\n"
+            for document in documents
+        )
+        return {"query": query, "summaries": formatted_summaries}
+
+    def rerank(self, query: str, documents: List[Document]) -> List[str]:
+        """
+        Ranks candidate documents with the LLM and keeps only the relevant ones.
+
+        Args:
+            query (str): The original user query.
+            documents (List[Document]): Candidate documents to rank.
+
+        Returns:
+            List[str]: Names of the relevant restaurants, most relevant first.
+        """
+        if not documents:
+            return []
+
+        with stage_timer("rerank"):
+            return self._rerank_chain().invoke(self._rerank_input(query, documents))
+
+    def rerank_batch(
+        self,
+        queries: List[str],
+        documents: List[List[Document]],
+        max_concurrency: Optional[int] = None
+    ) -> List[List[str]]:
+        """
+        Ranks the candidates of several queries concurrently with bounded parallelism.
+
+        A query whose rerank fails keeps its candidates in vector order.
+
+        Args:
+            queries (List[str]): The original user queries.
+            documents (List[List[Document]]): Candidate documents of each query.
+            max_concurrency (Optional[int]): Maximum number of concurrent LLM calls, defaults to settings.search.BATCH_MAX_CONCURRENCY.
+
+        Returns:
+            List[List[str]]: Names of the relevant restaurants for each query, most relevant first.
+        """
+        pending = [i for i, candidates in enumerate(documents) if candidates]
+        results: List[List[str]] = [[] for _ in queries]
+        if not pending:
+            return results
+
+        with stage_timer("rerank_batch"):
+            outputs = self._rerank_chain().batch(
+                [self._rerank_input(queries[i], documents[i]) for i in pending],
+                config={"max_concurrency": max_concurrency or settings.search.BATCH_MAX_CONCURRENCY},
+                return_exceptions=True
+            )
+        for i, output in zip(pending, outputs):
+            if isinstance(output, Exception):
+                logger.error(f"Rerank failed for query '{queries[i]}', keeping vector order: {output}")
+                output = [document.metadata['name'] for document in documents[i]]
+            results[i] = output
+        return results
+
     def get_recommendations(self, query: str, filters: Optional[List[str]] = None) -> List[str]:
         """
         Retrieves top restaurant recommendations based on the given query.
@@ -67,70 +480,284 @@ class VectorStore:
         Returns:
             List[str]: List of recommended restaurant names.
         """
-        filter_query = {"name": {"$in": filters}} if filters else None
-        documents = self.vector_store.similarity_search(
-            translate_text(query), 
-            k=20, 
-            filter=filter_query
-        )
+        documents = self.search_candidates(translate_text(query), filters, lexical_query=query)
+        return self.rerank(query, documents)
+
+    def search_candidates_batch(
+        self,
+        queries: List[str],
+        filters: Optional[Sequence[Optional[List[str]]]] = None,
+        k: int = 20
+    ) -> List[List[Document]]:
+        """
+        Retrieves the candidates of several queries, translating and embedding them in one batched call each.
 
-        summaries = [document.page_content for document in documents]
-        names = [document.metadata['name'] for document in documents]
+        Args:
+            queries (List[str]): The user queries in Dutch.
+            filters (Optional[Sequence[Optional[List[str]]]]): Restaurant names to filter the results of each query (optional).
+            k (int): Number of candidates per query.
 
-        # Format summaries for the LLM prompt
-        formatted_summaries = "\n".join(
-            f"Restaurant name: '{name}'\nSummary: '{summary}'\n"
-            for name, summary in zip(names, summaries)
+        Returns:
+            List[List[Document]]: Candidate documents of each query, most relevant first.
+        """
+        filters = list(filters) if filters is not None else [None] * len(queries)
+        translations = translate_texts(queries)
+        vectors = self.embed_queries(translations)
+        documents = self.similarity_search_by_vectors(vectors, k, filters)
+        return [
+            self._fuse_lexical(candidates, names, k, query)
+            for candidates, names, query in zip(documents, filters, queries)
+        ]
+
+    def get_recommendations_batch(
+        self,
+        queries: List[str],
+        filters: Optional[Sequence[Optional[List[str]]]] = None,
+        k: int = 20
+    ) -> List[List[str]]:
+        """
+        Retrieves top restaurant recommendations for several queries at once.
+
+        Args:
+            queries (List[str]): The user queries for recommendations.
+            filters (Optional[Sequence[Optional[List[str]]]]): Restaurant names to filter the results of each query (optional).
+            k (int): Number of candidates to rerank per query.
+
+        Returns:
+            List[List[str]]: List of recommended restaurant names for each query.
+        """
+        if not queries:
+            return []
+        documents = self.search_candidates_batch(queries, filters, k)
+        return self.rerank_batch(queries, documents)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """
+    Fuses several rankings into one with reciprocal rank fusion.
+
+    Each item scores the sum of 1 / (k + rank) over the rankings it appears in.
+
+    Args:
+        rankings (List[List[str]]): Rankings to fuse, best item first.
+        k (int): Constant dampening the influence of the top ranks.
+
+    Returns:
+        List[str]: The fused ranking, best item first.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def _translation_llm(ingest: bool = False) -> ChatOpenAI:
+    """
+    Builds the translation client. Serving requests end with their pipeline stage and are not
+    retried, ingestion waits longer and retries rate-limited and failed requests.
+
+    Args:
+        ingest (bool): Whether the client translates summaries for an index build.
+
+    Returns:
+        ChatOpenAI: The client.
+    """
+    if ingest:
+        return ChatOpenAI(
+            model=settings.search.OPENAI_MODEL,
+            temperature=settings.search.OPENAI_TEMPERATUE,
+            timeout=settings.search.INGEST_TRANSLATE_TIMEOUT
         )
+    return ChatOpenAI(
+        model=settings.search.OPENAI_MODEL, 
+        temperature=settings.search.OPENAI_TEMPERATUE,
+        timeout=settings.search.TRANSLATE_TIMEOUT,
+        max_retries=0
+    )
 
-        # Create and execute the prompt using the system prompt from settings
-        prompt = PromptTemplate.from_template(settings.search.SYSTEM_PROMPT)
-        chain = prompt | self.llm | CommaSeparatedListOutputParser()
 
-        return chain.invoke({"query": query, "summaries": formatted_summaries})
+def _translation_chain(ingest: bool = False) -> Runnable:
+    """
+    Builds the chain translating a single text from Dutch to English.
+
+    Args:
+        ingest (bool): Whether the chain translates summaries for an index build.
+
+    Returns:
+        Runnable: A chain mapping {"text": ...} to the translated text.
+    """
+    llm = _translation_llm(ingest)
+    prompt_template = (
+        "Translate the following text from Dutch to English:\n\n"
+        "Dutch: {text}\n\n"
+        "English:"
+    )
+    prompt = PromptTemplate.from_template(prompt_template)
+    return prompt | llm | StrOutputParser()
 
 
 def translate_text(text: str) -> str:
     """
     Translates a given text from Dutch to English using a language model.
 
+    Translations are stored in the persistent cache, so a text is translated only once.
+
     Args:
         text (str): The input text in Dutch.
 
     Returns:
         str: The translated text in English.
     """
-    llm = ChatOpenAI(
-        model=settings.search.OPENAI_MODEL, 
-        temperature=settings.search.OPENAI_TEMPERATUE
-    )
+    return translate_texts([text])[0]
+
+
+def translate_texts(texts: List[str], ingest: bool = False) -> List[str]:
+    """
+    Translates several texts from Dutch to English in a single language model call.
+
+    Texts found in the persistent cache are not translated again. Falls back to translating the
+    texts one by one if the batched answer cannot be parsed.
+
+    Args:
+        texts (List[str]): The input texts in Dutch.
+        ingest (bool): Whether the texts are summaries translated for an index build, see _translation_llm.
+
+    Returns:
+        List[str]: The translated texts in English, in the same order.
+    """
+    cache = get_persistent_cache()
+    keys = [make_digest(settings.search.OPENAI_MODEL, text) for text in texts]
+    translations = cache.get_many("translation", keys) if cache else {}
+
+    missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in translations))
+    if len(missing) == 1:
+        with stage_timer("translate"):
+            translated = [_translation_chain(ingest).invoke({"text": missing[0]})]
+    elif missing:
+        with stage_timer("translate_batch"):
+            translated = _translate_texts(missing, ingest)
+    else:
+        translated = []
+
+    new = {make_digest(settings.search.OPENAI_MODEL, text): translation for text, translation in zip(missing, translated)}
+    if cache and new:
+        cache.set_many("translation", new)
+    translations.update(new)
+
+    return [translations[key] for key in keys]
+
+
+def _translate_texts(texts: List[str], ingest: bool = False) -> List[str]:
+    """
+    Translates several texts in one call, see translate_texts.
+
+    Args:
+        texts (List[str]): The input texts in Dutch.
+        ingest (bool): Whether the texts are summaries translated for an index build.
+
+    Returns:
+        List[str]: The translated texts in English, in the same order.
+    """
+    llm = _translation_llm(ingest)
     prompt_template = (
-        "Translate the following text from Dutch to English:\n\n"
-        "Dutch: {text}\n\n"
+        "Translate each of the following texts from Dutch to English. "
+        "Return only a JSON array of strings with the translations, in the same order.\n\n"
+        "Dutch: {texts}\n\n"
         "English:"
     )
     prompt = PromptTemplate.from_template(prompt_template)
-    chain = prompt | llm | StrOutputParser()
-    return chain.invoke({"text": text})
+    chain = prompt | llm | JsonOutputParser()
+
+    try:
+        translations = chain.invoke({"texts": json.dumps(texts, ensure_ascii=False)})
+        if isinstance(translations, list) and len(translations) == len(texts):
+            return [str(translation) for translation in translations]
+        logger.warning("Batched translation returned a different number of texts, translating one by one.")
+    except Exception as e:
+        logger.warning(f"Batched translation failed, translating one by one: {e}")
+
+    return _translation_chain(ingest).batch(
+        [{"text": text} for text in texts],
+        config={"max_concurrency": settings.search.BATCH_MAX_CONCURRENCY}
+    )
 
 
-def main() -> None:
+def build_city(city: str, names: List[str], texts: List[str]) -> str:
     """
-    Main function to initialize the vector store, retrieve restaurant data from the database,
-    translate summaries, and add them to the vector store.
+    Builds a new version of the vector store partition of a city, validates it and activates it.
+
+    Args:
+        city (str): Key of the city.
+        names (List[str]): Names of the restaurants of the city.
+        texts (List[str]): Translated summary of each restaurant.
+
+    Returns:
+        str: The name of the activated collection.
     """
-    # Initialize the vector store
-    vector_store = VectorStore()
+    def build(collection_name: str) -> None:
+        # The NumPy export does not exist yet, so the collection is filled without opening a VectorStore
+        vector_store = open_collection(collection_name, search_embeddings())
+        vector_store.add_texts(texts=texts, metadatas=[{'name': name} for name in names], ids=names)
+
+        # Each version has its own NumPy export, so serving switches to it together with the collection
+        if settings.search.VECTOR_BACKEND == "numpy":
+            count = export_from_chroma(vector_store._collection, numpy_index_path(collection_name))
+            print(f"Exported {count} embeddings to the NumPy index.")
+
+    def validate(collection_name: str) -> None:
+        vector_store = VectorStore(collection_name, city)
+        count = vector_store.vector_store._collection.count()
+        if count != len(set(names)):
+            raise ValueError(f"{collection_name} holds {count} documents instead of {len(set(names))}.")
+        # A stored summary must find its own restaurant
+        if names and vector_store.similarity_search(texts[0], k=1)[0].metadata['name'] != names[0]:
+            raise ValueError(f"The probe query on {collection_name} did not return {names[0]}.")
+
+    def drop(collection_name: str) -> None:
+        try:
+            chromadb.PersistentClient(path=settings.search.CHROMA_DB_PATH).delete_collection(collection_name)
+        except ValueError:
+            # The collection was never created
+            pass
+        if collection_name != settings.search.CHROMA_COLLECTION_NAME:
+            shutil.rmtree(numpy_index_path(collection_name), ignore_errors=True)
+
+    pointer = IndexPointer(settings.search.CHROMA_DB_PATH, partition_name(settings.search.CHROMA_COLLECTION_NAME, city))
+    return build_version(pointer, build, validate, drop, settings.search.INDEX_RETENTION_HOURS * 3600)
 
-    # Fetch restaurant summaries and names from the database
+
+def main(cities: Optional[List[str]] = None) -> None:
+    """
+    Main function to build a new version of the vector store partition of every city from the
+    restaurant summaries in the database, validate it and activate it. Serving keeps using the
+    previous version of a city until then.
+
+    Args:
+        cities (Optional[List[str]]): Keys of the cities to build, by default every city with summaries.
+    """
+    # Fetch restaurant summaries, names and cities from the database
     session = Session()
-    summaries = session.query(RestaurantSummary).all()
-    texts = [translate_text(summary.summary) for summary in summaries]
-    names = [summary.name for summary in summaries]
+    query = session.query(RestaurantSummary.name, RestaurantSummary.summary, RestaurantSummary.city)
+    if cities:
+        query = query.filter(RestaurantSummary.city.in_(cities))
+    summaries = query.order_by(RestaurantSummary.city, RestaurantSummary.name).all()
+    session.close()
+
+    by_city: Dict[str, List[tuple]] = {}
+    for summary in summaries:
+        by_city.setdefault(summary.city, []).append(summary)
 
-    # Add documents to the vector store
-    vector_store.add_documents(texts=texts, names=names)
-    print("Documents have been added to the vector store.")
+    for city, rows in by_city.items():
+        names = [row.name for row in rows]
+        batch_size = settings.search.INGEST_TRANSLATE_BATCH_SIZE
+        texts = [
+            text
+            for start in range(0, len(rows), batch_size)
+            for text in translate_texts([row.summary for row in rows[start:start + batch_size]], ingest=True)
+        ]
+        collection_name = build_city(city, names, texts)
+        print(f"Documents of {city} have been added to the vector store {collection_name}.")
 
 
 if __name__ == "__main__":
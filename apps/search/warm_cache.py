@@ -0,0 +1,70 @@
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from apps.search.cache import DataVersionWatcher, VersionedCache
+from apps.search.catalog import load_catalog
+from apps.search.pipeline import SearchPipeline
+from apps.search.query_log import popular_queries
+from apps.search.vectorstore import VectorStore
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def warm_cache(pipelines: Dict[str, SearchPipeline], queries: List[Tuple[str, List[str], Optional[int], str, int]], max_workers: int) -> int:
+    """
+    Ranks the given searches, storing their translations and rankings in the persistent cache.
+
+    Args:
+        pipelines (Dict[str, SearchPipeline]): The query pipeline of each city.
+        queries (List[Tuple[str, List[str], Optional[int], str, int]]): Question, filters, candidate pool size,
+            city and request count of each search, as returned by popular_queries.
+        max_workers (int): Number of searches ranked concurrently.
+
+    Returns:
+        int: Number of searches whose complete ranking is now cached.
+    """
+    def warm(query: Tuple[str, List[str], Optional[int], str, int]) -> bool:
+        question, filters, pool_size, city, _ = query
+        if city not in pipelines:
+            logger.warning(f"Skipping '{question}', city {city} is not configured.")
+            return False
+        try:
+            pipelines[city].run(question, filters or None, page_size=1, pool_size=pool_size)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to warm the cache for '{question}': {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return sum(executor.map(warm, queries))
+
+
+def main() -> None:
+    """
+    Main function to precompute the translations and rankings of the most popular
+    searches in the query log. Run it after rebuilding the index, so the popular searches are
+    served from the cache of the new data version.
+    """
+    parser = argparse.ArgumentParser(description="Warm the search caches with the most popular queries.")
+    parser.add_argument('--log', default=settings.search.QUERY_LOG_PATH, help='Path of the query log')
+    parser.add_argument('--top', type=int, default=settings.search.WARM_CACHE_TOP_N, help='Number of queries to warm')
+    args = parser.parse_args()
+
+    if not settings.search.PERSISTENT_CACHE_PATH:
+        parser.error("settings.search.PERSISTENT_CACHE_PATH is empty, there is no cache to warm.")
+
+    queries = popular_queries(args.log, args.top)
+    catalog = VersionedCache(load_catalog, DataVersionWatcher(settings.search.DATA_VERSION_CHECK_INTERVAL))
+    pipelines = {
+        city: SearchPipeline(VectorStore(city=city), catalog)
+        for city in {city for _, _, _, city, _ in queries} if city in settings.cities
+    }
+
+    warmed = warm_cache(pipelines, queries, settings.search.BATCH_MAX_CONCURRENCY)
+    print(f"Warmed {warmed} of {len(queries)} popular queries.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import statistics
+from typing import Dict, List
+from llama_index.core.schema import MetadataMode, NodeWithScore
+from llama_index.core.utils import get_tokenizer
+from apps.chat.rag import RAG
+from benchmarks.chat_latency import QUESTIONS
+
+
+def context_stats(nodes: List[NodeWithScore]) -> Dict[str, int]:
+    """
+    Counts the prompt tokens and the restaurants of a retrieved context.
+
+    Args:
+        nodes (List[NodeWithScore]): The nodes put in the prompt.
+
+    Returns:
+        Dict[str, int]: Number of tokens, chunks and distinct restaurants.
+    """
+    tokenizer = get_tokenizer()
+    return {
+        "tokens": sum(len(tokenizer(node.node.get_content(metadata_mode=MetadataMode.LLM))) for node in nodes),
+        "chunks": len(nodes),
+        "restaurants": len({node.node.metadata.get('name') for node in nodes}),
+    }
+
+
+def main() -> None:
+    """
+    Main function to compare the size of the chat context with and without compaction.
+    """
+    parser = argparse.ArgumentParser(description="Compare the chat context size with and without compaction.")
+    parser.add_argument('--questions', nargs='+', default=QUESTIONS, help='Questions to retrieve context for')
+    args = parser.parse_args()
+
+    rag = RAG()
+    rag.load_query_engine()
+
+    before, after = [], []
+    for question in args.questions:
+        nodes = rag.retriever.retrieve(question)
+        before.append(context_stats(nodes))
+        after.append(context_stats(rag.compactor.postprocess_nodes(nodes, query_str=question)))
+
+    for label, stats in [("retrieved", before), ("compacted", after)]:
+        print(
+            f"{label:>9}: {statistics.fmean(s['tokens'] for s in stats):.0f} tokens, "
+            f"{statistics.fmean(s['chunks'] for s in stats):.1f} chunks, "
+            f"{statistics.fmean(s['restaurants'] for s in stats):.1f} restaurants per question"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import statistics
+import time
+from typing import Dict, List
+from apps.chat.rag import RAG
+
+QUESTIONS = [
+    "Wat is een goed Italiaans restaurant met een gezellige sfeer?",
+    "Welke restaurants serveren vegetarische gerechten?",
+    "Waar kan ik goede sushi eten?",
+    "Welk restaurant is geschikt voor een romantisch diner?",
+    "Wat kenmerkt de Japanse keuken volgens de artikelen?",
+]
+
+
+def time_responses(rag: RAG, mode: str, questions: List[str]) -> Dict[str, float]:
+    """
+    Streams an answer for each question and summarizes the time to the first token and to the full answer.
+
+    Args:
+        rag (RAG): The RAG system with its resources loaded.
+        mode (str): The response mode, 'agent' or 'direct'.
+        questions (List[str]): The questions to answer, each in a new conversation.
+
+    Returns:
+        Dict[str, float]: Median and p95 time to first token and median total time in milliseconds.
+    """
+    first_tokens = []
+    totals = []
+    for question in questions:
+        start = time.perf_counter()
+        first_token = None
+        for chunk in rag.generate_response(question, [], agent=rag.create_agent(), mode=mode):
+            if first_token is None and chunk:
+                first_token = time.perf_counter() - start
+        totals.append((time.perf_counter() - start) * 1000)
+        first_tokens.append((first_token if first_token is not None else time.perf_counter() - start) * 1000)
+
+    first_tokens.sort()
+    return {
+        "ttft_p50_ms": statistics.median(first_tokens),
+        "ttft_p95_ms": first_tokens[max(0, int(len(first_tokens) * 0.95) - 1)],
+        "total_p50_ms": statistics.median(totals),
+    }
+
+
+def main() -> None:
+    """
+    Main function to compare the time to first token of the agent and direct chat response modes.
+    """
+    parser = argparse.ArgumentParser(description="Compare the time to first token of the chat response modes.")
+    parser.add_argument('--rounds', type=int, default=2, help='Number of times each question is asked per mode')
+    parser.add_argument('--questions', nargs='+', default=QUESTIONS, help='Questions to ask')
+    args = parser.parse_args()
+
+    rag = RAG()
+    rag.load_tools()
+    questions = args.questions * args.rounds
+
+    for mode in ["agent", "direct"]:
+        result = time_responses(rag, mode, questions)
+        print(
+            f"{mode:>6}: time to first token p50 {result['ttft_p50_ms']:.0f} ms, p95 {result['ttft_p95_ms']:.0f} ms | "
+            f"full answer p50 {result['total_p50_ms']:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
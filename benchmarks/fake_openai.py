@@ -0,0 +1,331 @@
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional
+import numpy as np
+
+WORDS = (
+    "het restaurant heeft een gezellige sfeer en serveert verse gerechten met seizoensgebonden "
+    "ingrediënten tegen een redelijke prijs in het centrum van de stad"
+).split()
+
+
+@dataclass
+class FakeOpenAIConfig:
+    """
+    Behaviour of the OpenAI stand-in.
+
+    Attributes:
+        latency_ms (float): Delay before the first byte of every chat completion.
+        token_ms (float): Delay per generated token of a chat completion.
+        embedding_latency_ms (float): Delay of every embedding request.
+        rate_limit (float): Share of requests answered with a 429 rate limit error.
+        answer_tokens (int): Number of tokens of a generated answer.
+        dimensions (int): Embedding dimension, unless the request asks for another one.
+        seed (int): Seed of the rate limit errors.
+    """
+
+    latency_ms: float = 300.0
+    token_ms: float = 20.0
+    embedding_latency_ms: float = 50.0
+    rate_limit: float = 0.0
+    answer_tokens: int = 60
+    dimensions: int = 256
+    seed: int = 0
+
+
+def embedding(value: Any, dimensions: int) -> np.ndarray:
+    """
+    Returns a deterministic unit vector for a text or a list of token ids.
+
+    Args:
+        value (Any): The embedded input.
+        dimensions (int): Embedding dimension.
+
+    Returns:
+        np.ndarray: The float32 embedding.
+    """
+    seed = int(hashlib.sha1(json.dumps(value, ensure_ascii=False).encode("utf-8")).hexdigest()[:16], 16)
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    """
+    Returns the text of a chat message, joining the text parts of multi-part content.
+
+    Args:
+        message (Dict[str, Any]): The message of a chat completion request.
+
+    Returns:
+        str: The message text.
+    """
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def completion(request: Dict[str, Any], answer_tokens: int) -> Dict[str, Any]:
+    """
+    Builds a deterministic answer for a chat completion request.
+
+    The answers follow the prompts of this repository, so every chain can parse them: the
+    reranker gets the candidate names, the translators get the input back, an agent with
+    tools first calls its first tool and other prompts get a generated answer.
+
+    Args:
+        request (Dict[str, Any]): The chat completion request.
+        answer_tokens (int): Number of tokens of a generated answer.
+
+    Returns:
+        Dict[str, Any]: Either {"content": ...} or {"tool_call": {"name": ..., "arguments": ...}}.
+    """
+    messages = request.get("messages", [])
+    prompt = "\n".join(message_text(message) for message in messages)
+    last_user = next((message_text(m) for m in reversed(messages) if m.get("role") == "user"), prompt)
+
+    tools = request.get("tools") or []
+    if tools and not any(message.get("role") == "tool" for message in messages):
+        name = tools[0]["function"]["name"]
+        return {"tool_call": {"name": name, "arguments": json.dumps({"input": last_user}, ensure_ascii=False)}}
+
+    names = re.findall(r"Restaurant name: '(.*?)'\n", prompt)
+    if names:
+        return {"content": ", ".join(names)}
+
+    batched = re.search(r"Dutch: (\[.*\])\n\nEnglish:", prompt, re.S)
+    if batched:
+        return {"content": batched.group(1)}
+
+    single = re.search(r"Dutch: (.*)\n\nEnglish:", prompt, re.S)
+    if single:
+        return {"content": single.group(1)}
+
+    rng = random.Random(hashlib.sha1(prompt.encode("utf-8")).hexdigest())
+    return {"content": " ".join(rng.choice(WORDS) for _ in range(answer_tokens))}
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """
+    Serves the chat completion and embedding endpoints of the OpenAI API.
+    """
+
+    protocol_version = "HTTP/1.1"
+    config = FakeOpenAIConfig()
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """
+        Silences the access log.
+        """
+
+    def do_POST(self) -> None:
+        """
+        Dispatches a request to its endpoint.
+        """
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+        with self.rng_lock:
+            limited = self.rng.random() < self.config.rate_limit
+        if limited:
+            self._send_json(429, {"error": {
+                "message": "Rate limit reached for requests", "type": "requests", "code": "rate_limit_exceeded"
+            }}, {"retry-after": "0"})
+        elif self.path.endswith("/embeddings"):
+            self._embeddings(body)
+        elif self.path.endswith("/chat/completions"):
+            self._chat_completions(body)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown endpoint {self.path}", "type": "invalid_request_error"}})
+
+    def _embeddings(self, body: Dict[str, Any]) -> None:
+        """
+        Answers an embedding request with deterministic vectors.
+
+        Args:
+            body (Dict[str, Any]): The request body.
+        """
+        time.sleep(self.config.embedding_latency_ms / 1000)
+        inputs = body.get("input", [])
+        # A single text or a single list of token ids is one input
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dimensions = body.get("dimensions") or self.config.dimensions
+
+        data = []
+        for index, value in enumerate(inputs):
+            vector = embedding(value, dimensions)
+            encoded = (
+                base64.b64encode(vector.tobytes()).decode("ascii")
+                if body.get("encoding_format") == "base64" else vector.tolist()
+            )
+            data.append({"object": "embedding", "index": index, "embedding": encoded})
+
+        tokens = sum(len(value) if isinstance(value, list) else len(value.split()) for value in inputs)
+        self._send_json(200, {
+            "object": "list", "data": data, "model": body.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        })
+
+    def _chat_completions(self, body: Dict[str, Any]) -> None:
+        """
+        Answers a chat completion request, streamed as server-sent events if requested.
+
+        Args:
+            body (Dict[str, Any]): The request body.
+        """
+        answer = completion(body, self.config.answer_tokens)
+        response_id = f"chatcmpl-{uuid.uuid4().hex}"
+        time.sleep(self.config.latency_ms / 1000)
+
+        if body.get("stream"):
+            self._stream(body, answer, response_id)
+            return
+
+        message: Dict[str, Any] = {"role": "assistant", "content": answer.get("content")}
+        finish_reason = "stop"
+        if "tool_call" in answer:
+            message["tool_calls"] = [{"id": f"call_{uuid.uuid4().hex[:24]}", "type": "function", "function": answer["tool_call"]}]
+            finish_reason = "tool_calls"
+        else:
+            time.sleep(self.config.token_ms * len(answer["content"].split()) / 1000)
+
+        tokens = (answer.get("content") or "").split()
+        self._send_json(200, {
+            "id": response_id, "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)}
+        })
+
+    def _stream(self, body: Dict[str, Any], answer: Dict[str, Any], response_id: str) -> None:
+        """
+        Streams a chat completion as server-sent events in chunked transfer encoding.
+
+        Args:
+            body (Dict[str, Any]): The request body.
+            answer (Dict[str, Any]): The answer built by completion().
+            response_id (str): Id of the completion.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for delta, finish_reason in self._deltas(answer):
+            chunk = {
+                "id": response_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": body.get("model"), "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self._write_chunk("")
+
+    def _deltas(self, answer: Dict[str, Any]) -> Iterator[tuple]:
+        """
+        Yields the deltas of a streamed answer, waiting token_ms between tokens.
+
+        Args:
+            answer (Dict[str, Any]): The answer built by completion().
+
+        Yields:
+            tuple: The delta and the finish reason of each chunk.
+        """
+        if "tool_call" in answer:
+            call = {"index": 0, "id": f"call_{uuid.uuid4().hex[:24]}", "type": "function", "function": answer["tool_call"]}
+            yield {"role": "assistant", "content": None, "tool_calls": [call]}, None
+            yield {}, "tool_calls"
+            return
+
+        yield {"role": "assistant", "content": ""}, None
+        for index, token in enumerate(answer["content"].split(" ")):
+            time.sleep(self.config.token_ms / 1000)
+            yield {"content": token if index == 0 else " " + token}, None
+        yield {}, "stop"
+
+    def _write_chunk(self, data: str) -> None:
+        """
+        Writes one chunk of a chunked response, an empty string ends the response.
+
+        Args:
+            data (str): The chunk.
+        """
+        encoded = data.encode("utf-8")
+        self.wfile.write(f"{len(encoded):x}\r\n".encode("ascii") + encoded + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        Sends a JSON response.
+
+        Args:
+            status (int): HTTP status code.
+            payload (Dict[str, Any]): The response body.
+            headers (Optional[Dict[str, str]]): Additional headers.
+        """
+        encoded = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+
+def serve(host: str, port: int, config: FakeOpenAIConfig) -> ThreadingHTTPServer:
+    """
+    Creates the stand-in server. Call serve_forever() on it, or run it in a thread.
+
+    Args:
+        host (str): Host to bind to.
+        port (int): Port to bind to, 0 for a free port.
+        config (FakeOpenAIConfig): Behaviour of the server.
+
+    Returns:
+        ThreadingHTTPServer: The server.
+    """
+    handler = type("ConfiguredFakeOpenAIHandler", (FakeOpenAIHandler,), {
+        "config": config, "rng": random.Random(config.seed), "rng_lock": threading.Lock()
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    """
+    Main function to run a local stand-in for the OpenAI chat completion and embedding API.
+    """
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the OpenAI API.")
+    parser.add_argument('--host', default="127.0.0.1", help='Host to bind to')
+    parser.add_argument('--port', type=int, default=8001, help='Port to bind to')
+    parser.add_argument('--latency_ms', type=float, default=300.0, help='Delay before the first token of a chat completion')
+    parser.add_argument('--token_ms', type=float, default=20.0, help='Delay per generated token')
+    parser.add_argument('--embedding_latency_ms', type=float, default=50.0, help='Delay of an embedding request')
+    parser.add_argument('--rate_limit', type=float, default=0.0, help='Share of requests answered with a 429 error')
+    parser.add_argument('--answer_tokens', type=int, default=60, help='Number of tokens of a generated answer')
+    parser.add_argument('--dimensions', type=int, default=256, help='Embedding dimension')
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(
+        latency_ms=args.latency_ms, token_ms=args.token_ms, embedding_latency_ms=args.embedding_latency_ms,
+        rate_limit=args.rate_limit, answer_tokens=args.answer_tokens, dimensions=args.dimensions
+    )
+    server = serve(args.host, args.port, config)
+    print(f"OpenAI stand-in listening on http://{args.host}:{server.server_port}/v1")
+    print(f"Point the apps to it with: export OPENAI_API_BASE=http://{args.host}:{server.server_port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from benchmarks.chat_latency import QUESTIONS
+
+
+class LoadResult:
+    """
+    Collects the latencies, time to first token and errors of the requests of one target.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty result.
+        """
+        self.latencies: List[float] = []
+        self.first_tokens: List[float] = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float, first_token: Optional[float] = None, error: bool = False) -> None:
+        """
+        Records one request.
+
+        Args:
+            seconds (float): Latency of the request.
+            first_token (Optional[float]): Time to the first streamed token, for streamed responses.
+            error (bool): Whether the request failed.
+        """
+        with self._lock:
+            if error:
+                self.errors += 1
+                return
+            self.latencies.append(seconds * 1000)
+            if first_token is not None:
+                self.first_tokens.append(first_token * 1000)
+
+    def summary(self, duration: float) -> Dict[str, float]:
+        """
+        Summarizes the recorded requests.
+
+        Args:
+            duration (float): Wall-clock duration of the run in seconds.
+
+        Returns:
+            Dict[str, float]: Throughput, error count and latency percentiles in milliseconds.
+        """
+        result = {
+            "requests": len(self.latencies) + self.errors,
+            "errors": self.errors,
+            "throughput_rps": len(self.latencies) / duration if duration else 0.0,
+        }
+        for label, values in [("latency", self.latencies), ("ttft", self.first_tokens)]:
+            values = sorted(values)
+            if values:
+                for percentile in [50, 95, 99]:
+                    result[f"{label}_p{percentile}_ms"] = values[min(len(values) - 1, len(values) * percentile // 100)]
+        return result
+
+
+def post_json(url: str, payload: Dict[str, Any], timeout: float) -> Any:
+    """
+    Posts a JSON payload and returns the decoded response.
+
+    Args:
+        url (str): The endpoint.
+        payload (Dict[str, Any]): The request body.
+        timeout (float): Timeout in seconds.
+
+    Returns:
+        Any: The decoded JSON response.
+    """
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def get_json(url: str, timeout: float) -> Any:
+    """
+    Gets a URL and returns the decoded JSON response.
+
+    Args:
+        url (str): The endpoint.
+        timeout (float): Timeout in seconds.
+
+    Returns:
+        Any: The decoded JSON response.
+    """
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def query_request(search_url: str, questions: List[str], unique: bool, timeout: float) -> Callable[[int], None]:
+    """
+    Builds a request to the /query endpoint of the search app.
+
+    Args:
+        search_url (str): Base URL of the search app.
+        questions (List[str]): The questions to ask in turn.
+        unique (bool): Whether to make every question unique, so no request is served from a cache.
+        timeout (float): Timeout in seconds.
+
+    Returns:
+        Callable[[int], None]: Function sending the i-th request.
+    """
+    def send(i: int) -> None:
+        question = questions[i % len(questions)]
+        post_json(f"{search_url}/query", {"question": f"{question} ({i})" if unique else question}, timeout)
+    return send
+
+
+def filter_request(search_url: str, timeout: float, seed: int = 0) -> Callable[[int], None]:
+    """
+    Builds a request to the /get_filtered_names endpoint with random combinations of the filter options.
+
+    Args:
+        search_url (str): Base URL of the search app.
+        timeout (float): Timeout in seconds.
+        seed (int): Random seed.
+
+    Returns:
+        Callable[[int], None]: Function sending the i-th request.
+    """
+    options = get_json(f"{search_url}/get_filter_options", timeout)
+    features = {feature: values for feature, values in options.items() if feature != "counts" and values}
+
+    def send(i: int) -> None:
+        rng = random.Random(seed + i)
+        payload = {
+            feature: rng.sample(values, min(len(values), rng.randint(1, 2)))
+            for feature, values in features.items() if rng.random() < 0.5
+        }
+        post_json(f"{search_url}/get_filtered_names", payload, timeout)
+    return send
+
+
+def chat_request(mode: Optional[str], questions: List[str], result: LoadResult) -> Callable[[int], None]:
+    """
+    Builds a call of the chat generate_response path, recording the time to the first token.
+
+    The RAG system is created in this process and shared by all requests, like in the chat app.
+
+    Args:
+        mode (Optional[str]): The response mode, 'agent' or 'direct', by default settings.chat.RESPONSE_MODE.
+        questions (List[str]): The questions to ask in turn.
+        result (LoadResult): The result the time to first token is recorded in.
+
+    Returns:
+        Callable[[int], None]: Function answering the i-th question in a new conversation.
+    """
+    # The chat stack is only imported when it is load tested
+    from apps.chat.rag import RAG
+
+    rag = RAG()
+    rag.load_tools()
+
+    def send(i: int) -> None:
+        start = time.perf_counter()
+        first_token = None
+        for chunk in rag.generate_response(questions[i % len(questions)], [], agent=rag.create_agent(), mode=mode):
+            if first_token is None and chunk:
+                first_token = time.perf_counter() - start
+        result.add(time.perf_counter() - start, first_token)
+    return send
+
+
+def run_load(send: Callable[[int], None], result: LoadResult, concurrency: int, requests: int, duration: Optional[float], records: bool) -> float:
+    """
+    Sends requests with a fixed number of concurrent workers until the request count or the duration is reached.
+
+    Args:
+        send (Callable[[int], None]): Function sending the i-th request.
+        result (LoadResult): The result to record the requests in.
+        concurrency (int): Number of requests in flight.
+        requests (int): Number of requests to send.
+        duration (Optional[float]): Maximum duration in seconds (optional).
+        records (bool): Whether send() records its own successful requests.
+
+    Returns:
+        float: Wall-clock duration of the run in seconds.
+    """
+    counter = iter(range(requests))
+    counter_lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def worker() -> None:
+        while deadline is None or time.perf_counter() < deadline:
+            with counter_lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            request_start = time.perf_counter()
+            try:
+                send(i)
+                if not records:
+                    result.add(time.perf_counter() - request_start)
+            except Exception as e:
+                # Every failure, including OpenAI errors that were not retried away, counts as an error
+                result.add(time.perf_counter() - request_start, error=True)
+                if result.errors <= 3:
+                    print(f"Request {i} failed: {e}")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """
+    Main function to load test the search endpoints and the chat response path at a target concurrency.
+
+    Point the apps to the OpenAI stand-in (benchmarks.fake_openai) with OPENAI_API_BASE, both for
+    the search app under test and for this process, which runs the chat path in-process.
+    """
+    parser = argparse.ArgumentParser(description="Load test the search endpoints and the chat response path.")
+    parser.add_argument('--targets', nargs='+', choices=['query', 'filter', 'chat'], default=['query', 'filter', 'chat'], help='What to load test')
+    parser.add_argument('--search_url', default="http://127.0.0.1:5000", help='Base URL of the running search app')
+    parser.add_argument('--concurrency', type=int, default=8, help='Number of requests in flight')
+    parser.add_argument('--requests', type=int, default=200, help='Number of requests per target')
+    parser.add_argument('--duration', type=float, default=None, help='Maximum duration per target in seconds')
+    parser.add_argument('--unique', action='store_true', help='Make every question unique, so no query is served from a cache')
+    parser.add_argument('--chat_mode', choices=['agent', 'direct'], default=None, help='Chat response mode, by default the configured one')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Request timeout in seconds')
+    args = parser.parse_args()
+
+    for target in args.targets:
+        result = LoadResult()
+        if target == 'query':
+            send = query_request(args.search_url, QUESTIONS, args.unique, args.timeout)
+        elif target == 'filter':
+            send = filter_request(args.search_url, args.timeout)
+        else:
+            send = chat_request(args.chat_mode, QUESTIONS, result)
+
+        duration = run_load(send, result, args.concurrency, args.requests, args.duration, records=target == 'chat')
+        summary = result.summary(duration)
+
+        line = (
+            f"{target:>6}: {summary['requests']} requests, {summary['errors']} errors, "
+            f"{summary['throughput_rps']:.1f} req/s"
+        )
+        if 'latency_p50_ms' in summary:
+            line += (
+                f" | latency p50 {summary['latency_p50_ms']:.0f} ms, p95 {summary['latency_p95_ms']:.0f} ms, "
+                f"p99 {summary['latency_p99_ms']:.0f} ms"
+            )
+        if 'ttft_p50_ms' in summary:
+            line += (
+                f" | first token p50 {summary['ttft_p50_ms']:.0f} ms, p95 {summary['ttft_p95_ms']:.0f} ms, "
+                f"p99 {summary['ttft_p99_ms']:.0f} ms"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
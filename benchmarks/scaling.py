@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from config import settings
+from data.crud import get_complete_restaurant_data, get_unique_filter_values, iter_unsummarized_content
+from data.scheme import RestaurantContent, RestaurantData, RestaurantSummary, RestaurantURL, create_database_engine
+from data.summary import batch_by_length, splicegen
+
+FILTER_FEATURES = ['meal_type', 'district', 'restaurant_type', 'price_level']
+
+# Facet values as they appear on the scraped site, with weights resembling the Rotterdam catalogue
+MEAL_TYPES = {"Diner": 0.8, "Lunch": 0.45, "Borrel": 0.3, "Ontbijt": 0.12}
+DISTRICTS = [
+    "Centrum", "Kralingen-Crooswijk", "Delfshaven", "Noord", "Feijenoord", "Hillegersberg-Schiebroek",
+    "Charlois", "Prins Alexander", "IJsselmonde", "Overschie", "Hoek van Holland",
+]
+RESTAURANT_TYPES = {"Restaurant": 0.6, "Café": 0.15, "Bar": 0.1, "Lunchroom": 0.08, "Bistro": 0.05, "Koffiebar": 0.02}
+PRICE_LEVELS = {"€": 0.2, "€€": 0.5, "€€€": 0.25, "€€€€": 0.05}
+WORDS = (
+    "gezellig terras keuken chef menu gerechten wijn cocktails vegetarisch vis vlees seizoen "
+    "lokaal Italiaans Japans Frans Indonesisch pasta sushi pizza dessert service sfeer interieur "
+    "uitzicht haven centrum betaalbaar verfijnd huisgemaakt proeverij brunch bier koffie"
+).split()
+
+DEFAULT_RESULTS = os.path.join(os.path.dirname(__file__), "results", "scaling.jsonl")
+
+
+def generate_catalogue(engine: Engine, size: int, content_chars: int = 800, summarized: float = 0.9, seed: int = 0) -> None:
+    """
+    Fills the restaurant tables with synthetic restaurants.
+
+    Districts follow a Zipf distribution, and their number grows with the catalogue, as it would
+    when more cities are added. Meal types are comma-separated like the scraped values. Each
+    restaurant has one to five articles, and a share of the restaurants already has a summary.
+
+    Args:
+        engine (Engine): Engine of an empty restaurant database.
+        size (int): Number of restaurants.
+        content_chars (int): Average number of characters of an article.
+        summarized (float): Share of the restaurants that already has a summary.
+        seed (int): Random seed.
+    """
+    rng = random.Random(seed)
+    districts = DISTRICTS + [f"Wijk {i}" for i in range(max(0, size // 100 - len(DISTRICTS)))]
+    district_weights = [1 / (rank + 1) for rank in range(len(districts))]
+    # A pool of article texts keeps generation fast, the restaurant name makes every article unique
+    texts = [" ".join(rng.choices(WORDS, k=max(1, int(rng.lognormvariate(0, 0.5) * content_chars / 8)))) for _ in range(500)]
+
+    batch_size = 5000
+    with Session(bind=engine) as session:
+        for start in range(0, size, batch_size):
+            data, urls, contents, summaries = [], [], [], []
+            for i in range(start, min(start + batch_size, size)):
+                name = f"Restaurant {i:06d}"
+                meal_types = [meal for meal, share in MEAL_TYPES.items() if rng.random() < share] or ["Diner"]
+                data.append({
+                    "name": name,
+                    "website_url": f"https://example.com/{i}",
+                    "instagram_url": None,
+                    "address": f"Straat {i % 500}",
+                    "meal_type": ", ".join(meal_types),
+                    "district": rng.choices(districts, district_weights)[0],
+                    "restaurant_type": rng.choices(list(RESTAURANT_TYPES), list(RESTAURANT_TYPES.values()))[0],
+                    "price_level": rng.choices(list(PRICE_LEVELS), list(PRICE_LEVELS.values()))[0],
+                })
+                urls.append({"name": name, "content_url": f"https://example.com/{i}/artikelen", "image_url": f"https://example.com/{i}.jpg"})
+                contents.extend(
+                    {"name": name, "source": f"https://example.com/artikel/{i}/{j}", "content": f"{name} {rng.choice(texts)}"}
+                    for j in range(rng.randint(1, 5))
+                )
+                if rng.random() < summarized:
+                    summaries.append({"name": name, "summary": f"{name} {rng.choice(texts)[:400]}"})
+
+            session.execute(insert(RestaurantData), data)
+            session.execute(insert(RestaurantURL), urls)
+            session.execute(insert(RestaurantContent), contents)
+            if summaries:
+                session.execute(insert(RestaurantSummary), summaries)
+            session.commit()
+
+
+def time_repeated(function: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    """
+    Calls a function several times and summarizes the latencies.
+
+    Args:
+        function (Callable[[], Any]): The function to time.
+        repeats (int): Number of calls.
+
+    Returns:
+        Dict[str, float]: Minimum and median latency in milliseconds.
+    """
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": min(latencies), "p50_ms": statistics.median(latencies)}
+
+
+def run(engine: Engine, size: int, repeats: int, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Times the serving and ingestion steps whose cost grows with the catalogue.
+
+    Args:
+        engine (Engine): Engine of a database filled by generate_catalogue.
+        size (int): Number of restaurants in the database.
+        repeats (int): Number of calls per step.
+        seed (int): Random seed.
+
+    Returns:
+        Dict[str, Dict[str, float]]: The latencies of each step.
+    """
+    # The search app opens its sessions with data.scheme.Session, so bind it to the benchmark database
+    from data.scheme import Session as AppSession
+    AppSession.configure(bind=engine)
+    from apps.search.app import app
+
+    rng = random.Random(seed)
+    names = [f"Restaurant {i:06d}" for i in rng.sample(range(size), min(20, size))]
+    client = app.test_client()
+    filters = {"meal_type": ["Lunch"], "district": ["Centrum", "Noord"], "price_level": ["€€"]}
+
+    with Session(bind=engine) as session:
+        joined = [content for _, content in iter_unsummarized_content(engine)]
+        results = {
+            "get_filtered_names": time_repeated(lambda: client.post("/get_filtered_names", json=filters), repeats),
+            "get_unique_filter_values": time_repeated(lambda: get_unique_filter_values(session, FILTER_FEATURES), repeats),
+            "get_complete_restaurant_data": time_repeated(lambda: get_complete_restaurant_data(session, names), repeats),
+            "splicegen": time_repeated(lambda: list(splicegen(settings.MAX_TOKENS, joined)), repeats),
+            "add_summaries_grouping": time_repeated(
+                lambda: sum(1 for _ in batch_by_length(settings.MAX_TOKENS, iter_unsummarized_content(engine))), repeats
+            ),
+        }
+    return results
+
+
+def current_version() -> str:
+    """
+    Returns the git commit of the working tree, to label the results.
+
+    Returns:
+        str: The short commit hash, or 'unknown' outside a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_results(path: str, version: str) -> Dict[tuple, float]:
+    """
+    Reads the minimum latencies of the most recent run of another version. The minimum is the
+    least noisy measure on a shared machine, so versions are compared on it.
+
+    Args:
+        path (str): Path of the JSON lines results file.
+        version (str): The version being benchmarked, whose own results are skipped.
+
+    Returns:
+        Dict[tuple, float]: The minimum latency by (size, step).
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    others = [record for record in records if record["version"] != version]
+    if not others:
+        return {}
+
+    latest = others[-1]["version"]
+    return {(record["size"], record["step"]): record["min_ms"] for record in others if record["version"] == latest}
+
+
+def main() -> None:
+    """
+    Main function to benchmark the data and serving path at growing catalogue sizes and record the results.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the data and serving path on synthetic catalogues.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Numbers of restaurants')
+    parser.add_argument('--repeats', type=int, default=5, help='Number of calls per step')
+    parser.add_argument('--output', default=DEFAULT_RESULTS, help='JSON lines file the results are appended to')
+    parser.add_argument('--label', default=None, help='Version label of the results, by default the git commit')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Slowdown against the previous version reported as a regression')
+    args = parser.parse_args()
+
+    version = args.label or current_version()
+    baseline = previous_results(args.output, version)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_database_engine(os.path.join(tmp, "restaurants.db"))
+            start = time.perf_counter()
+            generate_catalogue(engine, size)
+            print(f"{size} restaurants generated in {time.perf_counter() - start:.1f}s")
+
+            results = run(engine, size, args.repeats)
+            engine.dispose()
+
+        with open(args.output, "a", encoding="utf-8") as f:
+            for step, result in results.items():
+                f.write(json.dumps({"version": version, "ts": round(time.time()), "size": size, "step": step, **result}) + "\n")
+
+        for step, result in results.items():
+            previous: Optional[float] = baseline.get((size, step))
+            comparison = ""
+            if previous:
+                ratio = result["min_ms"] / previous
+                comparison = f" | {ratio:.2f}x previous version" + (" REGRESSION" if ratio > args.threshold else "")
+            print(f"{size:>7} {step:>28}: p50 {result['p50_ms']:.1f} ms, min {result['min_ms']:.1f} ms{comparison}")
+
+
+if __name__ == "__main__":
+    main()
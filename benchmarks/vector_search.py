@@ -0,0 +1,138 @@
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import chromadb
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional
+from apps.search.numpy_index import NumpyIndex, export_from_chroma, numpy_index_path
+from config import settings
+from data.index_versions import IndexPointer
+
+
+def build_synthetic_index(path: str, size: int, dim: int, seed: int = 0) -> Any:
+    """
+    Fills a new Chroma collection with random embeddings and exports it to a NumPy index.
+
+    Args:
+        path (str): Directory for the Chroma database and the NumPy index.
+        size (int): Number of synthetic restaurants.
+        dim (int): Embedding dimension.
+        seed (int): Random seed.
+
+    Returns:
+        Any: The Chroma collection.
+    """
+    rng = np.random.default_rng(seed)
+    client = chromadb.PersistentClient(path=path)
+    collection = client.create_collection("benchmark", metadata={"hnsw:space": "cosine"})
+
+    batch_size = 5000
+    for start in range(0, size, batch_size):
+        names = [f"Restaurant {i}" for i in range(start, min(start + batch_size, size))]
+        collection.add(
+            ids=names,
+            embeddings=rng.standard_normal((len(names), dim)).astype(np.float32).tolist(),
+            documents=[f"Summary of {name}" for name in names],
+            metadatas=[{"name": name} for name in names]
+        )
+
+    export_from_chroma(collection, path)
+    return collection
+
+
+def time_calls(function: Callable[[Any], Any], queries: List[Any]) -> Dict[str, float]:
+    """
+    Calls a function once per query and summarizes the latencies.
+
+    Args:
+        function (Callable[[Any], Any]): The function to time.
+        queries (List[Any]): The query arguments.
+
+    Returns:
+        Dict[str, float]: Mean, p50 and p95 latency in milliseconds.
+    """
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        function(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return {
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def run(collection: Any, index: NumpyIndex, queries: int, k: int, filter_fraction: Optional[float], seed: int = 0) -> Dict[str, Any]:
+    """
+    Compares the Chroma HNSW search with the exact NumPy search on the same query embeddings.
+
+    Args:
+        collection (Any): The Chroma collection.
+        index (NumpyIndex): The NumPy index exported from the collection.
+        queries (int): Number of queries.
+        k (int): Number of results per query.
+        filter_fraction (Optional[float]): Fraction of names passed as `$in` filter, or None for no filter.
+        seed (int): Random seed.
+
+    Returns:
+        Dict[str, Any]: Latencies of both backends and the recall of Chroma against the exact results.
+    """
+    rng = random.Random(seed)
+    names = rng.sample(index.names, max(1, int(len(index) * filter_fraction))) if filter_fraction else None
+    where = {"name": {"$in": names}} if names else None
+
+    # Perturbed stored embeddings make realistic queries without calling the embedding API
+    noise = np.random.default_rng(seed).standard_normal((queries, index.matrix.shape[1])).astype(np.float32) * 0.01
+    vectors = [index.matrix[rng.randrange(len(index))] + noise[i] for i in range(queries)]
+
+    chroma = time_calls(lambda v: collection.query(query_embeddings=[v.tolist()], n_results=k, where=where), vectors)
+    # The mask is built per query, as it is when serving a request
+    exact = time_calls(lambda v: index.search(v, k, index.mask(names)), vectors)
+
+    recalls = []
+    for vector in vectors[:50]:
+        expected = {index.names[row] for row, _ in index.search(vector, k, index.mask(names))}
+        found = set(collection.query(query_embeddings=[vector.tolist()], n_results=k, where=where)["ids"][0])
+        recalls.append(len(expected & found) / max(1, len(expected)))
+
+    return {"chroma": chroma, "numpy": exact, "chroma_recall": statistics.fmean(recalls)}
+
+
+def main() -> None:
+    """
+    Main function to benchmark the Chroma and NumPy vector search backends.
+    """
+    parser = argparse.ArgumentParser(description="Compare the Chroma and NumPy vector search backends.")
+    parser.add_argument('--synthetic', type=int, help='Benchmark on N synthetic restaurants instead of the real index')
+    parser.add_argument('--dim', type=int, default=3072, help='Embedding dimension of the synthetic index')
+    parser.add_argument('--queries', type=int, default=200, help='Number of queries per backend')
+    parser.add_argument('--k', type=int, default=20, help='Number of results per query')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            collection = build_synthetic_index(tmp, args.synthetic, args.dim)
+            index = NumpyIndex(tmp)
+        else:
+            client = chromadb.PersistentClient(path=settings.search.CHROMA_DB_PATH)
+            collection_name = IndexPointer(settings.search.CHROMA_DB_PATH, settings.search.CHROMA_COLLECTION_NAME).active()
+            collection = client.get_collection(collection_name)
+            index = NumpyIndex(numpy_index_path(collection_name))
+
+        print(f"{len(index)} embeddings of dimension {index.matrix.shape[1]}, k={args.k}")
+        for label, fraction in [("no filter", None), ("$in 50% of names", 0.5), ("$in 5% of names", 0.05)]:
+            result = run(collection, index, args.queries, args.k, fraction)
+            print(
+                f"{label:>18}: chroma p50 {result['chroma']['p50_ms']:.2f} ms, p95 {result['chroma']['p95_ms']:.2f} ms | "
+                f"numpy p50 {result['numpy']['p50_ms']:.2f} ms, p95 {result['numpy']['p95_ms']:.2f} ms | "
+                f"chroma recall@{args.k} {result['chroma_recall']:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,34 @@
-from .parser import ParserArticle, ParserRestaurant, ParserURL
-from .scheme import RestaurantURL, RestaurantContent, RestaurantData, RestaurantSummary
-from .summary import generate_summaries, splicegen
+from .scheme import RestaurantURL, RestaurantContent, RestaurantData, RestaurantSummary, DataVersion, FTS_TABLE
+from .run_report import active_report, count
 from config import settings
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, select, text
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.engine import Engine
 from sqlalchemy.sql.schema import Table
 
-import pandas as pd
 import logging
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import groupby
+from typing import Callable, Iterator, TypeVar
 
 from argparse import Namespace
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 from functools import wraps
 
 def task_runner(task_name):
     """
-    A decorator to wrap tasks with descriptive print statements.
+    A decorator to wrap tasks with descriptive print statements. When the run is recorded
+    (see data.run_report), the wall time, CPU time, peak RSS and counters of the task are
+    added to the run report.
 
     Args:
         task_name (str): Name of the task being executed.
@@ -29,8 +37,10 @@ def task_runner(task_name):
         @wraps(task_function)
         def wrapper(*args, **kwargs):
             print(f"Starting: {task_name}...")
+            report = active_report()
             try:
-                task_function(*args, **kwargs)
+                with report.task(task_name) if report is not None else nullcontext():
+                    task_function(*args, **kwargs)
                 print(f"Completed: {task_name}.")
             except Exception as e:
                 print(f"Failed: {task_name}. Error: {e}")
@@ -38,88 +48,239 @@ def task_runner(task_name):
         return wrapper
     return decorator
 
+def crawl_cities(crawl: Callable[[str], T], cities: list[str]) -> dict[str, T]:
+    """
+    Crawls several cities in parallel, with at most settings.CRAWL_CONCURRENCY browsers at a time.
+
+    A city whose crawl fails is logged and left out, so the other cities are still ingested.
+
+    Args:
+        crawl (Callable[[str], T]): Function crawling one city.
+        cities (list[str]): Keys of the cities to crawl.
+
+    Returns:
+        dict[str, T]: The result of every city that was crawled successfully.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=settings.CRAWL_CONCURRENCY, thread_name_prefix="crawl") as executor:
+        futures = {city: executor.submit(crawl, city) for city in cities}
+        for city, future in futures.items():
+            try:
+                results[city] = future.result()
+            except Exception as e:
+                logger.error(f"Error crawling {city}: {e}")
+    return results
+
+def get_cities(cities: list[str] | None = None) -> list[str]:
+    """
+    Validates the cities to crawl against settings.cities.
+
+    Args:
+        cities (list[str] | None): Keys of the cities to crawl, all configured cities if None.
+
+    Returns:
+        list[str]: The city keys.
+
+    Raises:
+        ValueError: If a city is not configured.
+    """
+    if cities is None:
+        return list(settings.cities)
+    unknown = [city for city in cities if city not in settings.cities]
+    if unknown:
+        raise ValueError(f"Unknown cities {', '.join(unknown)}, configure their listing URL in settings.cities.")
+    return cities
+
+def crawl_restaurants(restaurants: list[tuple[str, str]], city: str) -> tuple[list[RestaurantData], list[RestaurantContent]]:
+    """
+    Scrapes the restaurant pages and articles of one city.
+
+    Args:
+        restaurants (list[tuple[str, str]]): Name and content URL of each restaurant.
+        city (str): Key of the city the restaurants are in.
+
+    Returns:
+        tuple[list[RestaurantData], list[RestaurantContent]]: The restaurants and their content.
+    """
+    # The scrapers pull in Selenium, so they are only imported by the ingestion tasks
+    from .parser import ParserArticle, ParserRestaurant
+
+    new_data = []
+    new_content = []
+
+    for name, content_url in restaurants:
+        logger.info(f"Processing restaurant: {name} ({city})")
+
+        # Parse restaurant details
+        restaurant_parser = ParserRestaurant.from_url(content_url, name)
+        new_data.append(RestaurantData(**restaurant_parser.get_dict(), city=city))
+        count("restaurants_parsed")
+
+        # Collect additional content if available
+        if restaurant_parser.has_info():
+            new_content.append(
+                RestaurantContent(
+                    name=name, 
+                    city=city,
+                    source=content_url, 
+                    content=restaurant_parser.get_content()
+                )
+            )
+        
+        # Add related articles
+        if restaurant_parser.has_articles():
+            for article_url in restaurant_parser.get_articles():
+                article_parser = ParserArticle.from_url(article_url, name)
+                new_content.append(RestaurantContent(**article_parser.get_dict(), city=city))
+                count("articles_parsed")
+
+    return new_data, new_content
+
 @task_runner("Adding new restaurants and related content")
-def add_restaurants(session: Session) -> None:
+def add_restaurants(session: Session, cities: list[str] | None = None) -> None:
     """
     Adds new restaurants and related content to the database.
 
-    For each restaurant in RestaurantURL that is not already in RestaurantData,
-    this function retrieves restaurant data and content from external sources
-    and commits them to the database.
+    For each restaurant in RestaurantURL that is not already in RestaurantData
+    for its city, this function retrieves restaurant data and content from external sources
+    and commits them to the database. The cities are crawled in parallel, the
+    results are written from the calling thread.
 
     Args:
         session (Session): SQLAlchemy session to use for database operations.
+        cities (list[str] | None): Keys of the cities to crawl, all configured cities if None.
     """
     try:
-        subquery = session.query(RestaurantData.name).subquery()
+        has_data = (
+            select(RestaurantData.name)
+            .where(RestaurantData.name == RestaurantURL.name, RestaurantData.city == RestaurantURL.city)
+            .exists()
+        )
         restaurants = (
-            session.query(RestaurantURL)
-            .filter(RestaurantURL.name.notin_(select(subquery)))
+            session.query(RestaurantURL.name, RestaurantURL.content_url, RestaurantURL.city)
+            .filter(~has_data)
+            .filter(RestaurantURL.city.in_(get_cities(cities)))
+            .order_by(RestaurantURL.city)
             .all()
         )
+        pending = {
+            city: [(name, content_url) for name, content_url, _ in rows]
+            for city, rows in groupby(restaurants, key=lambda row: row.city)
+        }
 
-        new_data = []
-        new_content = []
+        crawled = crawl_cities(lambda city: crawl_restaurants(pending[city], city), list(pending))
+        new_data = [data for city_data, _ in crawled.values() for data in city_data]
+        new_content = [content for _, city_content in crawled.values() for content in city_content]
 
-        for restaurant in restaurants:
-            logger.info(f"Processing restaurant: {restaurant.name}")
-
-            # Parse restaurant details
-            restaurant_parser = ParserRestaurant.from_url(restaurant.content_url, restaurant.name)
-            new_data.append(RestaurantData(**restaurant_parser.get_dict()))
-
-            # Collect additional content if available
-            if restaurant_parser.has_info():
-                new_content.append(
-                    RestaurantContent(
-                        name=restaurant.name, 
-                        source=restaurant.content_url, 
-                        content=restaurant_parser.get_content()
-                    )
-                )
-            
-            # Add related articles
-            if restaurant_parser.has_articles():
-                for article_url in restaurant_parser.get_articles():
-                    article_parser = ParserArticle.from_url(article_url, restaurant.name)
-                    new_content.append(RestaurantContent(**article_parser.get_dict()))
-
-        # Commit all new restaurants and content entries
+        # Commit all new restaurants and content entries together with their full-text index entries
         session.add_all(new_data + new_content)
+        index_documents(session, [
+            {'name': content.name, 'city': content.city, 'source': content.source, 'kind': 'content', 'text': content.content}
+            for content in new_content
+        ])
         session.commit()
-        logger.info(f"Added {len(new_data)} restaurants and {len(new_content)} content entries.")
+        if new_data:
+            bump_data_version(session)
+        logger.info(f"Added {len(new_data)} restaurants and {len(new_content)} content entries in {len(crawled)} cities.")
     
     except Exception as e:
         logger.error(f"Error adding restaurants: {e}")
         session.rollback()
+        # Re-raised so the staging database is discarded instead of published
+        raise
 
 @task_runner("Adding new restaurant URLs")
-def add_restaurant_urls(session: Session) -> None:
+def add_restaurant_urls(session: Session, cities: list[str] | None = None) -> None:
     """
     Adds new restaurant URLs to the database by parsing from an external source.
 
-    This function retrieves a list of open restaurants, filters out any that already exist
-    in the database, and commits the new URLs.
+    This function retrieves the list of open restaurants of every city, crawling the
+    cities in parallel, filters out any that already exist in the database for that city,
+    and commits the new URLs. A chain listed in several cities is added to each of them.
 
     Args:
         session (Session): SQLAlchemy session to use for database operations.
+        cities (list[str] | None): Keys of the cities to crawl, all configured cities if None.
     """
-    try:
-        parsers = ParserURL.from_url()
-        names = {name[0] for name in session.query(RestaurantURL.name).all()}
+    from .parser import ParserURL
 
-        new_urls = [
-            RestaurantURL(**parser.get_dict()) 
-            for parser in parsers if parser.is_open() and parser.get_dict().get('name') not in names
-        ]
+    try:
+        listings = crawl_cities(lambda city: ParserURL.from_url(settings.cities[city]), get_cities(cities))
+        keys = set(session.query(RestaurantURL.name, RestaurantURL.city).all())
+
+        new_urls = []
+        for city, parsers in listings.items():
+            count("listings_parsed", len(parsers))
+            for parser in parsers:
+                url = parser.get_dict()
+                if parser.is_open() and (url.get('name'), city) not in keys:
+                    new_urls.append(RestaurantURL(**url, city=city))
+                    keys.add((url.get('name'), city))
 
         session.add_all(new_urls)
         session.commit()
-        logger.info(f"Added {len(new_urls)} new restaurant URLs.")
+        if new_urls:
+            bump_data_version(session)
+        logger.info(f"Added {len(new_urls)} new restaurant URLs in {len(listings)} cities.")
 
     except Exception as e:
         logger.error(f"Error adding restaurant URLs: {e}")
         session.rollback()
+        raise
+
+@task_runner("Adding image thumbnails")
+def add_thumbnails(session: Session) -> None:
+    """
+    Downloads the image of every restaurant without a thumbnail and stores a resized, compressed
+    thumbnail in the local content-addressed store, so the search app does not hotlink the
+    full-size images.
+
+    Each image URL is downloaded once, with settings.thumbnails.CONCURRENCY downloads at a time.
+    Images that fail to download are logged and retried on the next run.
+
+    Args:
+        session (Session): SQLAlchemy session to use for database operations.
+    """
+    # Pillow is only needed by this task
+    from .thumbnails import create_thumbnail
+
+    try:
+        restaurants = (
+            session.query(RestaurantURL)
+            .filter(RestaurantURL.image_url.isnot(None), RestaurantURL.thumbnail.is_(None))
+            .all()
+        )
+        urls = list(dict.fromkeys(restaurant.image_url for restaurant in restaurants))
+
+        def create(url: str) -> str | None:
+            try:
+                name, original_size, thumbnail_size = create_thumbnail(url)
+            except Exception as e:
+                logger.error(f"Error creating thumbnail of {url}: {e}")
+                count("thumbnail_errors")
+                return None
+            count("images_downloaded")
+            count("image_bytes", original_size)
+            count("thumbnail_bytes", thumbnail_size)
+            return name
+
+        with ThreadPoolExecutor(max_workers=settings.thumbnails.CONCURRENCY, thread_name_prefix="thumbnail") as executor:
+            thumbnails = dict(zip(urls, executor.map(create, urls)))
+
+        added = 0
+        for restaurant in restaurants:
+            if thumbnails.get(restaurant.image_url):
+                restaurant.thumbnail = thumbnails[restaurant.image_url]
+                added += 1
+        session.commit()
+        if added:
+            bump_data_version(session)
+        logger.info(f"Added thumbnails of {added} restaurants from {len(urls)} images.")
+
+    except Exception as e:
+        logger.error(f"Error adding thumbnails: {e}")
+        session.rollback()
+        raise
 
 @task_runner("Generating and adding summaries")
 def add_summaries(session: Session, engine: Engine) -> None:
@@ -127,42 +288,174 @@ def add_summaries(session: Session, engine: Engine) -> None:
     Generates and adds summaries for restaurant content to the database.
 
     For each restaurant with content that does not already have a summary,
-    this function generates a summary and commits it to the database.
+    this function generates a summary and commits it to the database. The content
+    is streamed from the database and summarized in batches of at most MAX_TOKENS
+    characters, each committed on its own.
 
     Args:
         session (Session): SQLAlchemy session to use for database operations.
         engine (Engine): SQLAlchemy engine to retrieve restaurant content data.
     """
+    # The LangChain summarizer is only needed for ingestion
+    from .summary import batch_by_length, generate_summaries
+
     try:
-        df = pd.read_sql('SELECT * FROM restaurantcontent', con=engine)
-        df = df[df['content'].notna()]
+        added = 0
+        for batch in batch_by_length(settings.MAX_TOKENS, iter_unsummarized_content(engine)):
+            keys = [key for key, _ in batch]
+            summaries = generate_summaries([content for _, content in batch])
+            new_summaries = [
+                RestaurantSummary(name=name, city=city, summary=summary) for (name, city), summary in zip(keys, summaries)
+            ]
 
-        existing_names = {name[0] for name in session.query(RestaurantSummary.name).all()}
-        df = df[~df['name'].isin(existing_names)]
-        
-        # Group content by restaurant name
-        df_grouped = df.groupby('name')['content'].apply(' '.join).reset_index()
-        maxchars = settings.MAX_TOKENS
-
-        new_summaries = []
-        for index in splicegen(maxchars, df_grouped['content'].tolist()):
-            df_grouped_index = df_grouped.iloc[index]
-            names = df_grouped_index['name'].tolist()
-            content = df_grouped_index['content'].tolist()
-
-            summaries = generate_summaries(content) 
-            new_summaries.extend(
-                [RestaurantSummary(name=name, summary=summary) for name, summary in zip(names, summaries)]
-            )
+            # Commit each batch together with its full-text index entries, so memory stays bounded by the batch
+            session.add_all(new_summaries)
+            index_documents(session, [
+                {'name': summary.name, 'city': summary.city, 'source': None, 'kind': 'summary', 'text': summary.summary}
+                for summary in new_summaries
+            ])
+            session.commit()
+            added += len(new_summaries)
+            count("summary_batches")
+            count("summaries", len(new_summaries))
+            logger.info(f"Added {added} summaries so far.")
+
+        if added:
+            bump_data_version(session)
+        logger.info(f"Added {added} summaries.")
+
+    except Exception as e:
+        logger.error(f"Error adding summaries: {e}")
+        session.rollback()
+        raise
+
+def iter_unsummarized_content(engine: Engine, chunk_size: int = 100) -> Iterator[tuple[tuple[str, str], str]]:
+    """
+    Streams the content of the restaurants that do not have a summary yet, joined per restaurant.
+
+    The restaurants are selected in SQL with an anti-join and the rows are fetched in chunks in
+    primary key order, so only one restaurant's content is held in memory at a time.
+
+    Args:
+        engine (Engine): SQLAlchemy engine to read the restaurant content with.
+        chunk_size (int): Number of content rows fetched at a time.
+
+    Yields:
+        tuple[tuple[str, str], str]: The restaurant name and city, and all of its content joined by spaces.
+    """
+    has_summary = (
+        select(RestaurantSummary.name)
+        .where(RestaurantSummary.name == RestaurantContent.name, RestaurantSummary.city == RestaurantContent.city)
+        .exists()
+    )
+    statement = (
+        select(RestaurantContent.name, RestaurantContent.city, RestaurantContent.content)
+        .where(RestaurantContent.content.is_not(None), ~has_summary)
+        .order_by(RestaurantContent.name, RestaurantContent.city)
+    )
+
+    with engine.connect() as connection:
+        rows = connection.execution_options(yield_per=chunk_size).execute(statement)
+        for key, group in groupby(rows, key=lambda row: (row.name, row.city)):
+            yield key, ' '.join(row.content for row in group)
+
+def index_documents(session: Session, documents: list[dict]) -> None:
+    """
+    Adds documents to the full-text index without committing, so they are committed
+    in the same transaction as the rows they index.
 
-        # Commit all new summaries
-        session.add_all(new_summaries)
+    Args:
+        session (Session): SQLAlchemy session to use for database operations.
+        documents (list[dict]): Documents with the keys 'name', 'city', 'source', 'kind' ('content' or 'summary') and 'text'.
+    """
+    documents = [document for document in documents if document['text']]
+    if documents:
+        session.execute(
+            text(f"INSERT INTO {FTS_TABLE} (name, city, source, kind, text) VALUES (:name, :city, :source, :kind, :text)"),
+            documents
+        )
+
+@task_runner("Rebuilding full-text index")
+def rebuild_fts_index(session: Session) -> None:
+    """
+    Rebuilds the full-text index from all restaurant content and summaries.
+
+    Args:
+        session (Session): SQLAlchemy session to use for database operations.
+    """
+    try:
+        session.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        index_documents(session, [
+            {'name': content.name, 'city': content.city, 'source': content.source, 'kind': 'content', 'text': content.content}
+            for content in session.query(RestaurantContent).all()
+        ])
+        index_documents(session, [
+            {'name': summary.name, 'city': summary.city, 'source': None, 'kind': 'summary', 'text': summary.summary}
+            for summary in session.query(RestaurantSummary).all()
+        ])
         session.commit()
-        logger.info(f"Added {len(new_summaries)} summaries.")
+        logger.info("Rebuilt the full-text index.")
 
     except Exception as e:
-        logger.error(f"Error adding summaries: {e}")
+        logger.error(f"Error rebuilding full-text index: {e}")
         session.rollback()
+        raise
+
+def search_fts(session: Session, query: str, names: list[str] | None = None, limit: int = 20, city: str | None = None) -> list[str]:
+    """
+    Searches the full-text index for restaurants matching any word of the query, ranked by BM25.
+
+    Args:
+        session (Session): SQLAlchemy session to use for database operations.
+        query (str): The search query.
+        names (list[str] | None): Restaurant names to restrict the search to (optional).
+        limit (int): Maximum number of restaurant names to return.
+        city (str | None): City to restrict the search to (optional).
+
+    Returns:
+        list[str]: Matching restaurant names, best match first.
+    """
+    terms = {term for term in re.findall(r"\w+", query.lower()) if len(term) > 1}
+    if not terms:
+        return []
+
+    # Quote every term so FTS5 operators in the user query are matched literally
+    match = " OR ".join(f'"{term}"' for term in sorted(terms))
+    sql = f"SELECT name FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+    params = {'match': match, 'limit': limit}
+    if names:
+        sql += " AND name IN :names"
+        params['names'] = names
+    if city:
+        sql += " AND city = :city"
+        params['city'] = city
+    sql += " GROUP BY name ORDER BY MIN(rank) LIMIT :limit"
+
+    statement = text(sql)
+    if names:
+        statement = statement.bindparams(bindparam('names', expanding=True))
+
+    try:
+        return [row[0] for row in session.execute(statement, params)]
+    except Exception as e:
+        logger.error(f"Error searching full-text index for '{query}': {e}")
+        return []
+
+def image_url(restaurant_url: RestaurantURL | None) -> str | None:
+    """
+    Returns the URL of the local thumbnail of a restaurant image, falling back to the original image.
+
+    Args:
+        restaurant_url (RestaurantURL | None): The URL record of the restaurant.
+
+    Returns:
+        str | None: The image URL, None if the restaurant has no image.
+    """
+    if restaurant_url is None:
+        return None
+    if restaurant_url.thumbnail:
+        return f"{settings.thumbnails.URL_PREFIX}/{restaurant_url.thumbnail}"
+    return restaurant_url.image_url
 
 def restaurant_to_dict(restaurant) -> dict:
     """
@@ -183,18 +476,20 @@ def restaurant_to_dict(restaurant) -> dict:
         "district": restaurant.district,
         "restaurant_type": restaurant.restaurant_type,
         "price_level": restaurant.price_level,
+        "city": restaurant.city,
         "summary": restaurant.summary.summary if restaurant.summary else None,
-        "image_url": restaurant.restaurant_url.image_url if restaurant.restaurant_url else None,
+        "image_url": image_url(restaurant.restaurant_url),
         "content_url": restaurant.restaurant_url.content_url if restaurant.restaurant_url else None,
     }
 
-def get_complete_restaurant_data(session: Session, names: list[str]) -> list[dict]:
+def get_complete_restaurant_data(session: Session, names: list[str], city: str | None = None) -> list[dict]:
     """
-    Retrieves complete restaurant data for a list of restaurant names.
+    Retrieves complete restaurant data for a list of restaurant names in one city.
 
     Args:
         session (Session): SQLAlchemy session to use for database operations.
         names (list[str]): List of restaurant names to retrieve.
+        city (str | None): Key of the city, by default settings.DEFAULT_CITY.
 
     Returns:
         list[dict]: A list of dictionaries, each representing a restaurant's data.
@@ -205,7 +500,7 @@ def get_complete_restaurant_data(session: Session, names: list[str]) -> list[dic
             joinedload(RestaurantData.summary),
             joinedload(RestaurantData.restaurant_url)
         )
-        .filter(RestaurantData.name.in_(names))
+        .filter(RestaurantData.name.in_(names), RestaurantData.city == (city or settings.DEFAULT_CITY))
         .all()
     )
 
@@ -214,6 +509,45 @@ def get_complete_restaurant_data(session: Session, names: list[str]) -> list[dic
     return [restaurant_dict[name] for name in names if name in restaurant_dict]
     
 
+def get_filter_value_counts(session: Session, features: list[str]) -> dict[str, dict[str, int]]:
+    """
+    Counts the restaurants per filter value for specified features in the RestaurantData table.
+
+    Comma-separated values are split, so a restaurant with meal type "Lunch, Diner" is counted
+    for both "Lunch" and "Diner". All features are read in a single query.
+
+    Args:
+        session (Session): SQLAlchemy session to use for database operations.
+        features (list[str]): List of feature names to count values for.
+
+    Returns:
+        dict[str, dict[str, int]]: A dictionary where each key is a feature and the value maps each unique value to its number of restaurants, sorted by value.
+    """
+    columns = []
+    for feature in features:
+        try:
+            columns.append(getattr(RestaurantData, feature))
+        except AttributeError as e:
+            logger.error(f"Invalid feature '{feature}': {e}")
+
+    if not columns:
+        return {}
+
+    counters = {column.key: Counter() for column in columns}
+    try:
+        for row in session.query(*columns).all():
+            for column, value in zip(columns, row):
+                if value is None:
+                    continue
+                # Count each restaurant once per value, even if the value is repeated
+                counters[column.key].update({item.strip() for item in value.split(',') if item.strip()})
+
+    except Exception as e:
+        logger.error(f"Error fetching filter value counts for {features}: {e}")
+        return {}
+
+    return {feature: dict(sorted(counter.items())) for feature, counter in counters.items()}
+
 def get_unique_filter_values(session: Session, features: list[str]) -> dict[str, list[str]]:
     """
     Retrieves unique filter values for specified features in the RestaurantData table.
@@ -225,26 +559,41 @@ def get_unique_filter_values(session: Session, features: list[str]) -> dict[str,
     Returns:
         dict[str, list[str]]: A dictionary where each key is a feature and the value is a list of unique values for that feature.
     """
-    unique_values = {}
-    for feature in features:
-        try:
-            raw_values = session.query(getattr(RestaurantData, feature)).distinct().all()
-
-            # Extract, split, and clean unique values
-            split_values = [
-                item.strip()
-                for value in raw_values if value[0] is not None
-                for item in value[0].split(',')
-                if item.strip()
-            ]
-            unique_values[feature] = sorted(set(split_values))
+    counts = get_filter_value_counts(session, features)
+    return {feature: list(values) for feature, values in counts.items()}
 
-        except AttributeError as e:
-            logger.error(f"Invalid feature '{feature}': {e}")
-        except Exception as e:
-            logger.error(f"Error fetching unique filter values for '{feature}': {e}")
+def get_data_version(session: Session) -> int:
+    """
+    Retrieves the current data version, which changes whenever ingestion modifies the data.
+
+    Args:
+        session (Session): SQLAlchemy session to use for database operations.
+
+    Returns:
+        int: The current data version, or 0 if the data has never been versioned.
+    """
+    version = session.query(DataVersion.version).filter(DataVersion.id == 1).scalar()
+    return version or 0
+
+def bump_data_version(session: Session) -> int:
+    """
+    Increments the data version so that serving processes reload their cached data.
 
-    return unique_values
+    Args:
+        session (Session): SQLAlchemy session to use for database operations.
+
+    Returns:
+        int: The new data version.
+    """
+    data_version = session.get(DataVersion, 1)
+    if data_version is None:
+        data_version = DataVersion(id=1, version=0)
+        session.add(data_version)
+
+    data_version.version += 1
+    session.commit()
+    logger.info(f"Data version bumped to {data_version.version}.")
+    return data_version.version
 
 def clear_table(table: Table, engine: Engine) -> None:
     """
@@ -258,6 +607,18 @@ def clear_table(table: Table, engine: Engine) -> None:
     table.drop(engine, checkfirst=True)
     table.create(engine, checkfirst=True)
 
+def clear_fts_index(engine: Engine, kind: str) -> None:
+    """
+    Removes all documents of a kind from the full-text index.
+
+    Args:
+        engine (Engine): SQLAlchemy engine instance.
+        kind (str): The kind of documents to remove ('content' or 'summary').
+    """
+    print(f"Clearing full-text index: {kind}")
+    with engine.begin() as connection:
+        connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE kind = :kind"), {'kind': kind})
+
 @task_runner("Clearing tables")
 def clear_tables(args: Namespace, engine: Engine) -> None:
     """
@@ -273,6 +634,11 @@ def clear_tables(args: Namespace, engine: Engine) -> None:
     if args.add_restaurants:
         clear_table(RestaurantData.__table__, engine)
         clear_table(RestaurantContent.__table__, engine)
+        clear_fts_index(engine, 'content')
 
     if args.add_summaries:
-        clear_table(RestaurantSummary.__table__, engine)
\ No newline at end of file
+        clear_table(RestaurantSummary.__table__, engine)
+        clear_fts_index(engine, 'summary')
+
+    with Session(bind=engine) as session:
+        bump_data_version(session)
\ No newline at end of file
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import numpy as np
+from functools import lru_cache
+from typing import Callable, Dict, List
+from config import settings
+from .run_report import count
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    """
+    Hashes a text to key its embedding.
+
+    Args:
+        text (str): The embedded text.
+
+    Returns:
+        str: The content hash.
+    """
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Stores the embedding of each text once, keyed by content hash and embedding model, so the
+    search and chat vector stores never embed the same text twice and rebuilds only embed new text.
+    """
+
+    def __init__(self, path: str, model: str) -> None:
+        """
+        Opens or creates the store.
+
+        Args:
+            path (str): Path of the SQLite file.
+            model (str): Name of the embedding model the embeddings are computed with.
+        """
+        self.path = path
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "content_hash TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (content_hash, model))"
+        )
+        self._connection.commit()
+
+    def get_many(self, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Returns the stored embeddings of the given content hashes, skipping missing ones.
+
+        Args:
+            hashes (List[str]): The content hashes.
+
+        Returns:
+            Dict[str, List[float]]: The embeddings by content hash.
+        """
+        unique_hashes = list(dict.fromkeys(hashes))
+        vectors: Dict[str, List[float]] = {}
+        # SQLite limits the number of parameters of a query
+        for start in range(0, len(unique_hashes), 500):
+            chunk = unique_hashes[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE model = ? AND content_hash IN ({placeholders})",
+                    [self.model, *chunk]
+                ).fetchall()
+            vectors.update((content_hash, np.frombuffer(vector, dtype=np.float32).tolist()) for content_hash, vector in rows)
+        return vectors
+
+    def put_many(self, vectors: Dict[str, List[float]]) -> None:
+        """
+        Stores embeddings by content hash.
+
+        Args:
+            vectors (Dict[str, List[float]]): The embeddings by content hash.
+        """
+        rows = [
+            (content_hash, self.model, np.asarray(vector, dtype=np.float32).tobytes())
+            for content_hash, vector in vectors.items()
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+
+    def embed(self, texts: List[str], embed_function: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """
+        Returns the embedding of each text, computing and storing only the embeddings that are not stored yet.
+
+        Args:
+            texts (List[str]): The texts to embed.
+            embed_function (Callable[[List[str]], List[List[float]]]): Function embedding a batch of texts with the store's model.
+
+        Returns:
+            List[List[float]]: The embedding of each text, in the same order.
+        """
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.get_many(hashes)
+
+        missing = {content_hash: text for content_hash, text in zip(hashes, texts) if content_hash not in vectors}
+        self.hits += len(set(hashes)) - len(missing)
+        self.misses += len(missing)
+        count("embeddings_computed", len(missing))
+        if missing:
+            batch_size = settings.embeddings.BATCH_SIZE
+            items = list(missing.items())
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+                embedded = dict(zip((content_hash for content_hash, _ in batch), embed_function([text for _, text in batch])))
+                self.put_many(embedded)
+                vectors.update(embedded)
+
+        return [vectors[content_hash] for content_hash in hashes]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the number of texts found in the store and the number of texts that had to be embedded.
+
+        Returns:
+            Dict[str, int]: Store statistics.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=None)
+def get_embedding_store() -> EmbeddingStore:
+    """
+    Opens the embedding store configured in settings.embeddings once per process.
+
+    Returns:
+        EmbeddingStore: The shared embedding store.
+    """
+    return EmbeddingStore(settings.embeddings.DB_PATH, settings.embeddings.MODEL)
@@ -0,0 +1,245 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def partition_name(base_name: str, city: Optional[str] = None) -> str:
+    """
+    Returns the name of the collection partition of a city. The default city keeps the base
+    name, so indexes built before cities were partitioned stay in use.
+
+    Args:
+        base_name (str): Name of the collection.
+        city (Optional[str]): Key of the city, by default settings.DEFAULT_CITY.
+
+    Returns:
+        str: The collection name of the city, used as the base name of its versions.
+    """
+    city = city or settings.DEFAULT_CITY
+    return base_name if city == settings.DEFAULT_CITY else f"{base_name}_{city}"
+
+
+class IndexPointer:
+    """
+    Points to the active version of a vector collection, so a rebuild can write a new versioned
+    collection next to the live one and switch to it in one step.
+
+    The pointer is a JSON file next to the Chroma database, replaced atomically on every change.
+    Without a pointer file the unversioned collection with the base name is active, so existing
+    indexes keep working until their first versioned rebuild.
+    """
+
+    def __init__(self, db_path: str, base_name: str) -> None:
+        """
+        Initializes the pointer.
+
+        Args:
+            db_path (str): Directory of the Chroma database.
+            base_name (str): Name of the collection, used as the prefix of its versions.
+        """
+        self.db_path = db_path
+        self.base_name = base_name
+        self.path = os.path.join(db_path, f"{base_name}.pointer.json")
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_mtime: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def read(self) -> Dict[str, Any]:
+        """
+        Reads the pointer, only parsing the file again when it has been replaced.
+
+        Returns:
+            Dict[str, Any]: The active collection and the list of versions, newest first.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {"active": self.base_name, "versions": []}
+
+        with self._lock:
+            if self._cached is None or self._cached_mtime != mtime:
+                with open(self.path, encoding="utf-8") as f:
+                    self._cached = json.load(f)
+                self._cached_mtime = mtime
+            return self._cached
+
+    def active(self) -> str:
+        """
+        Returns the name of the collection that serving should query.
+
+        Returns:
+            str: The active collection name.
+        """
+        return self.read()["active"]
+
+    def new_version(self) -> str:
+        """
+        Returns the name for a new version of the collection.
+
+        Returns:
+            str: A collection name that sorts after all earlier versions.
+        """
+        return f"{self.base_name}_v{time.strftime('%Y%m%d%H%M%S')}{int(time.time() * 1000) % 1000:03d}"
+
+    def publish(self, name: str) -> None:
+        """
+        Makes a collection the active one. The previously active collection is kept as the
+        rollback target and marked as retired.
+
+        Args:
+            name (str): The collection to activate.
+        """
+        pointer = self.read()
+        now = time.time()
+        versions = [dict(version) for version in pointer["versions"] if version["name"] != name]
+        for version in versions:
+            version.setdefault("retired_at", now)
+        if not pointer["versions"] and pointer["active"] != name:
+            # The unversioned collection an index was built in before versioning
+            versions.append({"name": pointer["active"], "created_at": now, "retired_at": now})
+
+        self._write({"active": name, "versions": [{"name": name, "created_at": now}] + versions})
+        logger.info(f"Activated {name}, previous version {pointer['active']}.")
+
+    def rollback(self) -> str:
+        """
+        Makes the previous version the active one again.
+
+        Returns:
+            str: The collection that was activated.
+
+        Raises:
+            ValueError: If there is no previous version.
+        """
+        pointer = self.read()
+        if len(pointer["versions"]) < 2:
+            raise ValueError(f"No previous version of {self.base_name} to roll back to.")
+
+        active, previous, *older = pointer["versions"]
+        previous = {key: value for key, value in previous.items() if key != "retired_at"}
+        active = dict(active, retired_at=time.time())
+        self._write({"active": previous["name"], "versions": [previous, active] + older})
+        logger.info(f"Rolled back {self.base_name} from {active['name']} to {previous['name']}.")
+        return previous["name"]
+
+    def expired(self, retention_seconds: float) -> List[str]:
+        """
+        Returns the versions that were retired longer ago than the retention period. The active
+        version and the previous version, needed for a rollback, never expire.
+
+        Args:
+            retention_seconds (float): Number of seconds a retired version is kept.
+
+        Returns:
+            List[str]: Names of the expired collections.
+        """
+        cutoff = time.time() - retention_seconds
+        return [
+            version["name"] for version in self.read()["versions"][2:]
+            if version.get("retired_at", cutoff) < cutoff
+        ]
+
+    def forget(self, names: List[str]) -> None:
+        """
+        Removes deleted versions from the pointer.
+
+        Args:
+            names (List[str]): Names of the deleted collections.
+        """
+        pointer = self.read()
+        self._write({
+            "active": pointer["active"],
+            "versions": [version for version in pointer["versions"] if version["name"] not in names]
+        })
+
+    def _write(self, pointer: Dict[str, Any]) -> None:
+        """
+        Replaces the pointer file atomically.
+
+        Args:
+            pointer (Dict[str, Any]): The new pointer.
+        """
+        os.makedirs(self.db_path, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(pointer, f, indent=2)
+        os.replace(tmp_path, self.path)
+        with self._lock:
+            self._cached = None
+
+
+def build_version(
+    pointer: IndexPointer,
+    build: Callable[[str], None],
+    validate: Callable[[str], None],
+    drop: Callable[[str], None],
+    retention_seconds: float
+) -> str:
+    """
+    Builds a new version of a collection, validates it, activates it and deletes expired versions.
+
+    If building or validation fails, the new collection is deleted and the active version is kept.
+
+    Args:
+        pointer (IndexPointer): The pointer of the collection.
+        build (Callable[[str], None]): Function filling the collection with the given name.
+        validate (Callable[[str], None]): Function raising ValueError if the collection with the given name is not fit to serve.
+        drop (Callable[[str], None]): Function deleting the collection with the given name.
+        retention_seconds (float): Number of seconds a retired version is kept.
+
+    Returns:
+        str: The name of the activated collection.
+    """
+    name = pointer.new_version()
+    try:
+        build(name)
+        validate(name)
+    except Exception:
+        logger.error(f"Building {name} failed, keeping {pointer.active()} active.")
+        drop(name)
+        raise
+
+    pointer.publish(name)
+
+    expired = pointer.expired(retention_seconds)
+    for old_name in expired:
+        drop(old_name)
+    pointer.forget(expired)
+    if expired:
+        logger.info(f"Deleted expired versions {', '.join(expired)}.")
+    return name
+
+
+def main() -> None:
+    """
+    Main function to show the versions of the search and chat collections or roll one back.
+    The search collection is partitioned by city, so a rollback only affects the given city.
+    """
+    parser = argparse.ArgumentParser(description="Show or roll back the versions of the vector collections.")
+    parser.add_argument('index', choices=['chat', 'search'], help='The vector collection')
+    parser.add_argument('--city', choices=sorted(settings.cities), default=settings.DEFAULT_CITY, help='City partition of the search collection')
+    parser.add_argument('--rollback', action='store_true', help='Activate the previous version again')
+    args = parser.parse_args()
+
+    if args.index == "search":
+        pointer = IndexPointer(settings.search.CHROMA_DB_PATH, partition_name(settings.search.CHROMA_COLLECTION_NAME, args.city))
+    else:
+        pointer = IndexPointer(settings.chat.CHROMA_DB_PATH, settings.chat.CHROMA_COLLECTION_NAME)
+    if args.rollback:
+        pointer.rollback()
+
+    state = pointer.read()
+    for version in state["versions"] or [{"name": state["active"]}]:
+        marker = "*" if version["name"] == state["active"] else " "
+        print(f"{marker} {version['name']}")
+
+
+if __name__ == "__main__":
+    main()
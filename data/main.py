@@ -1,5 +1,8 @@
 from .crud import *
 from .scheme import *
+from .staging import staging_database
+from .run_report import start_run
+from config import settings
 import argparse
 
 def main():
@@ -9,28 +12,64 @@ def main():
     parser.add_argument('--add_restaurant_urls', action='store_true', help='Call add_restaurant_urls function')
     parser.add_argument('--add_restaurants', action='store_true', help='Call add_restaurants function')
     parser.add_argument('--add_summaries', action='store_true', help='Call add_summaries function')
+    parser.add_argument('--add_thumbnails', action='store_true', help='Download the restaurant images and store local thumbnails')
+    parser.add_argument('--rebuild_fts', action='store_true', help='Rebuild the full-text index from all content and summaries')
+    parser.add_argument('--cities', nargs='+', default=None, help='Cities to crawl, by default all cities in settings.cities')
+    parser.add_argument('--build_vector_stores', action='store_true', help='Embed summaries and articles into the search and chat vector stores')
+    parser.add_argument('--report', action='store_true', help='Write a run report with the time, peak memory and counters of every task')
+    parser.add_argument('--profile', action='store_true', help='Also write a cProfile dump per task (implies --report)')
     args = parser.parse_args()
 
-    # Initialize database session and engine
-    session = Session()
+    report = start_run(settings.reports.DIR, profile=args.profile) if args.report or args.profile else None
+    try:
+        run(args)
+    finally:
+        if report is not None:
+            print(f"Run report written to {report.write()}.")
 
-    # Clear tables if requested
-    if args.clear_tables:
-        clear_tables(args, engine)
+def run(args: argparse.Namespace) -> None:
+    """
+    Runs the data operations selected on the command line.
 
-    # Call specified functions
-    if args.add_restaurant_urls:
-        add_restaurant_urls(session)
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+    """
 
-    if args.add_restaurants:
-        add_restaurants(session)
+    # Ingestion writes to a staging copy of the database, which is published when all steps succeed,
+    # so a running search app keeps serving the previous data until then. A failed step raises and
+    # the staging copy is discarded.
+    if args.clear_tables or args.add_restaurant_urls or args.add_restaurants or args.add_summaries or args.add_thumbnails or args.rebuild_fts:
+        with staging_database() as (session, staging_engine):
+            # Clear tables if requested
+            if args.clear_tables:
+                clear_tables(args, staging_engine)
 
-    if args.add_summaries:
-        add_summaries(session, engine)
+            # Call specified functions
+            if args.add_restaurant_urls:
+                add_restaurant_urls(session, args.cities)
 
-    # Close the session
-    session.close()
-    print("Database session closed. All operations completed.")
+            if args.add_restaurants:
+                add_restaurants(session, args.cities)
+
+            if args.add_summaries:
+                add_summaries(session, staging_engine)
+
+            if args.add_thumbnails:
+                add_thumbnails(session)
+
+            if args.rebuild_fts:
+                rebuild_fts_index(session)
+
+    if args.build_vector_stores:
+        # The vector stores pull in LangChain and LlamaIndex, so they are only imported for this step
+        from apps.search.vectorstore import main as build_search_vector_store
+        from apps.chat.rag import main as build_chat_vector_store
+
+        # Both share the embedding store, so only new text is embedded
+        task_runner("Building the search vector store")(build_search_vector_store)()
+        task_runner("Building the chat vector store")(build_chat_vector_store)()
+
+    print("All operations completed.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
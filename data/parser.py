@@ -125,8 +125,8 @@ class ParserURL:
     """
 
     @classmethod
-    def from_url(cls) -> list["ParserURL"]:
-        page_source = Selector(get_page_source_urls())
+    def from_url(cls, url: str) -> list["ParserURL"]:
+        page_source = Selector(get_page_source_urls(url))
         return [cls(r) for r in page_source.xpath("//div[@class='resultaat']")]
 
     def __init__(self, page_source: Selector):
@@ -0,0 +1,244 @@
+import argparse
+import cProfile
+import glob
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from config import settings
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Returns the peak resident set size of the process so far.
+
+    Returns:
+        Optional[float]: Peak RSS in megabytes, or None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class RunReport:
+    """
+    Records the wall time, CPU time, peak RSS and counters of every task of a data pipeline run,
+    and optionally a cProfile dump per task, as a JSON report that can be compared across runs.
+
+    cProfile only sees the thread that runs the task, not the crawl threads. To profile those,
+    run the CLI under a sampling profiler, e.g. `py-spy record -o run.svg -- python -m data.main ...`.
+    """
+
+    def __init__(self, directory: str, profile: bool = False, argv: Optional[List[str]] = None) -> None:
+        """
+        Initializes an empty report.
+
+        Args:
+            directory (str): Directory the report and profile dumps are written to.
+            profile (bool): Whether to write a cProfile dump per task.
+            argv (Optional[List[str]]): Command line of the run, recorded in the report.
+        """
+        self.directory = directory
+        self.profile = profile
+        self.argv = argv if argv is not None else sys.argv[1:]
+        self.run_id = time.strftime("%Y%m%d-%H%M%S")
+        self.started_at = time.time()
+        self.tasks: List[Dict[str, Any]] = []
+        self._counters: Optional[Counter] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def task(self, name: str) -> Iterator[None]:
+        """
+        Records one task. Counters incremented while the task runs, also from other threads, are
+        attributed to it.
+
+        Args:
+            name (str): Name of the task.
+
+        Yields:
+            None
+        """
+        record: Dict[str, Any] = {"name": name, "status": "failed"}
+        counters: Counter = Counter()
+        with self._lock:
+            self._counters = counters
+
+        profiler = cProfile.Profile() if self.profile else None
+        start, cpu_start = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+            record["status"] = "completed"
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, f"run_{self.run_id}_task{len(self.tasks) + 1}.prof")
+                profiler.dump_stats(path)
+                record["profile"] = path
+
+            with self._lock:
+                self._counters = None
+            record.update(
+                wall_seconds=round(time.perf_counter() - start, 3),
+                cpu_seconds=round(time.process_time() - cpu_start, 3),
+                peak_rss_mb=peak_rss_mb(),
+                counters=dict(counters),
+            )
+            self.tasks.append(record)
+
+    def count(self, name: str, n: int = 1) -> None:
+        """
+        Increments a counter of the running task.
+
+        Args:
+            name (str): Name of the counter.
+            n (int): Amount to add.
+        """
+        with self._lock:
+            if self._counters is not None:
+                self._counters[name] += n
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the report.
+
+        Returns:
+            Dict[str, Any]: The run id, command line, timing and peak RSS of the run and its tasks.
+        """
+        return {
+            "run_id": self.run_id,
+            "argv": self.argv,
+            "started_at": round(self.started_at, 3),
+            "wall_seconds": round(time.time() - self.started_at, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "status": "completed" if all(task["status"] == "completed" for task in self.tasks) else "failed",
+            "tasks": self.tasks,
+        }
+
+    def write(self) -> str:
+        """
+        Writes the report atomically.
+
+        Returns:
+            str: Path of the report.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"run_{self.run_id}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+
+# The report of the running CLI, None unless the run was started with --report or --profile
+_active: Optional[RunReport] = None
+
+
+def start_run(directory: str, profile: bool = False) -> RunReport:
+    """
+    Starts recording a run report for the tasks of this process.
+
+    Args:
+        directory (str): Directory the report and profile dumps are written to.
+        profile (bool): Whether to write a cProfile dump per task.
+
+    Returns:
+        RunReport: The active report.
+    """
+    global _active
+    _active = RunReport(directory, profile)
+    return _active
+
+
+def active_report() -> Optional[RunReport]:
+    """
+    Returns the report of the running CLI.
+
+    Returns:
+        Optional[RunReport]: The active report, None if no report is recorded.
+    """
+    return _active
+
+
+def count(name: str, n: int = 1) -> None:
+    """
+    Increments a counter of the running task, if a run report is recorded.
+
+    Args:
+        name (str): Name of the counter, e.g. 'pages_fetched'.
+        n (int): Amount to add.
+    """
+    if _active is not None:
+        _active.count(name, n)
+
+
+def load_reports(directory: str) -> List[Dict[str, Any]]:
+    """
+    Loads the run reports in a directory.
+
+    Args:
+        directory (str): Directory of the reports.
+
+    Returns:
+        List[Dict[str, Any]]: The reports, oldest first.
+    """
+    reports = []
+    for path in sorted(glob.glob(os.path.join(directory, "run_*.json"))):
+        with open(path, encoding="utf-8") as f:
+            reports.append(json.load(f))
+    return reports
+
+
+def main() -> None:
+    """
+    Main function to compare the latest run report with an earlier run, task by task.
+    """
+    parser = argparse.ArgumentParser(description="Compare the latest data pipeline run with an earlier run.")
+    parser.add_argument('--dir', default=settings.reports.DIR, help='Directory of the run reports')
+    parser.add_argument('--baseline', default=None, help='Run id to compare with, by default the previous run')
+    parser.add_argument('--threshold', type=float, default=1.5, help='Slowdown against the baseline reported as a regression')
+    args = parser.parse_args()
+
+    reports = load_reports(args.dir)
+    if not reports:
+        parser.error(f"No run reports in {args.dir}.")
+
+    latest = reports[-1]
+    earlier = [report for report in reports[:-1] if args.baseline in (None, report["run_id"])]
+    baseline = earlier[-1] if earlier else None
+    baseline_tasks = {task["name"]: task for task in baseline["tasks"]} if baseline else {}
+
+    print(f"Run {latest['run_id']} ({latest['status']}, {latest['wall_seconds']:.1f}s, peak RSS {latest['peak_rss_mb']} MB)"
+          + (f" against {baseline['run_id']}" if baseline else ""))
+    for task in latest["tasks"]:
+        line = f"  {task['name']}: {task['wall_seconds']:.1f}s wall, {task['cpu_seconds']:.1f}s CPU, {task['status']}"
+        previous = baseline_tasks.get(task["name"])
+        if previous and previous["wall_seconds"]:
+            ratio = task["wall_seconds"] / previous["wall_seconds"]
+            line += f" | {ratio:.2f}x baseline" + (" REGRESSION" if ratio > args.threshold else "")
+        print(line)
+        for counter, value in sorted(task["counters"].items()):
+            before = previous["counters"].get(counter) if previous else None
+            print(f"    {counter}: {value}" + (f" (baseline {before})" if before is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
-from sqlalchemy import Column, String, ForeignKey, create_engine
+from functools import lru_cache
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKeyConstraint, DDL, create_engine, event, func, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
+from config import settings
 
 Base = declarative_base()
 
@@ -10,10 +13,16 @@ class RestaurantData(Base):
     website_url = Column(String)
     instagram_url = Column(String)
     address = Column(String)
-    meal_type = Column(String)
-    district = Column(String)
-    restaurant_type = Column(String)
-    price_level = Column(String)
+
+    # Filter columns of the search app, indexed for the filter queries
+    meal_type = Column(String, index=True)
+    district = Column(String, index=True)
+    restaurant_type = Column(String, index=True)
+    price_level = Column(String, index=True)
+
+    # City partition key, rows of databases that predate it belong to the default city.
+    # A chain listed in several cities has a row in each of them.
+    city = Column(String, primary_key=True, index=True, server_default=settings.DEFAULT_CITY)
     
     # One-to-One Relationship with RestaurantURL
     restaurant_url = relationship("RestaurantURL", back_populates="restaurant_data", uselist=False)
@@ -26,18 +35,25 @@ class RestaurantData(Base):
 
 class RestaurantURL(Base):
     __tablename__ = "restauranturl"
+    __table_args__ = (ForeignKeyConstraint(['name', 'city'], ['restaurantdata.name', 'restaurantdata.city']),)
 
-    name = Column(String, ForeignKey('restaurantdata.name'), primary_key=True)
+    name = Column(String, primary_key=True)
+    city = Column(String, primary_key=True, index=True, server_default=settings.DEFAULT_CITY)
     content_url = Column(String)
     image_url = Column(String)
 
+    # File name of the local thumbnail of image_url, see data/thumbnails.py
+    thumbnail = Column(String)
+
     # Back reference to RestaurantData
     restaurant_data = relationship("RestaurantData", back_populates="restaurant_url")
   
 class RestaurantContent(Base):
     __tablename__ = "restaurantcontent"
+    __table_args__ = (ForeignKeyConstraint(['name', 'city'], ['restaurantdata.name', 'restaurantdata.city']),)
 
-    name = Column(String, ForeignKey('restaurantdata.name'), primary_key=True)  # ForeignKey to RestaurantData
+    name = Column(String, primary_key=True)
+    city = Column(String, primary_key=True, server_default=settings.DEFAULT_CITY)
     source = Column(String, primary_key=True)
     content = Column(String)
 
@@ -46,13 +62,164 @@ class RestaurantContent(Base):
 
 class RestaurantSummary(Base):
     __tablename__ = "restaurantsummary"
+    __table_args__ = (ForeignKeyConstraint(['name', 'city'], ['restaurantdata.name', 'restaurantdata.city']),)
 
-    name = Column(String, ForeignKey('restaurantdata.name'), primary_key=True)  # ForeignKey to RestaurantData
+    name = Column(String, primary_key=True)
+    city = Column(String, primary_key=True, server_default=settings.DEFAULT_CITY)
     summary = Column(String)
 
     # Back reference to RestaurantData
     restaurant_data = relationship("RestaurantData", back_populates="summary")
 
-engine = create_engine('sqlite:///restaurants.db')
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
+class DataVersion(Base):
+    __tablename__ = "dataversion"
+
+    # Single row that is bumped whenever ingestion changes the restaurant data
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+# Full-text index over summaries and content, maintained by the ingestion steps in crud.py
+FTS_TABLE = "restaurantfts"
+FTS_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name UNINDEXED, city UNINDEXED, source UNINDEXED, kind UNINDEXED, text, "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+
+event.listen(Base.metadata, "after_create", DDL(FTS_CREATE).execute_if(dialect="sqlite"))
+event.listen(
+    Base.metadata,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite")
+)
+
+def configure_connection(dbapi_connection, connection_record) -> None:
+    """
+    Puts every SQLite connection in WAL mode, so readers never block on a writer and a writer
+    never blocks readers, and lets writers wait for each other instead of failing.
+
+    Args:
+        dbapi_connection: The new sqlite3 connection.
+        connection_record: SQLAlchemy's record of the pooled connection (unused).
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.database.BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def add_missing_columns(database_engine: Engine) -> None:
+    """
+    Adds columns that were added to the models after a table was created. SQLite fills the
+    existing rows with the server default of the column.
+
+    Args:
+        database_engine (Engine): The SQLAlchemy engine.
+    """
+    inspector = inspect(database_engine)
+    with database_engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=database_engine.dialect)
+                default = f" DEFAULT '{column.server_default.arg}'" if column.server_default is not None else ""
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}"))
+
+def migrate_city_keys(database_engine: Engine) -> None:
+    """
+    Rebuilds the restaurant tables and the full-text index of a database that predates the
+    (name, city) keys, whose rows were keyed by name alone. Content and summaries get the city
+    of their restaurant. SQLite cannot change a primary key, so every table is copied into a
+    new table in one transaction.
+
+    Args:
+        database_engine (Engine): The SQLAlchemy engine.
+    """
+    inspector = inspect(database_engine)
+    if inspector.get_pk_constraint(RestaurantData.__tablename__)['constrained_columns'] != ['name']:
+        return
+
+    tables = [RestaurantData.__table__, RestaurantURL.__table__, RestaurantContent.__table__, RestaurantSummary.__table__]
+    old_columns = {table.name: {column['name'] for column in inspector.get_columns(table.name)} for table in tables}
+    restaurant_city = (
+        "COALESCE((SELECT city FROM restaurantdata_old WHERE name = old.name), "
+        "(SELECT city FROM restauranturl_old WHERE name = old.name), :default_city)"
+    )
+    with database_engine.begin() as connection:
+        for table in tables:
+            # The indexes keep their names when their table is renamed, and the new table needs them
+            for index in table.indexes:
+                connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            connection.execute(text(f"ALTER TABLE {table.name} RENAME TO {table.name}_old"))
+        connection.execute(text(f"ALTER TABLE {FTS_TABLE} RENAME TO {FTS_TABLE}_old"))
+
+        for table in tables:
+            table.create(connection)
+            columns = [column.name for column in table.columns]
+            values = [
+                restaurant_city if column == 'city' and table.name in ('restaurantcontent', 'restaurantsummary')
+                else f"old.{column}" if column in old_columns[table.name] else "NULL"
+                for column in columns
+            ]
+            connection.execute(
+                text(f"INSERT INTO {table.name} ({', '.join(columns)}) SELECT {', '.join(values)} FROM {table.name}_old AS old"),
+                {'default_city': settings.DEFAULT_CITY}
+            )
+        connection.execute(text(FTS_CREATE))
+        connection.execute(
+            text(f"INSERT INTO {FTS_TABLE} (name, city, source, kind, text) SELECT name, {restaurant_city}, source, kind, text FROM {FTS_TABLE}_old AS old"),
+            {'default_city': settings.DEFAULT_CITY}
+        )
+
+        for table in [FTS_TABLE] + [table.name for table in reversed(tables)]:
+            connection.execute(text(f"DROP TABLE {table}_old"))
+
+def create_database_engine(path: str) -> Engine:
+    """
+    Creates an engine for a restaurant database file, creating missing tables, columns and indexes.
+
+    Args:
+        path (str): Path of the SQLite database file.
+
+    Returns:
+        Engine: The SQLAlchemy engine.
+    """
+    database_engine = create_engine(f'sqlite:///{path}')
+    event.listen(database_engine, "connect", configure_connection)
+    Base.metadata.create_all(database_engine)
+    add_missing_columns(database_engine)
+    migrate_city_keys(database_engine)
+
+    # create_all skips existing tables, so columns and indexes added later are created separately.
+    # The foreign key columns are the first primary key column of their table and need no extra index.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(database_engine, checkfirst=True)
+    return database_engine
+
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """
+    Opens the database configured in settings.database once per process.
+
+    Returns:
+        Engine: The SQLAlchemy engine.
+    """
+    return create_database_engine(settings.database.PATH)
+
+class LazySessionmaker(sessionmaker):
+    """
+    A session factory that opens the configured database when the first session is created
+    instead of on import, unless it was configured with another engine.
+    """
+
+    def __call__(self, **local_kw):
+        if 'bind' not in local_kw and self.kw.get('bind') is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+Session = LazySessionmaker()
@@ -0,0 +1,88 @@
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from config import settings
+from .scheme import create_database_engine
+
+logger = logging.getLogger(__name__)
+
+
+def copy_database(source_path: str, target_path: str) -> None:
+    """
+    Copies a SQLite database into another one with the SQLite backup API.
+
+    The copy is written as a single transaction on the target, so in WAL mode readers of the
+    target keep reading the previous data until it is committed and then see all of the new data.
+
+    Args:
+        source_path (str): Path of the database to copy.
+        target_path (str): Path of the database to overwrite.
+    """
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path, timeout=settings.database.BUSY_TIMEOUT_MS / 1000)
+    try:
+        target.execute("PRAGMA journal_mode=WAL")
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def remove_database(path: str) -> None:
+    """
+    Removes a SQLite database file together with its WAL and shared-memory files.
+
+    Args:
+        path (str): Path of the database file.
+    """
+    for suffix in ["", "-wal", "-shm"]:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+@contextmanager
+def staging_database(
+    live_path: Optional[str] = None,
+    staging_path: Optional[str] = None
+) -> Iterator[Tuple[Session, Engine]]:
+    """
+    Runs ingestion against a staging copy of the live database and publishes it atomically.
+
+    The live database is copied to the staging file, the caller writes to the staging copy and,
+    if no exception was raised, the staging copy is copied back into the live database in one
+    transaction. Serving processes never see half-written tables and pick up the new data through
+    the data version. If an exception was raised, the staging copy is discarded.
+
+    Args:
+        live_path (Optional[str]): Path of the live database, defaults to settings.database.PATH.
+        staging_path (Optional[str]): Path of the staging database, defaults to settings.database.STAGING_PATH.
+
+    Yields:
+        Tuple[Session, Engine]: A session and an engine bound to the staging database.
+    """
+    live_path = live_path or settings.database.PATH
+    staging_path = staging_path or settings.database.STAGING_PATH
+
+    remove_database(staging_path)
+    if os.path.exists(live_path):
+        copy_database(live_path, staging_path)
+
+    staging_engine = create_database_engine(staging_path)
+    session = Session(bind=staging_engine)
+    try:
+        yield session, staging_engine
+        session.close()
+        staging_engine.dispose()
+
+        start = time.perf_counter()
+        copy_database(staging_path, live_path)
+        logger.info(f"Published {staging_path} to {live_path} in {time.perf_counter() - start:.2f}s.")
+    finally:
+        session.close()
+        staging_engine.dispose()
+        remove_database(staging_path)
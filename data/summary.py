@@ -5,10 +5,13 @@ from openai import RateLimitError
 import os
 import time
 from config import settings
-from typing import Iterable, List
+from .run_report import count
+from typing import Iterable, Iterator, List, Tuple, TypeVar
 
 os.environ['OPENAI_API_KEY'] = settings.OPENAI_API_KEY
 
+K = TypeVar("K")
+
 def splicegen(maxchars: int, texts: List[str]) -> Iterable[List[int]]:
     """
     Splits a list of strings into sublists where the cumulative character length
@@ -21,20 +24,36 @@ def splicegen(maxchars: int, texts: List[str]) -> Iterable[List[int]]:
     Yields:
         List[int]: A list of indices representing each chunk within texts.
     """
-    current_length = 0  
-    index_chunk = []  
-    
-    for i, item in enumerate(texts):
-        current_length += len(item)
-        if current_length < maxchars:
-            index_chunk.append(i)
+    for batch in batch_by_length(maxchars, enumerate(texts)):
+        yield [i for i, _ in batch]
+
+def batch_by_length(maxchars: int, items: Iterable[Tuple[K, str]]) -> Iterator[List[Tuple[K, str]]]:
+    """
+    Groups a stream of keyed texts into batches whose cumulative character length does not
+    exceed maxchars, without materializing the stream. A text longer than maxchars forms a
+    batch on its own.
+
+    Args:
+        maxchars (int): Maximum number of characters allowed per batch.
+        items (Iterable[Tuple[K, str]]): The (key, text) pairs to batch, e.g. restaurant names and their content.
+
+    Yields:
+        List[Tuple[K, str]]: A batch of (key, text) pairs.
+    """
+    current_length = 0
+    batch = []
+
+    for key, text in items:
+        current_length += len(text)
+        if current_length < maxchars or not batch:
+            batch.append((key, text))
         else:
-            yield index_chunk
-            index_chunk = [i]
-            current_length = len(item)
-    
-    if index_chunk:
-        yield index_chunk
+            yield batch
+            batch = [(key, text)]
+            current_length = len(text)
+
+    if batch:
+        yield batch
 
 def generate_summaries(texts: List[str], max_retries: int = 6, delay: int = 10) -> List[str]:
     """
@@ -56,12 +75,18 @@ def generate_summaries(texts: List[str], max_retries: int = 6, delay: int = 10)
         [("system", settings.PROMPT_SUMMARY_TEMPLATE), ("user", "{content}")]
     )
     model = ChatOpenAI(model=settings.OPENAI_ENGINE, temperature=0)
-    chain = prompt_template | model | StrOutputParser()
+    chain = prompt_template | model
 
     attempt = 0
     while attempt < max_retries:
         try:
-            return chain.batch(texts)
+            messages = chain.batch(texts)
+            # Token usage is recorded in the run report
+            for message in messages:
+                usage = message.usage_metadata or {}
+                count("prompt_tokens", usage.get("input_tokens", 0))
+                count("completion_tokens", usage.get("output_tokens", 0))
+            return [StrOutputParser().invoke(message) for message in messages]
 
         except RateLimitError as e:
             attempt += 1
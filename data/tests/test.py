@@ -22,7 +22,7 @@ def setup_database() -> Generator[None, None, None]:
     yield
     Base.metadata.drop_all(engine)
 
-@patch.object(settings, 'RESTAURANT_URL', new="https://www.debuik.nl/rotterdam/zoek/restaurant/-1-stad-2-Rotterdam-1-verder-2-All-you-can-eat")
+@patch.dict(settings.cities, {'rotterdam': "https://www.debuik.nl/rotterdam/zoek/restaurant/-1-stad-2-Rotterdam-1-verder-2-All-you-can-eat"}, clear=True)
 def test_add_restaurant_urls(setup_database: None) -> None:
     """
     Tests the add_restaurant_urls function to ensure it correctly adds restaurant URLs to the database.
@@ -54,7 +54,7 @@ def test_add_restaurant_urls(setup_database: None) -> None:
     
     session.close()
 
-@patch.object(settings, 'RESTAURANT_URL', new="https://www.debuik.nl/rotterdam/zoek/restaurant/-1-stad-2-Rotterdam-1-verder-2-All-you-can-eat")
+@patch.dict(settings.cities, {'rotterdam': "https://www.debuik.nl/rotterdam/zoek/restaurant/-1-stad-2-Rotterdam-1-verder-2-All-you-can-eat"}, clear=True)
 def test_add_restaurants(setup_database: None) -> None:
     """
     Tests the add_restaurants function to ensure it adds restaurant data and content correctly.
@@ -113,7 +113,7 @@ def test_add_restaurants(setup_database: None) -> None:
 
     session.close()
 
-@patch.object(settings, 'RESTAURANT_URL', new="https://www.debuik.nl/rotterdam/zoek/restaurant/-1-stad-2-Rotterdam-1-verder-2-All-you-can-eat")
+@patch.dict(settings.cities, {'rotterdam': "https://www.debuik.nl/rotterdam/zoek/restaurant/-1-stad-2-Rotterdam-1-verder-2-All-you-can-eat"}, clear=True)
 def test_add_summaries(setup_database: None) -> None:
     """
     Tests the add_summaries function to ensure it correctly generates and adds summaries for each restaurant.
@@ -0,0 +1,138 @@
+import sqlite3
+from pathlib import Path
+from typing import Dict, List
+import pytest
+from sqlalchemy.orm import Session
+from config import settings
+from data import crud
+from data.crud import add_restaurant_urls, add_restaurants, iter_unsummarized_content, search_fts
+from data.scheme import RestaurantContent, RestaurantData, RestaurantSummary, RestaurantURL, create_database_engine
+
+
+class FakeListing:
+    """
+    A restaurant on the listing page of a city.
+    """
+
+    def __init__(self, name: str, city: str) -> None:
+        """
+        Initializes the listing.
+
+        Args:
+            name (str): Name of the restaurant.
+            city (str): Key of the city it is listed in.
+        """
+        self.name = name
+        self.city = city
+
+    def is_open(self) -> bool:
+        """Returns whether the restaurant is open."""
+        return True
+
+    def get_dict(self) -> Dict[str, str]:
+        """Returns the URLs of the restaurant."""
+        return {"name": self.name, "content_url": f"https://example.com/{self.city}/{self.name}", "image_url": None}
+
+
+def fake_crawl_restaurants(restaurants: List[tuple], city: str) -> tuple:
+    """
+    Returns the data and the page content of the given restaurants without crawling.
+
+    Args:
+        restaurants (List[tuple]): Name and content URL of each restaurant.
+        city (str): Key of the city the restaurants are in.
+
+    Returns:
+        tuple: The restaurants and their content.
+    """
+    return (
+        [RestaurantData(name=name, city=city, address=f"Straat 1, {city}") for name, _ in restaurants],
+        [RestaurantContent(name=name, city=city, source=url, content=f"Pasta in {city}") for name, url in restaurants],
+    )
+
+
+def test_chain_in_two_cities_is_in_both_partitions(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that a chain listed in two cities gets its own restaurant, content, summary and
+    full-text entries in each city, and that crawling again adds nothing.
+
+    Args:
+        tmp_path (Path): Temporary directory for the database.
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the crawlers and the configured cities.
+    """
+    from data import parser
+
+    listings = {"rotterdam": ["Loetje", "Rozey"], "amsterdam": ["Loetje"]}
+    monkeypatch.setitem(settings.cities, "amsterdam", "https://example.com/amsterdam")
+    monkeypatch.setattr(parser.ParserURL, "from_url", lambda url: [
+        FakeListing(name, city) for city, names in listings.items() if settings.cities[city] == url for name in names
+    ])
+    monkeypatch.setattr(crud, "crawl_restaurants", fake_crawl_restaurants)
+
+    engine = create_database_engine(str(tmp_path / "restaurants.db"))
+    with Session(bind=engine) as session:
+        for _ in range(2):
+            add_restaurant_urls(session, ["rotterdam", "amsterdam"])
+            add_restaurants(session, ["rotterdam", "amsterdam"])
+
+        assert sorted(session.query(RestaurantURL.city, RestaurantURL.name).all()) == [
+            ("amsterdam", "Loetje"), ("rotterdam", "Loetje"), ("rotterdam", "Rozey")
+        ]
+        assert {row.city: row.address for row in session.query(RestaurantData).filter_by(name="Loetje")} == {
+            "amsterdam": "Straat 1, amsterdam", "rotterdam": "Straat 1, rotterdam"
+        }
+
+        assert [key for key, _ in iter_unsummarized_content(engine)] == [
+            ("Loetje", "amsterdam"), ("Loetje", "rotterdam"), ("Rozey", "rotterdam")
+        ]
+        session.add(RestaurantSummary(name="Loetje", city="rotterdam", summary="Biefstuk"))
+        session.commit()
+        assert [key for key, _ in iter_unsummarized_content(engine)] == [("Loetje", "amsterdam"), ("Rozey", "rotterdam")]
+
+        assert search_fts(session, "pasta", city="amsterdam") == ["Loetje"]
+        assert sorted(search_fts(session, "pasta", city="rotterdam")) == ["Loetje", "Rozey"]
+    engine.dispose()
+
+
+def test_legacy_database_is_keyed_by_city(tmp_path: Path) -> None:
+    """
+    Tests that a database keyed by name alone is migrated to (name, city) keys, with the content,
+    summaries and full-text entries of each restaurant in the city of the restaurant.
+
+    Args:
+        tmp_path (Path): Temporary directory for the database.
+    """
+    path = str(tmp_path / "restaurants.db")
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE restaurantdata (name VARCHAR PRIMARY KEY, address VARCHAR, city VARCHAR DEFAULT 'rotterdam');
+        CREATE TABLE restauranturl (name VARCHAR PRIMARY KEY REFERENCES restaurantdata (name), content_url VARCHAR, city VARCHAR DEFAULT 'rotterdam');
+        CREATE TABLE restaurantcontent (name VARCHAR REFERENCES restaurantdata (name), source VARCHAR, content VARCHAR, PRIMARY KEY (name, source));
+        CREATE TABLE restaurantsummary (name VARCHAR PRIMARY KEY REFERENCES restaurantdata (name), summary VARCHAR);
+        CREATE INDEX ix_restaurantdata_city ON restaurantdata (city);
+        CREATE VIRTUAL TABLE restaurantfts USING fts5(name UNINDEXED, source UNINDEXED, kind UNINDEXED, text);
+        INSERT INTO restaurantdata VALUES ('Rozey', 'Maasboulevard 1', 'rotterdam'), ('Loetje', 'Stadhouderskade 1', 'amsterdam');
+        INSERT INTO restauranturl VALUES ('Rozey', 'https://example.com/rozey', 'rotterdam'), ('Loetje', 'https://example.com/loetje', 'amsterdam');
+        INSERT INTO restaurantcontent VALUES ('Loetje', 'https://example.com/loetje', 'Biefstuk');
+        INSERT INTO restaurantsummary VALUES ('Loetje', 'Biefstuk aan het water');
+        INSERT INTO restaurantfts VALUES ('Loetje', NULL, 'summary', 'Biefstuk aan het water');
+    """)
+    connection.close()
+
+    engine = create_database_engine(path)
+    with Session(bind=engine) as session:
+        assert sorted(session.query(RestaurantData.city, RestaurantData.name, RestaurantData.address).all()) == [
+            ("amsterdam", "Loetje", "Stadhouderskade 1"), ("rotterdam", "Rozey", "Maasboulevard 1")
+        ]
+        assert session.query(RestaurantContent.city, RestaurantContent.content).all() == [("amsterdam", "Biefstuk")]
+        assert session.get(RestaurantSummary, ("Loetje", "amsterdam")).summary == "Biefstuk aan het water"
+        assert session.get(RestaurantData, ("Rozey", "rotterdam")).restaurant_url.content_url == "https://example.com/rozey"
+        assert search_fts(session, "biefstuk", city="amsterdam") == ["Loetje"]
+        assert search_fts(session, "biefstuk", city="rotterdam") == []
+    engine.dispose()
+
+    # A migrated database is left as it is
+    engine = create_database_engine(path)
+    with Session(bind=engine) as session:
+        assert session.query(RestaurantData).count() == 2
+    engine.dispose()
@@ -0,0 +1,120 @@
+import json
+import time
+from pathlib import Path
+import pytest
+from data.index_versions import IndexPointer, build_version
+
+
+def test_pointer_without_file_uses_unversioned_collection(tmp_path: Path) -> None:
+    """
+    Tests that an index built before versioning stays active until its first versioned rebuild.
+
+    Args:
+        tmp_path (Path): Temporary directory for the pointer file.
+    """
+    pointer = IndexPointer(str(tmp_path), "summaries")
+
+    assert pointer.active() == "summaries"
+    assert pointer.read()["versions"] == []
+    assert pointer.expired(0) == []
+
+
+def test_publish_and_rollback(tmp_path: Path) -> None:
+    """
+    Tests that publishing keeps the previous version as the rollback target, including the
+    unversioned collection, and that a rollback swaps the active and previous versions.
+
+    Args:
+        tmp_path (Path): Temporary directory for the pointer file.
+    """
+    pointer = IndexPointer(str(tmp_path), "summaries")
+
+    pointer.publish("summaries_v1")
+    state = pointer.read()
+    assert state["active"] == "summaries_v1"
+    assert [version["name"] for version in state["versions"]] == ["summaries_v1", "summaries"]
+    assert "retired_at" not in state["versions"][0]
+    assert "retired_at" in state["versions"][1]
+
+    pointer.publish("summaries_v2")
+    assert pointer.active() == "summaries_v2"
+    assert [version["name"] for version in pointer.read()["versions"]] == ["summaries_v2", "summaries_v1", "summaries"]
+
+    assert pointer.rollback() == "summaries_v1"
+    state = pointer.read()
+    assert state["active"] == "summaries_v1"
+    assert [version["name"] for version in state["versions"]] == ["summaries_v1", "summaries_v2", "summaries"]
+    assert "retired_at" not in state["versions"][0]
+    assert "retired_at" in state["versions"][1]
+
+    # The pointer is written as a whole and read back by a new process
+    with open(tmp_path / "summaries.pointer.json", encoding="utf-8") as f:
+        assert json.load(f)["active"] == "summaries_v1"
+    assert IndexPointer(str(tmp_path), "summaries").active() == "summaries_v1"
+
+
+def test_rollback_without_previous_version(tmp_path: Path) -> None:
+    """
+    Tests that a rollback fails when there is no previous version.
+
+    Args:
+        tmp_path (Path): Temporary directory for the pointer file.
+    """
+    pointer = IndexPointer(str(tmp_path), "summaries")
+    with pytest.raises(ValueError):
+        pointer.rollback()
+
+    pointer._write({"active": "summaries_v1", "versions": [{"name": "summaries_v1", "created_at": 0}]})
+    with pytest.raises(ValueError):
+        pointer.rollback()
+
+
+def test_expired_and_forget(tmp_path: Path) -> None:
+    """
+    Tests that only retired versions older than the retention period expire, never the active
+    version or the rollback target, and that forgotten versions are removed from the pointer.
+
+    Args:
+        tmp_path (Path): Temporary directory for the pointer file.
+    """
+    pointer = IndexPointer(str(tmp_path), "summaries")
+    for name in ["summaries_v1", "summaries_v2", "summaries_v3"]:
+        pointer.publish(name)
+
+    assert pointer.expired(3600) == []
+    # With a negative retention every retired version is past it
+    assert pointer.expired(-1) == ["summaries_v1", "summaries"]
+
+    pointer.forget(["summaries_v1", "summaries"])
+    state = pointer.read()
+    assert state["active"] == "summaries_v3"
+    assert [version["name"] for version in state["versions"]] == ["summaries_v3", "summaries_v2"]
+
+
+def test_build_version(tmp_path: Path) -> None:
+    """
+    Tests that a version failing validation is dropped while the active version stays, and that
+    a valid version is activated and expired versions are dropped.
+
+    Args:
+        tmp_path (Path): Temporary directory for the pointer file.
+    """
+    pointer = IndexPointer(str(tmp_path), "summaries")
+    built, dropped = [], []
+
+    def invalid(name: str) -> None:
+        raise ValueError(f"{name} is empty")
+
+    with pytest.raises(ValueError):
+        build_version(pointer, built.append, invalid, dropped.append, retention_seconds=3600)
+    assert pointer.active() == "summaries"
+    assert dropped == built
+
+    first = build_version(pointer, built.append, lambda name: None, dropped.append, retention_seconds=-1)
+    # Version names have millisecond resolution
+    time.sleep(0.002)
+    second = build_version(pointer, built.append, lambda name: None, dropped.append, retention_seconds=-1)
+    assert pointer.active() == second
+    # The unversioned collection expires once it is older than the rollback target
+    assert dropped[-1] == "summaries"
+    assert [version["name"] for version in pointer.read()["versions"]] == [second, first]
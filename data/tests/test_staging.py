@@ -0,0 +1,86 @@
+import sqlite3
+from pathlib import Path
+import pytest
+from sqlalchemy.orm import Session
+from data import crud
+from data.crud import bump_data_version, clear_table, get_data_version, rebuild_fts_index
+from data.scheme import RestaurantData, create_database_engine
+from data.staging import staging_database
+
+
+def test_staging_database_publishes_atomically(tmp_path: Path) -> None:
+    """
+    Tests that ingestion into the staging database is invisible to readers of the live database
+    until it is published, that a reader with an open transaction is not blocked by publishing,
+    and that the published data and data version are visible afterwards.
+
+    Args:
+        tmp_path (Path): Temporary directory for the live and staging databases.
+    """
+    live_path = str(tmp_path / "live.db")
+    staging_path = str(tmp_path / "staging.db")
+
+    live_engine = create_database_engine(live_path)
+    with Session(bind=live_engine) as session:
+        session.add(RestaurantData(name="Oud", district="Centrum"))
+        session.commit()
+        bump_data_version(session)
+
+    # A serving process in the middle of a read
+    reader = sqlite3.connect(live_path)
+    reader.execute("BEGIN")
+    assert reader.execute("SELECT COUNT(*) FROM restaurantdata").fetchone()[0] == 1
+
+    with staging_database(live_path, staging_path) as (session, staging_engine):
+        clear_table(RestaurantData.__table__, staging_engine)
+        session.add_all([RestaurantData(name="Nieuw", district="Noord"), RestaurantData(name="Ander", district="Zuid")])
+        session.commit()
+        bump_data_version(session)
+
+        with Session(bind=live_engine) as live_session:
+            assert live_session.query(RestaurantData).count() == 1
+            assert get_data_version(live_session) == 1
+
+    # The open read transaction keeps its snapshot
+    assert reader.execute("SELECT COUNT(*) FROM restaurantdata").fetchone()[0] == 1
+    reader.close()
+
+    with Session(bind=live_engine) as live_session:
+        assert {name for name, in live_session.query(RestaurantData.name)} == {"Nieuw", "Ander"}
+        assert get_data_version(live_session) == 2
+
+    assert not Path(staging_path).exists()
+    live_engine.dispose()
+
+
+def test_failed_step_discards_staging_database(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that an ingestion step that fails after earlier steps committed to the staging database
+    stops the run, and that nothing of the run is published.
+
+    Args:
+        tmp_path (Path): Temporary directory for the live and staging databases.
+        monkeypatch (pytest.MonkeyPatch): Fixture to make the full-text indexing fail.
+    """
+    live_path = str(tmp_path / "live.db")
+    staging_path = str(tmp_path / "staging.db")
+
+    live_engine = create_database_engine(live_path)
+    with Session(bind=live_engine) as session:
+        session.add(RestaurantData(name="Oud", district="Centrum"))
+        session.commit()
+
+    def fail(session: Session, documents: list) -> None:
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(crud, "index_documents", fail)
+    with pytest.raises(RuntimeError):
+        with staging_database(live_path, staging_path) as (session, staging_engine):
+            session.add(RestaurantData(name="Nieuw", district="Noord"))
+            session.commit()
+            rebuild_fts_index(session)
+
+    with Session(bind=live_engine) as live_session:
+        assert {name for name, in live_session.query(RestaurantData.name)} == {"Oud"}
+    assert not Path(staging_path).exists()
+    live_engine.dispose()
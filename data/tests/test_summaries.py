@@ -0,0 +1,56 @@
+from pathlib import Path
+from typing import List
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from config import settings
+from data import summary
+from data.crud import add_summaries
+from data.scheme import FTS_TABLE, RestaurantContent, RestaurantData, RestaurantSummary, create_database_engine
+
+
+def test_add_summaries_skips_summarized_and_keeps_committed_batches(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that restaurants of a city that already have a summary are not summarized again, also
+    when the same chain has no summary in another city, and that a failing batch keeps the
+    summaries and full-text entries of the batches committed before it.
+
+    Args:
+        tmp_path (Path): Temporary directory for the database.
+        monkeypatch (pytest.MonkeyPatch): Fixture to replace the summarizer and the batch size.
+    """
+    summarized: List[List[str]] = []
+
+    def generate_summaries(texts: List[str]) -> List[str]:
+        if len(summarized) == 2:
+            raise RuntimeError("rate limited")
+        summarized.append(texts)
+        return [f"Samenvatting van {text}" for text in texts]
+
+    monkeypatch.setattr(summary, "generate_summaries", generate_summaries)
+    # Every restaurant's content is a batch of its own
+    monkeypatch.setattr(settings, "MAX_TOKENS", 10)
+
+    engine = create_database_engine(str(tmp_path / "restaurants.db"))
+    with Session(bind=engine) as session:
+        restaurants = [("Bistro", "rotterdam"), ("Loetje", "amsterdam"), ("Loetje", "rotterdam"), ("Rozey", "rotterdam")]
+        session.add_all([RestaurantData(name=name, city=city) for name, city in restaurants])
+        session.add_all([
+            RestaurantContent(name=name, city=city, source=f"https://example.com/{city}/{name}", content=f"{name} in {city}")
+            for name, city in restaurants
+        ])
+        session.add(RestaurantSummary(name="Loetje", city="rotterdam", summary="Al samengevat"))
+        session.commit()
+
+        with pytest.raises(RuntimeError):
+            add_summaries(session, engine)
+
+        assert summarized == [["Bistro in rotterdam"], ["Loetje in amsterdam"]]
+        assert sorted(session.query(RestaurantSummary.name, RestaurantSummary.city, RestaurantSummary.summary).all()) == [
+            ("Bistro", "rotterdam", "Samenvatting van Bistro in rotterdam"),
+            ("Loetje", "amsterdam", "Samenvatting van Loetje in amsterdam"),
+            ("Loetje", "rotterdam", "Al samengevat"),
+        ]
+        indexed = session.execute(text(f"SELECT name, city FROM {FTS_TABLE} WHERE kind = 'summary' ORDER BY name")).all()
+        assert [tuple(row) for row in indexed] == [("Bistro", "rotterdam"), ("Loetje", "amsterdam")]
+    engine.dispose()
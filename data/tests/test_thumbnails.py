@@ -0,0 +1,85 @@
+import io
+import os
+from pathlib import Path
+import pytest
+from PIL import Image
+from config import settings
+from data.crud import image_url
+from data.scheme import RestaurantURL
+from data.thumbnails import download_image, make_thumbnail, store_thumbnail, thumbnail_path
+
+
+def transparent_logo() -> bytes:
+    """
+    Builds a PNG logo with a transparent background around an opaque red square.
+
+    Returns:
+        bytes: The PNG file.
+    """
+    logo = Image.new("RGBA", (100, 100), (0, 0, 0, 0))
+    logo.paste((255, 0, 0, 255), (40, 40, 60, 60))
+    output = io.BytesIO()
+    logo.save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_transparency_is_kept_or_made_white(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that a transparent logo stays transparent in a format with an alpha channel and gets a
+    white instead of a black background in a format without one.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): Fixture to change the thumbnail format.
+    """
+    with Image.open(io.BytesIO(make_thumbnail(transparent_logo()))) as thumbnail:
+        assert thumbnail.mode == "RGBA"
+        assert thumbnail.getpixel((0, 0))[3] == 0
+
+    monkeypatch.setattr(settings.thumbnails, "FORMAT", "JPEG")
+    with Image.open(io.BytesIO(make_thumbnail(transparent_logo()))) as thumbnail:
+        assert thumbnail.mode == "RGB"
+        assert all(channel > 245 for channel in thumbnail.getpixel((0, 0)))
+        assert thumbnail.getpixel((50, 50))[0] > 200 and thumbnail.getpixel((50, 50))[1] < 60
+
+
+@pytest.mark.parametrize("url", ["file:///etc/passwd", "ftp://example.com/logo.png"])
+def test_download_rejects_other_schemes(url: str) -> None:
+    """
+    Tests that image URLs with a scheme other than http or https are not downloaded.
+
+    Args:
+        url (str): The image URL.
+    """
+    with pytest.raises(ValueError):
+        download_image(url)
+
+
+def test_store_is_content_addressed_and_idempotent(tmp_path: Path) -> None:
+    """
+    Tests that a thumbnail is stored under the hash of its content, and that storing it again
+    returns the same name without rewriting the file.
+
+    Args:
+        tmp_path (Path): Temporary directory for the store.
+    """
+    name = store_thumbnail(b"thumbnail", str(tmp_path))
+    path = thumbnail_path(name, str(tmp_path))
+    assert name.endswith(".webp") and Path(path).parent.name == name[:2]
+
+    os.utime(path, (0, 0))
+    assert store_thumbnail(b"thumbnail", str(tmp_path)) == name
+    assert os.path.getmtime(path) == 0
+    assert store_thumbnail(b"other thumbnail", str(tmp_path)) != name
+    assert not [entry for entry in Path(path).parent.iterdir() if entry.suffix == ".tmp"]
+
+
+def test_image_url_falls_back_to_the_original() -> None:
+    """
+    Tests that the local thumbnail is served when there is one, and the original image otherwise.
+    """
+    original = "https://www.debuik.nl/fp/logo"
+    assert image_url(None) is None
+    assert image_url(RestaurantURL(name="Rozey", image_url=original)) == original
+    assert image_url(RestaurantURL(name="Rozey", image_url=original, thumbnail="ab.webp")) == (
+        f"{settings.thumbnails.URL_PREFIX}/ab.webp"
+    )
@@ -0,0 +1,117 @@
+import hashlib
+import io
+import os
+import urllib.request
+from urllib.parse import urljoin, urlparse
+from config import settings
+
+# Thumbnails are named by the hash of their content and the file extension of the format
+EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg", "PNG": "png"}
+# Formats that keep transparency, other formats get a white background
+ALPHA_FORMATS = {"WEBP", "PNG"}
+
+
+def thumbnail_path(name: str, directory: str | None = None) -> str:
+    """
+    Returns the path of a thumbnail in the content-addressed store. Files are sharded by the first
+    two characters of their hash, so no directory holds more than a fraction of the thumbnails.
+
+    Args:
+        name (str): File name of the thumbnail, its content hash and extension.
+        directory (str | None): Root of the store, by default settings.thumbnails.DIR.
+
+    Returns:
+        str: Path of the thumbnail file.
+    """
+    return os.path.join(directory or settings.thumbnails.DIR, name[:2], name)
+
+
+def download_image(url: str) -> bytes:
+    """
+    Downloads an image from the source site.
+
+    Args:
+        url (str): URL of the image, absolute or relative to settings.BASE_URL.
+
+    Returns:
+        bytes: The image file.
+
+    Raises:
+        ValueError: If the URL is not an http or https URL.
+    """
+    url = urljoin(settings.BASE_URL, url)
+    if urlparse(url).scheme not in ("http", "https"):
+        raise ValueError(f"Refusing to download {url}, only http and https images are downloaded.")
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+    with urllib.request.urlopen(request, timeout=settings.thumbnails.DOWNLOAD_TIMEOUT) as response:
+        return response.read()
+
+
+def make_thumbnail(image: bytes) -> bytes:
+    """
+    Resizes an image to fit settings.thumbnails.MAX_WIDTH x MAX_HEIGHT, keeping its aspect ratio,
+    and compresses it in settings.thumbnails.FORMAT with QUALITY. Transparent images stay
+    transparent in formats that support it and get a white background in other formats.
+
+    Args:
+        image (bytes): The original image file.
+
+    Returns:
+        bytes: The thumbnail file.
+    """
+    # Pillow is only needed by the ingestion step
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image)) as original:
+        original.thumbnail((settings.thumbnails.MAX_WIDTH, settings.thumbnails.MAX_HEIGHT))
+        if "A" in original.getbands() or "transparency" in original.info:
+            thumbnail = original.convert("RGBA")
+            if settings.thumbnails.FORMAT not in ALPHA_FORMATS:
+                background = Image.new("RGB", thumbnail.size, "white")
+                background.paste(thumbnail, mask=thumbnail.getchannel("A"))
+                thumbnail = background
+        else:
+            thumbnail = original.convert("RGB")
+
+    output = io.BytesIO()
+    thumbnail.save(output, format=settings.thumbnails.FORMAT, quality=settings.thumbnails.QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def store_thumbnail(thumbnail: bytes, directory: str | None = None) -> str:
+    """
+    Writes a thumbnail to the content-addressed store. Identical thumbnails are stored once, and an
+    existing file is never rewritten, so a serving app can cache it forever.
+
+    Args:
+        thumbnail (bytes): The thumbnail file.
+        directory (str | None): Root of the store, by default settings.thumbnails.DIR.
+
+    Returns:
+        str: File name of the thumbnail.
+    """
+    name = f"{hashlib.sha256(thumbnail).hexdigest()}.{EXTENSIONS[settings.thumbnails.FORMAT]}"
+    path = thumbnail_path(name, directory)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(thumbnail)
+        os.replace(tmp_path, path)
+    return name
+
+
+def create_thumbnail(url: str, directory: str | None = None) -> tuple[str, int, int]:
+    """
+    Downloads an image and stores its thumbnail.
+
+    Args:
+        url (str): URL of the image.
+        directory (str | None): Root of the store, by default settings.thumbnails.DIR.
+
+    Returns:
+        tuple[str, int, int]: File name of the thumbnail, and the size of the original and the thumbnail in bytes.
+    """
+    image = download_image(url)
+    thumbnail = make_thumbnail(image)
+    return store_thumbnail(thumbnail, directory), len(image), len(thumbnail)
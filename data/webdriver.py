@@ -1,13 +1,17 @@
 from config import settings
+from .run_report import count
 import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
 
 
-def get_page_source_urls() -> str:
+def get_page_source_urls(url: str) -> str:
     """
-    Retrieves the page source of the main restaurant listing page, clicking the "meer laden" (load more) button until all results are loaded.
+    Retrieves the page source of a restaurant listing page, clicking the "meer laden" (load more) button until all results are loaded.
+
+    Args:
+        url (str): URL of the listing page of a city.
 
     Returns:
         str: The HTML source of the fully loaded restaurant listing page.
@@ -15,7 +19,7 @@ def get_page_source_urls() -> str:
     cService = webdriver.ChromeService(executable_path=settings.CHROMEDRIVE_PATH)
     driver = webdriver.Chrome(service=cService)
     
-    driver.get(settings.RESTAURANT_URL)
+    driver.get(url)
     
     try:
         driver.find_element(By.ID, "CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll").click()
@@ -32,6 +36,7 @@ def get_page_source_urls() -> str:
     page_source = driver.page_source
 
     driver.quit()
+    count("pages_fetched")
 
     return page_source
 
@@ -68,5 +73,6 @@ def get_page_source_restaurant(url: str) -> str:
     page_source = driver.page_source
 
     driver.quit()
+    count("pages_fetched")
 
     return page_source
\ No newline at end of file